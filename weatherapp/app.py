@@ -1,15 +1,100 @@
+import base64
+import binascii
+import csv
+import json
+import time
+from typing import Callable, Optional
+
+import click
 from dotenv import load_dotenv
-from flask import Flask, jsonify, make_response, Response, request
+from flask import Flask, g, jsonify, make_response, Response, request
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 
+# Load .env before importing config and weather, which read their settings when imported
+load_dotenv()
+
 from config import ProductionConfig
 
-from weather.db import db
+from weather.db import configure_engine, db
+from weather.models.refresh_scheduler import RefreshScheduler
 from weather.models.weather_model import WeatherModel
 from weather.models.user_model import Users
-from weather.utils.logger import configure_logger
+from weather.utils.compression import ENCODINGS, encode, negotiate
+from weather.utils.json_provider import FastJSONProvider, dumps
+from weather.utils.logger import LogSampler, configure_logger
+from weather.utils.metrics import CONTENT_TYPE, REGISTRY, cache_samples
 
-load_dotenv()
+WEATHER_BODY_PREFIX = b'{"message":"Successfully retrieved location weather","status":"success","weather":'
+
+REQUESTS = REGISTRY.counter(
+    "http_requests_total",
+    "Requests served, by route, method and status code.",
+    ("route", "method", "status"),
+)
+REQUEST_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time from the start of a request until its response is ready, by route and method.",
+    ("route", "method"),
+)
+
+
+def conditional_response(etag: str, last_modified: float, max_age: Optional[int],
+                         build: Callable[[], Response]) -> Response:
+    """Answer a GET with 304 Not Modified if the client's copy is current, otherwise build the response.
+
+    If-None-Match takes precedence over If-Modified-Since. Either way the response carries the ETag,
+    Last-Modified and Cache-Control headers. A compressed body gets the ETag suffixed with its coding,
+    and a client holding any coding of the current version gets a 304.
+
+    Args:
+        etag (str): The unquoted strong ETag of the current representation.
+        last_modified (float): When the representation last changed, in epoch seconds.
+        max_age (int, optional): Seconds clients may reuse the response without revalidating.
+            None means they must always revalidate.
+        build (Callable[[], Response]): Builds the full response; only called when it is needed.
+
+    Returns:
+        Response: The 304 or the built response, with the caching headers set.
+    """
+    matched = None
+    if request.if_none_match:
+        tags = [etag] + [f"{etag}-{encoding}" for encoding in ENCODINGS]
+        matched = next((tag for tag in tags if request.if_none_match.contains_weak(tag)), None)
+        not_modified = matched is not None
+    else:
+        not_modified = request.if_modified_since is not None and \
+            int(last_modified) <= request.if_modified_since.timestamp()
+    if not_modified:
+        response = Response(status=304)
+        response.set_etag(matched or etag)
+    else:
+        response = build()
+        encoding = response.headers.get("Content-Encoding")
+        response.set_etag(f"{etag}-{encoding}" if encoding else etag)
+    response.last_modified = int(last_modified)
+    response.cache_control.private = True
+    if max_age is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.max_age = max_age
+    return response
+
+def encode_cursor(location: tuple[float, float]) -> str:
+    """Encode the last location of a page as an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(dumps(list(location))).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[float, float]:
+    """Decode a pagination cursor made by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        lat, lon = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(lat), float(lon)
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor")
 
 def create_app(config_class=ProductionConfig) -> Flask:
     """Create a Flask application with the specified configuration.
@@ -25,10 +110,12 @@ def create_app(config_class=ProductionConfig) -> Flask:
     configure_logger(app.logger)
 
     app.config.from_object(config_class)
+    app.json = FastJSONProvider(app)
 
     # Initialize database
     db.init_app(app)
     with app.app_context():
+        configure_engine(app)
         db.create_all()
 
     # Initialize login manager
@@ -38,7 +125,7 @@ def create_app(config_class=ProductionConfig) -> Flask:
 
     @login_manager.user_loader
     def load_user(user_id):
-        return Users.query.filter_by(username=user_id).first()
+        return Users.get_by_username(user_id)
 
     @login_manager.unauthorized_handler
     def unauthorized():
@@ -49,6 +136,67 @@ def create_app(config_class=ProductionConfig) -> Flask:
 
     weather_model = WeatherModel()
 
+    # Success lines on read routes are sampled (LOG_SAMPLE_RATES) so log volume stays bounded under load;
+    # warnings and errors are always logged
+    log_sampler = LogSampler()
+
+    # Keep tracked locations warm so reads rarely wait on OpenWeather
+    if app.config.get("REFRESH_AHEAD_ENABLED"):
+        scheduler = RefreshScheduler(
+            weather_model,
+            interval_seconds=app.config["REFRESH_AHEAD_INTERVAL"],
+            lead_seconds=app.config["REFRESH_AHEAD_LEAD"],
+            max_concurrency=app.config["REFRESH_AHEAD_CONCURRENCY"],
+        )
+        scheduler.start()
+        app.extensions["refresh_scheduler"] = scheduler
+
+    REGISTRY.register_collector("weather_model", lambda: [
+        ("weather_tracked_locations", "gauge", "Locations tracked by the weather model.", (),
+         {(): len(weather_model.locations)}),
+        *cache_samples("weather_cache", weather_model.get_cache_stats()),
+    ])
+
+    @app.before_request
+    def start_timer() -> None:
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response: Response) -> Response:
+        """Count the request and observe its latency under its route pattern.
+
+        Registered first so it runs after the other after_request hooks and includes compression.
+        Requests that matched no route share one label, so unknown paths cannot grow the metrics.
+        A streamed response is timed until its first byte is ready, not until it is fully sent.
+        """
+        started = g.get("request_started")
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            REQUEST_LATENCY.observe(time.perf_counter() - started, route, request.method)
+            REQUESTS.inc(route, request.method, str(response.status_code))
+        return response
+
+    @app.after_request
+    def compress_response(response: Response) -> Response:
+        """Compress JSON bodies of COMPRESSION_MIN_SIZE bytes or more in a coding the client accepts.
+
+        Routes that set Content-Encoding themselves (get-weather serves pre-compressed cached bodies)
+        and streamed responses are left alone. An ETag is suffixed with the coding, so every coding of a
+        resource has its own.
+        """
+        response.vary.add("Accept-Encoding")
+        if (response.status_code != 200 or response.mimetype != app.json.mimetype or response.is_streamed
+                or response.direct_passthrough or "Content-Encoding" in response.headers):
+            return response
+        body, encoding = encode(response.get_data(), negotiate(request.accept_encodings))
+        if encoding is not None:
+            response.set_data(body)
+            response.headers["Content-Encoding"] = encoding
+            etag, weak = response.get_etag()
+            if etag:
+                response.set_etag(f"{etag}-{encoding}", weak)
+        return response
+
     #####################################################
     #
     # Healthcheck
@@ -63,12 +211,23 @@ def create_app(config_class=ProductionConfig) -> Flask:
             JSON response indicating the health status of the service.
 
         """
-        app.logger.info("Health check endpoint hit")
+        if log_sampler.should_log("healthcheck"):
+            app.logger.info("Health check endpoint hit")
         return make_response(jsonify({
             'status': 'success',
             'message': 'Service is running'
         }), 200)
 
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics() -> Response:
+        """Expose request, upstream, database and cache metrics in the Prometheus text format.
+
+        Returns:
+            A text/plain response in the Prometheus exposition format.
+
+        """
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
     ##########################################################
     #
     # User Management
@@ -113,13 +272,83 @@ def create_app(config_class=ProductionConfig) -> Flask:
                 "message": str(e)
             }), 400)
         except Exception as e:
-            app.logger.error(f"User creation failed: {e}")
+            app.logger.error("User creation failed: %s", e)
             return make_response(jsonify({
                 "status": "error",
                 "message": "An internal error occurred while creating user",
                 "details": str(e)
             }), 500)
 
+    @app.route('/api/create-users', methods=['PUT'])
+    def create_users() -> Response:
+        """Register many user accounts in batched transactions.
+
+        Expected JSON Input:
+            - users (list): Objects with a username and password.
+
+        Returns:
+            JSON response with the number of users created and the status of each row.
+
+        Raises:
+            400 error if the users list is missing, malformed or too long.
+            500 error if there is an issue creating the users in the database.
+        """
+        try:
+            data = request.get_json()
+            users = data.get("users") if isinstance(data, dict) else None
+            if not isinstance(users, list) or not all(isinstance(user, dict) for user in users):
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": "A list of users with a username and password is required"
+                }), 400)
+            max_users = app.config.get("BULK_CREATE_MAX_USERS", 10000)
+            if len(users) > max_users:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": f"At most {max_users} users can be created per request"
+                }), 400)
+
+            results = Users.bulk_create(
+                ((user.get("username"), user.get("password")) for user in users),
+                batch_size=app.config.get("BULK_CREATE_BATCH_SIZE", 1000),
+                hash_workers=app.config.get("BULK_HASH_WORKERS", 1),
+            )
+            created = sum(result["status"] == "created" for result in results)
+            return make_response(jsonify({
+                "status": "success",
+                "message": f"Created {created} of {len(results)} users",
+                "results": results
+            }), 201 if created else 200)
+
+        except Exception as e:
+            app.logger.error("Bulk user creation failed: %s", e)
+            return make_response(jsonify({
+                "status": "error",
+                "message": "An internal error occurred while creating users",
+                "details": str(e)
+            }), 500)
+
+    @app.cli.command("import-users")
+    @click.argument("csv_file", type=click.File("r", encoding="utf-8"))
+    @click.option("--batch-size", type=int, default=None, help="Users inserted per transaction.")
+    @click.option("--hash-workers", type=int, default=None, help="Processes used to hash passwords.")
+    def import_users(csv_file, batch_size, hash_workers) -> None:
+        """Create users from a CSV file with username and password columns.
+
+        The file is streamed, so only one batch of rows is held in memory at a time.
+        """
+        rows = ((row.get("username"), row.get("password")) for row in csv.DictReader(csv_file))
+        results = Users.bulk_create(
+            rows,
+            batch_size=batch_size or app.config.get("BULK_CREATE_BATCH_SIZE", 1000),
+            hash_workers=hash_workers or app.config.get("BULK_HASH_WORKERS", 1),
+        )
+        for line, result in enumerate(results, start=2):
+            if result["status"] != "created":
+                click.echo(f"line {line}: {result['status']} user '{result['username']}'", err=True)
+        created = sum(result["status"] == "created" for result in results)
+        click.echo(f"Created {created} of {len(results)} users")
+
     @app.route('/api/login', methods=['POST'])
     def login() -> Response:
         """Authenticate a user and log them in.
@@ -145,8 +374,8 @@ def create_app(config_class=ProductionConfig) -> Flask:
                     "message": "Username and password are required"
                 }), 400)
 
-            if Users.check_password(username, password):
-                user = Users.query.filter_by(username=username).first()
+            user = Users.authenticate(username, password)
+            if user:
                 login_user(user)
                 return make_response(jsonify({
                     "status": "success",
@@ -164,7 +393,7 @@ def create_app(config_class=ProductionConfig) -> Flask:
                 "message": str(e)
             }), 401)
         except Exception as e:
-            app.logger.error(f"Login failed: {e}")
+            app.logger.error("Login failed: %s", e)
             return make_response(jsonify({
                 "status": "error",
                 "message": "An internal error occurred during login",
@@ -224,7 +453,7 @@ def create_app(config_class=ProductionConfig) -> Flask:
                 "message": str(e)
             }), 400)
         except Exception as e:
-            app.logger.error(f"Password change failed: {e}")
+            app.logger.error("Password change failed: %s", e)
             return make_response(jsonify({
                 "status": "error",
                 "message": "An internal error occurred while changing password",
@@ -246,6 +475,7 @@ def create_app(config_class=ProductionConfig) -> Flask:
             with app.app_context():
                 Users.__table__.drop(db.engine)
                 Users.__table__.create(db.engine)
+            Users.invalidate_identity()
             app.logger.info("Users table recreated successfully")
             return make_response(jsonify({
                 "status": "success",
@@ -253,7 +483,7 @@ def create_app(config_class=ProductionConfig) -> Flask:
             }), 200)
 
         except Exception as e:
-            app.logger.error(f"Users table recreation failed: {e}")
+            app.logger.error("Users table recreation failed: %s", e)
             return make_response(jsonify({
                 "status": "error",
                 "message": "An internal error occurred while deleting users",
@@ -296,24 +526,24 @@ def create_app(config_class=ProductionConfig) -> Flask:
             lat = data.get("lat")
             lon = data.get("lon")
 
-            app.logger.info(f"Adding location ({lat}, {lon})")
+            app.logger.info("Adding location (%s, %s)", lat, lon)
             weather_model.add_location(lat, lon)
 
-            app.logger.info(f"Successfully added location ({lat}, {lon})")
+            app.logger.info("Successfully added location (%s, %s)", lat, lon)
             return make_response(jsonify({
                 "status": "success",
                 "message": f"Location ({lat}, {lon}) added successfully"
             }), 201)
 
         except ValueError as e:
-            app.logger.warning(f"Failed to add location: {e}")
+            app.logger.warning("Failed to add location: %s", e)
             return make_response(jsonify({
                 "status": "error",
                 "message": str(e)
             }), 400)
 
         except Exception as e:
-            app.logger.error(f"Failed to add location: {e}")
+            app.logger.error("Failed to add location: %s", e)
             return make_response(jsonify({
                 "status": "error",
                 "message": "An internal error occurred while adding the location",
@@ -337,23 +567,23 @@ def create_app(config_class=ProductionConfig) -> Flask:
             500 error if there is an issue removing the location.
         """
         try:
-            app.logger.info(f"Received request to remove location ({lat}, {lon})")
+            app.logger.info("Received request to remove location (%s, %s)", lat, lon)
 
             weather_model.remove_location(lat, lon)
-            app.logger.info(f"Successfully removed location ({lat}, {lon})")
+            app.logger.info("Successfully removed location (%s, %s)", lat, lon)
             return make_response(jsonify({
                 "status": "success",
                 "message": f"Location ({lat}, {lon}) removed successfully"
             }), 200)
 
         except ValueError as e:
-            app.logger.warning(f"Failed to remove location: {e}")
+            app.logger.warning("Failed to remove location: %s", e)
             return make_response(jsonify({
                 "status": "error",
                 "message": str(e)
             }), 400)
         except Exception as e:
-            app.logger.error(f"Failed to remove location: {e}")
+            app.logger.error("Failed to remove location: %s", e)
             return make_response(jsonify({
                 "status": "error",
                 "message": "An internal error occurred while removing the location",
@@ -369,58 +599,319 @@ def create_app(config_class=ProductionConfig) -> Flask:
             - lat (float): Latitude of the location.
             - lon (float): Longitude of the location.
 
+        Query Parameters:
+            - nearest_km (float): Optional radius; serve the cached weather of the nearest tracked
+              location within it instead of fetching the exact coordinates.
+
         Returns:
-            JSON containing the weather data.
+            JSON containing the weather data. The Age header gives the number of seconds since the data
+            was fetched, and X-Weather-Stale is "true" when it is past its TTL and being refreshed.
+            X-Weather-Location gives the coordinates the data belongs to. The ETag and Last-Modified
+            identify the fetch, and Cache-Control max-age is the time left before the data expires; a
+            matching If-None-Match or If-Modified-Since gets a 304 with no body.
 
         Raises:
             400 error if api return invalid response.
             500 error if there is a runtime error.
         """
         try:
-            app.logger.info(f"Trying to retrieve weather data for ({lat}, {lon})")
-            data = weather_model.get_weather(lat, lon)
-            app.logger.info(f"Retrieved data for ({lat}, {lon})!")
+            sampled = log_sampler.should_log("get_weather")
+            if sampled:
+                app.logger.info("Trying to retrieve weather data for (%s, %s)", lat, lon)
+            nearest_km = request.args.get("nearest_km", type=float)
+            entry = weather_model.get_weather_entry(lat, lon, nearest_km=nearest_km)
+            if sampled:
+                app.logger.info("Retrieved data for (%s, %s)!", lat, lon)
+
+            encoding = negotiate(request.accept_encodings)
+
+            def build() -> Response:
+                # The entry keeps its encoded weather, and the body in each coding, so a cache hit
+                # sends stored bytes without serializing or compressing anything
+                body, body_encoding = entry.variant(
+                    encoding, lambda: encode(WEATHER_BODY_PREFIX + entry.json() + b"}", encoding)
+                )
+                response = app.response_class(body, status=200, mimetype=app.json.mimetype)
+                if body_encoding:
+                    response.headers["Content-Encoding"] = body_encoding
+                return response
+
+            response = conditional_response(
+                f"{entry.key[0]},{entry.key[1]},{int(entry.fetched_at * 1e6):x}",
+                entry.fetched_at,
+                max(0, int(entry.expires_at - time.time())),
+                build,
+            )
+            response.headers["Age"] = str(int(entry.age()))
+            response.headers["X-Weather-Stale"] = "false" if entry.is_fresh() else "true"
+            response.headers["X-Weather-Location"] = f"{entry.key[0]},{entry.key[1]}"
+            return response
+        except ValueError as e:
+            app.logger.warning("Failed to get data for location: %s", e)
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 400)
+        except RuntimeError as e:
+            app.logger.error("There was an error while trying to get data for location: %s", e)
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 500)
+
+    @app.route('/api/get-weather-batch', methods=['POST'])
+    @login_required
+    def get_weather_batch() -> Response:
+        """Get the weather data of many locations in one request.
+
+        Expected JSON Input:
+            - locations (list): Objects with a lat and lon, at most BATCH_MAX_LOCATIONS of them.
+
+        Cached locations are served immediately and the rest are fetched from OpenWeather concurrently,
+        all within BATCH_DEADLINE_SECONDS. A location that is invalid, fails or misses the deadline gets
+        an error in its own result instead of failing the whole batch.
+
+        Returns:
+            JSON containing one result per location, in order, each with the lat and lon as given and
+            either a status of "success" and the weather, or a status of "error" and a message.
+
+        Raises:
+            400 error if the locations list is missing, malformed or too long.
+        """
+        data = request.get_json(silent=True)
+        locations = data.get("locations") if isinstance(data, dict) else None
+        if not isinstance(locations, list) or not all(isinstance(location, dict) for location in locations):
+            return make_response(jsonify({
+                "status": "error",
+                "message": "A list of locations with a lat and lon is required"
+            }), 400)
+        max_locations = app.config.get("BATCH_MAX_LOCATIONS", 100)
+        if len(locations) > max_locations:
+            return make_response(jsonify({
+                "status": "error",
+                "message": f"At most {max_locations} locations can be requested per batch"
+            }), 400)
+
+        app.logger.info("Retrieving weather data for a batch of %d locations", len(locations))
+        coords = [(location.get("lat"), location.get("lon")) for location in locations]
+        weather = weather_model.get_weather_batch(coords, timeout=app.config.get("BATCH_DEADLINE_SECONDS", 10))
+
+        results = []
+        for (lat, lon), result in zip(coords, weather):
+            if isinstance(result, Exception):
+                results.append({"lat": lat, "lon": lon, "status": "error", "message": str(result)})
+            else:
+                results.append({"lat": lat, "lon": lon, "status": "success", "weather": result})
+        failed = sum(result["status"] == "error" for result in results)
+        return make_response(jsonify({
+            "status": "success",
+            "message": f"Retrieved weather for {len(results) - failed} of {len(results)} locations",
+            "results": results,
+        }), 200)
+
+    @app.route('/api/nearest-location/<lat>/<lon>', methods=['GET'])
+    @login_required
+    def nearest_location(lat: float, lon: float) -> Response:
+        """Find the tracked location closest to a point.
+
+        Path Parameters:
+            - lat (float): Latitude of the point.
+            - lon (float): Longitude of the point.
+
+        Query Parameters:
+            - radius_km (float): The maximum search distance in kilometers (default 50).
+
+        Returns:
+            JSON containing the nearest tracked location and its distance.
+
+        Raises:
+            400 error if the point or radius is invalid, or no location is within the radius.
+        """
+        try:
+            radius_km = request.args.get("radius_km", 50.0, type=float)
+            if log_sampler.should_log("nearest_location"):
+                app.logger.info("Trying to find the nearest location to (%s, %s) within %s km", lat, lon, radius_km)
+            nearest = weather_model.find_nearest_location(lat, lon, radius_km)
 
             return make_response(jsonify({
                 "status": "success",
-                "message": "Successfully retrieved location weather",
-                "weather": data,
+                "message": "Successfully found nearest location",
+                "location": nearest,
             }), 200)
         except ValueError as e:
-            app.logger.warning(f"Failed to get data for location: {e}")
+            app.logger.warning("Failed to find nearest location: %s", e)
             return make_response(jsonify({
                 "status": "error",
                 "message": str(e)
             }), 400)
-        except RuntimeError as e:
-            app.logger.error(f"There was an error while trying to get data for location: {e}")
+
+    @app.route('/api/weather-in-bbox', methods=['GET'])
+    @login_required
+    def weather_in_bbox() -> Response:
+        """Get the stored weather of every tracked location inside a bounding box.
+
+        Query Parameters:
+            - min_lat, min_lon, max_lat, max_lon (float): The edges of the box. A min_lon greater than
+              max_lon crosses the antimeridian.
+            - grid (str): Optional "<rows>x<cols>" grid to aggregate the locations onto, for zoomed-out views.
+
+        Returns:
+            JSON containing either each location's weather, or the aggregated grid cells.
+
+        Raises:
+            400 error if the box or grid is missing or invalid.
+        """
+        try:
+            if log_sampler.should_log("weather_in_bbox"):
+                app.logger.info("Trying to retrieve weather in bounding box")
+            bounds = {}
+            for name in ("min_lat", "min_lon", "max_lat", "max_lon"):
+                if name not in request.args:
+                    raise ValueError("min_lat, min_lon, max_lat and max_lon are required")
+                bounds[name] = float(request.args[name])
+
+            grid = None
+            if "grid" in request.args:
+                rows, sep, cols = request.args["grid"].lower().partition("x")
+                if not sep:
+                    raise ValueError("grid must be in the form <rows>x<cols>")
+                grid = (int(rows), int(cols))
+
+            results = weather_model.get_weather_in_bbox(grid=grid, **bounds)
+            return make_response(jsonify({
+                "status": "success",
+                "message": "Successfully retrieved weather in bounding box",
+                "cells" if grid else "locations": results,
+            }), 200)
+        except ValueError as e:
+            app.logger.warning("Failed to get weather in bounding box: %s", e)
             return make_response(jsonify({
                 "status": "error",
                 "message": str(e)
-            }), 500)
+            }), 400)
+
+    @app.route('/api/history/<lat>/<lon>', methods=['GET'])
+    @login_required
+    def history(lat: float, lon: float) -> Response:
+        """Get the recorded weather history of a location.
+
+        Path Parameters:
+            - lat (float): Latitude of the location.
+            - lon (float): Longitude of the location.
+
+        Query Parameters:
+            - from (float): Start of the range in epoch seconds (default 24 hours before "to").
+            - to (float): End of the range in epoch seconds (default now).
+
+        Returns:
+            JSON containing the history buckets in the range, oldest first.
+
+        Raises:
+            400 error if history is disabled or the location or range is invalid.
+        """
+        try:
+            try:
+                end = float(request.args.get("to", time.time()))
+                start = float(request.args.get("from", end - 86400))
+            except ValueError:
+                raise ValueError("from and to must be numbers of epoch seconds")
+            if log_sampler.should_log("history"):
+                app.logger.info("Trying to retrieve history for (%s, %s)", lat, lon)
+            buckets = weather_model.get_history(lat, lon, start, end)
+
+            return make_response(jsonify({
+                "status": "success",
+                "message": "Successfully retrieved location history",
+                "history": buckets,
+            }), 200)
+        except ValueError as e:
+            app.logger.warning("Failed to get history for location: %s", e)
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 400)
 
     @app.route('/api/get-all-locations', methods=['GET'])
     @login_required
     def get_all_locations() -> Response:
         """ Get the list of all locations.
 
+        Query Parameters:
+            - limit (int): Return one page of at most this many locations (default 100, max 1000).
+            - cursor (str): Return the page after the one that gave this next_cursor.
+            - include_weather (bool): Include each location's stored weather data.
+            - format (str): "ndjson" streams every location as one JSON document per line.
+
+        Without any of these, the whole list is returned at once.
+
         Returns:
-            JSON containing a list of the location coordinates.
+            JSON containing a list of the location coordinates. The ETag changes whenever a location is
+            added or removed; a matching If-None-Match or If-Modified-Since gets a 304 with no body.
+            Pages are in (lat, lon) order and carry the next_cursor, or null on the last page.
 
         Raises:
-            400 error if the list of locations is empty
+            400 error if the list of locations is empty, or a query parameter is invalid
         """
         try:
-            app.logger.info(f"Trying to retrieve list of all locations")
+            if log_sampler.should_log("get_all_locations"):
+                app.logger.info("Trying to retrieve list of all locations")
+            include_weather = request.args.get("include_weather", "false").lower() == "true"
+
+            if request.args.get("format") == "ndjson":
+                # Rows are read from the model a page at a time while the response is written
+                def generate():
+                    for row in weather_model.iter_locations(include_weather=include_weather):
+                        yield dumps(row) + b"\n"
+                return Response(generate(), status=200, mimetype="application/x-ndjson")
+
+            if "limit" in request.args or "cursor" in request.args or include_weather:
+                cursor = request.args.get("cursor")
+                try:
+                    try:
+                        limit = int(request.args.get("limit", 100))
+                    except ValueError:
+                        raise ValueError("limit must be an integer")
+                    if not 1 <= limit <= 1000:
+                        raise ValueError("limit must be between 1 and 1000")
+                    after = decode_cursor(cursor) if cursor else None
+                except ValueError as e:
+                    app.logger.warning("Invalid page of locations requested: %s", e)
+                    return make_response(jsonify({
+                        "status": "error",
+                        "message": str(e)
+                    }), 400)
+                version, modified_at = weather_model.get_locations_version()
+                page, next_after = weather_model.get_locations_page(after, limit, include_weather)
+
+                def build() -> Response:
+                    return make_response(jsonify({
+                        "status": "success",
+                        "message": f"Successfully retrieved {len(page)} locations",
+                        "locations": page,
+                        "next_cursor": encode_cursor(next_after) if next_after else None,
+                    }), 200)
+
+                # Stored weather changes without the locations version moving, so only bare pages get an ETag
+                if include_weather:
+                    return build()
+                return conditional_response(f"locations-{version}", modified_at, None, build)
+
+            # Read the version first, so a change racing the read can only make the ETag older than the body
+            version, modified_at = weather_model.get_locations_version()
             lst = weather_model.get_all_locations()
 
-            return make_response(jsonify({
-                "status": "success",
-                "message": "Successfully retrieved list of all locations",
-                "locations": lst,
-            }), 200)
+            return conditional_response(
+                f"locations-{version}",
+                modified_at,
+                None,
+                lambda: make_response(jsonify({
+                    "status": "success",
+                    "message": "Successfully retrieved list of all locations",
+                    "locations": lst,
+                }), 200),
+            )
         except ValueError as e:
-            app.logger.error(f"There was an issue getting all locations: {e}")
+            app.logger.error("There was an issue getting all locations: %s", e)
             return make_response(jsonify({
                 "status": "error",
                 "message": "There was an issue getting list of all locations."
@@ -442,7 +933,7 @@ def create_app(config_class=ProductionConfig) -> Flask:
             400 error if the location cannot be found.
         """
         try:
-            app.logger.info(f"Trying to update a location at ({lat}, {lon})")
+            app.logger.info("Trying to update a location at (%s, %s)", lat, lon)
             weather_model.update_location(lat, lon)
 
             return make_response(jsonify({
@@ -450,12 +941,110 @@ def create_app(config_class=ProductionConfig) -> Flask:
                 "message": "Successfully updated location.",
             }), 200)
         except ValueError as e:
-            app.logger.error(f"There was an issue updating location: {e}")
+            app.logger.error("There was an issue updating location: %s", e)
             return make_response(jsonify({
                 "status": "error",
                 "message": str(e)
             }), 400)
     
+    @app.route('/api/update-all-locations', methods=['PUT'])
+    @login_required
+    def update_all_locations() -> Response:
+        """Refresh the weather data of every tracked location in parallel.
+
+        Returns:
+            JSON containing a per-location report of status and latency.
+
+        Raises:
+            400 error if there are no locations to update.
+            500 error if there is an issue running the refresh.
+        """
+        try:
+            app.logger.info("Trying to update all locations")
+            reports = weather_model.update_all_locations()
+            failed = sum(1 for report in reports if report["status"] != "success")
+
+            return make_response(jsonify({
+                "status": "success",
+                "message": f"Updated {len(reports) - failed} of {len(reports)} locations.",
+                "updated": len(reports) - failed,
+                "failed": failed,
+                "results": reports,
+            }), 200)
+        except ValueError as e:
+            app.logger.error("There was an issue updating all locations: %s", e)
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 400)
+        except Exception as e:
+            app.logger.error("Failed to update all locations: %s", e)
+            return make_response(jsonify({
+                "status": "error",
+                "message": "An internal error occurred while updating locations",
+                "details": str(e)
+            }), 500)
+
+    @app.route('/api/filter-locations', methods=['GET'])
+    @login_required
+    def filter_locations() -> Response:
+        """Find the tracked locations whose weather matches every filter.
+
+        Query Parameters:
+            - <column>_<op> (float): A filter such as temp_gt=290 or wind_speed_lt=5. Columns are lat, lon,
+              temp, humidity, wind_speed and fetched_at; operators are gt, gte, lt and lte.
+            - sort_by (str): Optional column to sort by.
+            - order (str): "asc" (default) or "desc".
+            - limit (int): Optional maximum number of locations to return, at least 1.
+
+        Returns:
+            JSON containing the matching locations and their weather fields.
+
+        Raises:
+            400 error if a filter, column or value is invalid.
+        """
+        try:
+            if log_sampler.should_log("filter_locations"):
+                app.logger.info("Trying to filter locations")
+            conditions = []
+            for name, value in request.args.items():
+                if name in ("sort_by", "order", "limit"):
+                    continue
+                column, _, op = name.rpartition("_")
+                if not column:
+                    raise ValueError(f"Invalid filter '{name}', expected <column>_<op>")
+                conditions.append((column, op, float(value)))
+
+            order = request.args.get("order", "asc")
+            if order not in ("asc", "desc"):
+                raise ValueError("order must be 'asc' or 'desc'")
+            limit = request.args.get("limit")
+            if limit is not None:
+                try:
+                    limit = int(limit)
+                except ValueError:
+                    raise ValueError("limit must be an integer")
+                if limit < 1:
+                    raise ValueError("limit must be at least 1")
+
+            matches = weather_model.filter_locations(
+                conditions,
+                sort_by=request.args.get("sort_by"),
+                descending=order == "desc",
+                limit=limit,
+            )
+            return make_response(jsonify({
+                "status": "success",
+                "message": f"Found {len(matches)} matching locations",
+                "locations": matches,
+            }), 200)
+        except ValueError as e:
+            app.logger.warning("Failed to filter locations: %s", e)
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 400)
+
     return app
 
 if __name__ == '__main__':
@@ -464,7 +1053,7 @@ if __name__ == '__main__':
     try:
         app.run(debug=True, host='0.0.0.0', port=5000)
     except Exception as e:
-        app.logger.error(f"Flask app encountered an error: {e}")
+        app.logger.error("Flask app encountered an error: %s", e)
     finally:
         app.logger.info("Flask app has stopped.")
 
@@ -0,0 +1,87 @@
+"""Compare login throughput on a file-backed SQLite database with and without the production engine profile.
+
+Login threads authenticate as distinct users while writer threads keep changing passwords, which is the
+mix where logins used to serialize on the database lock. Every login reads the users table.
+
+Usage: python benchmark_login.py [--users 2000] [--threads 8] [--writers 2] [--seconds 5]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from app import create_app
+from config import ProductionConfig
+from weather.models.user_model import Users
+
+
+def make_config(database_uri: str, tuned: bool) -> type:
+    class BenchmarkConfig(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = database_uri
+        SQLALCHEMY_ENGINE_OPTIONS = ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS if tuned else {}
+        SQLITE_PRAGMAS = ProductionConfig.SQLITE_PRAGMAS if tuned else {}
+        REFRESH_AHEAD_ENABLED = False
+    return BenchmarkConfig
+
+
+def run(tuned: bool, users: int, threads: int, writers: int, seconds: float) -> tuple[float, float]:
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app(make_config(f"sqlite:///{os.path.join(directory, 'bench.db')}", tuned))
+        with app.app_context():
+            Users.bulk_create((f"user{i}", "password") for i in range(users))
+
+        stop = threading.Event()
+        logins = [0] * threads
+        writes = [0] * writers
+        errors = []
+
+        def login(worker: int) -> None:
+            client = app.test_client()
+            i = worker
+            while not stop.is_set():
+                response = client.post("/api/login", json={"username": f"user{i % users}", "password": "password"})
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+                logins[worker] += 1
+                i += threads
+
+        def write(worker: int) -> None:
+            with app.app_context():
+                i = worker
+                while not stop.is_set():
+                    Users.update_password(f"user{i % users}", "password")
+                    writes[worker] += 1
+                    i += writers
+
+        workers = [threading.Thread(target=login, args=(n,)) for n in range(threads)]
+        workers += [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+        for worker in workers:
+            worker.start()
+        time.sleep(seconds)
+        stop.set()
+        for worker in workers:
+            worker.join()
+        if errors:
+            print(f"  {len(errors)} failed logins")
+        return sum(logins) / seconds, sum(writes) / seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+    # Per-request log lines would otherwise dominate the timings
+    logging.disable(logging.INFO)
+
+    for label, tuned in (("default engine", False), ("production profile", True)):
+        login_rate, write_rate = run(tuned, args.users, args.threads, args.writers, args.seconds)
+        print(f"{label}: {login_rate:.0f} logins/s, {write_rate:.0f} password changes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import os
 
+from weather.db import engine_options, sqlite_pragmas
+
 class ProductionConfig():
     """Production configuration."""
     DEBUG = False
@@ -13,8 +15,20 @@ class ProductionConfig():
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', "sqlite:///weather.db") # Production database URI from environment
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)  # Pool sizing, or a busy timeout for SQLite
+    SQLITE_PRAGMAS = sqlite_pragmas()  # Applied to each SQLite connection; ignored for server databases
+    REFRESH_AHEAD_ENABLED = os.getenv("REFRESH_AHEAD_ENABLED", "true").lower() == "true"
+    REFRESH_AHEAD_INTERVAL = float(os.getenv("REFRESH_AHEAD_INTERVAL", 30))  # Seconds between scheduler passes
+    REFRESH_AHEAD_LEAD = float(os.getenv("REFRESH_AHEAD_LEAD", 300))  # Refresh this many seconds before expiry
+    REFRESH_AHEAD_CONCURRENCY = int(os.getenv("REFRESH_AHEAD_CONCURRENCY", 4))
+    BULK_CREATE_BATCH_SIZE = int(os.getenv("BULK_CREATE_BATCH_SIZE", 1000))  # Users inserted per transaction
+    BULK_CREATE_MAX_USERS = int(os.getenv("BULK_CREATE_MAX_USERS", 10000))  # Largest /api/create-users request
+    BULK_HASH_WORKERS = int(os.getenv("BULK_HASH_WORKERS", 1))  # Processes hashing passwords during imports
+    BATCH_MAX_LOCATIONS = int(os.getenv("BATCH_MAX_LOCATIONS", 100))  # Largest /api/get-weather-batch request
+    BATCH_DEADLINE_SECONDS = float(os.getenv("BATCH_DEADLINE_SECONDS", 10))  # Overall upstream deadline per batch
 
 class TestConfig():
     """Testing configuration."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI =  'sqlite:///:memory:'  # Use in-memory database for tests
+    REFRESH_AHEAD_ENABLED = False
@@ -3,6 +3,7 @@ import pytest
 from app import create_app
 from config import TestConfig
 from weather.db import db
+from weather.models.user_model import Users
 
 @pytest.fixture
 def app():
@@ -12,6 +13,7 @@ def app():
         yield app
         db.session.remove()
         db.drop_all()
+    Users.invalidate_identity()
 
 @pytest.fixture
 def client(app):
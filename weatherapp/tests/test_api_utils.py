@@ -1,7 +1,11 @@
+import threading
+import time
+
 import pytest
 import requests
 
-from weather.utils.api_utils import get_weather_data
+from weather.utils import api_utils
+from weather.utils.api_utils import get_weather_data, get_weather_data_many
 
 LAT = 42.3493
 LON = -71.1041
@@ -15,20 +19,29 @@ MOCK_RESPONSE = {
 }
 
 @pytest.fixture
-def mock_openweather(mocker):
+def mock_openweather(mocker, mock_session):
     """Fixture to mock the OpenWeather API response.
 
     """
-    # Patch the requests.get call
-    # requests.get returns an object, which we have replaced with a mock object
+    # Patch the pooled session's get call
+    # session.get returns an object, which we have replaced with a mock object
     mock_response = mocker.Mock()
     # We are giving that object a text attribute
     mock_response.text = str(MOCK_RESPONSE)
     mock_response.json.return_value = MOCK_RESPONSE
-    mocker.patch("requests.get", return_value=mock_response)
+    mock_session.get.return_value = mock_response
     return mock_response
 
-def test_get_weather_data(mock_openweather):
+@pytest.fixture
+def mock_session(mocker):
+    """Fixture to replace the pooled HTTP session with a mock.
+
+    """
+    session = mocker.Mock()
+    mocker.patch("weather.utils.api_utils.get_session", return_value=session)
+    return session
+
+def test_get_weather_data(mock_openweather, mock_session):
     """Test retrieving weather data from the OpenWeather API.
 
     """
@@ -38,32 +51,33 @@ def test_get_weather_data(mock_openweather):
     assert result == MOCK_RESPONSE, f"Expected weather data {MOCK_RESPONSE}, but got {result}"
 
     # Ensure the correct URL was called
-    requests.get.assert_called_once()
-    args, kwargs = requests.get.call_args
+    mock_session.get.assert_called_once()
+    args, kwargs = mock_session.get.call_args
     assert "lat=42.3493" in args[0]
     assert "lon=-71.1041" in args[0]
+    assert kwargs["timeout"] == (api_utils.HTTP_CONNECT_TIMEOUT, api_utils.HTTP_READ_TIMEOUT)
 
-def test_get_weather_data_timeout(mocker):
+def test_get_weather_data_timeout(mock_session):
     """Test handling of a timeout when calling the OpenWeather API.
 
     """
     # Simulate a timeout
-    mocker.patch("requests.get", side_effect=requests.exceptions.Timeout)
+    mock_session.get.side_effect = requests.exceptions.Timeout
 
     with pytest.raises(RuntimeError, match="OpenWeather API request timed out"):
         get_weather_data(LAT, LON)
 
-def test_get_weather_data_failure(mocker):
+def test_get_weather_data_failure(mock_session):
     """Test handling of a request failure when calling the OpenWeather API.
 
     """
     # Simulate a request failure
-    mocker.patch("requests.get", side_effect=requests.exceptions.RequestException("Connection error"))
+    mock_session.get.side_effect = requests.exceptions.RequestException("Connection error")
 
     with pytest.raises(RuntimeError, match="OpenWeather API request failed: Connection error"):
         get_weather_data(LAT, LON)
 
-def test_get_weather_data_invalid_json(mocker):
+def test_get_weather_data_invalid_json(mocker, mock_session):
     """Test handling of an invalid JSON response from the OpenWeather API.
 
     """
@@ -71,8 +85,123 @@ def test_get_weather_data_invalid_json(mocker):
     mock_response = mocker.Mock()
     mock_response.text = "invalid_json"
     mock_response.json.side_effect = ValueError("No JSON could be decoded")
-    mocker.patch("requests.get", return_value=mock_response)
+    mock_session.get.return_value = mock_response
+    errors = api_utils.UPSTREAM_ERRORS.value("invalid_json")
 
     with pytest.raises(ValueError, match="Invalid response from OpenWeather API: invalid_json"):
         get_weather_data(LAT, LON)
+    assert api_utils.UPSTREAM_ERRORS.value("invalid_json") == errors + 1
+
+@pytest.mark.parametrize("error, error_type", [
+    (requests.exceptions.Timeout, "timeout"),
+    (requests.exceptions.HTTPError("503 Server Error"), "http_error"),
+    (requests.exceptions.ConnectionError("Connection refused"), "connection_error"),
+])
+def test_get_weather_data_error_metrics(mock_session, error, error_type):
+    """Test that upstream failures are counted by type and timed.
+
+    """
+    mock_session.get.side_effect = error
+    errors = api_utils.UPSTREAM_ERRORS.value(error_type)
+    timed = api_utils.UPSTREAM_LATENCY.count("error")
+
+    with pytest.raises(RuntimeError):
+        get_weather_data(LAT, LON)
+
+    assert api_utils.UPSTREAM_ERRORS.value(error_type) == errors + 1
+    assert api_utils.UPSTREAM_LATENCY.count("error") == timed + 1
+
+def test_get_weather_data_success_metrics(mock_openweather, mock_session):
+    """Test that successful upstream calls are timed without counting an error.
+
+    """
+    timed = api_utils.UPSTREAM_LATENCY.count("success")
+    get_weather_data(LAT, LON)
+    assert api_utils.UPSTREAM_LATENCY.count("success") == timed + 1
+
+def test_get_session_is_pooled_with_retries():
+    """Test that the shared session is reused and retries transient failures.
+
+    """
+    session = api_utils.get_session()
+    assert api_utils.get_session() is session
+
+    adapter = session.get_adapter("https://api.openweathermap.org")
+    assert adapter._pool_maxsize == api_utils.HTTP_POOL_SIZE
+    assert adapter.max_retries.total == api_utils.HTTP_MAX_RETRIES
+    assert 503 in adapter.max_retries.status_forcelist
+
+def test_get_weather_data_many(mock_openweather, mock_session):
+    """Test fetching several coordinates at once through the shared session.
+
+    """
+    results = get_weather_data_many([(LAT, LON), (0.0, 0.0)], max_concurrency=2)
+
+    assert results == [MOCK_RESPONSE, MOCK_RESPONSE]
+    assert mock_session.get.call_count == 2
+
+def test_get_weather_data_many_deadline():
+    """Test that fetches still running at the deadline are reported as timed out.
+
+    """
+    release = threading.Event()
+
+    def fetch(lat, lon):
+        if lat == 0.0:
+            release.wait(5)
+        return {"lat": lat}
+
+    start = time.monotonic()
+    results = get_weather_data_many([(LAT, LON), (0.0, 0.0)], fetch=fetch, timeout=0.2)
+    release.set()
+
+    assert time.monotonic() - start < 2
+    assert results[0] == {"lat": LAT}
+    assert isinstance(results[1], TimeoutError)
+
+def test_get_weather_data_many_bounds_concurrency():
+    """Test that a batch keeps at most max_concurrency fetches in flight on the shared pool.
+
+    """
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def fetch(lat, lon):
+        with lock:
+            in_flight.append(lat)
+            peak.append(len(in_flight))
+        time.sleep(0.01)
+        with lock:
+            in_flight.remove(lat)
+        return {"lat": lat}
+
+    coords = [(float(i), 0.0) for i in range(10)]
+    results = get_weather_data_many(coords, max_concurrency=3, fetch=fetch)
+
+    assert results == [{"lat": lat} for lat, _ in coords]
+    assert max(peak) <= 3
+
+def test_get_weather_data_many_reuses_executor():
+    """Test that every batch runs on the same worker pool.
+
+    """
+    executor = api_utils.get_batch_executor()
+    for _ in range(2):
+        results = get_weather_data_many([(LAT, LON)], fetch=lambda lat, lon: threading.current_thread().name)
+        assert results[0].startswith("weather-fetch")
+    assert api_utils.get_batch_executor() is executor
+
+def test_get_weather_data_many_partial_failure():
+    """Test that a failing coordinate does not fail the rest of the batch.
+
+    """
+    def fetch(lat, lon):
+        if lat == 0.0:
+            raise RuntimeError("OpenWeather API request timed out")
+        return {"lat": lat}
+
+    results = get_weather_data_many([(LAT, LON), (0.0, 0.0)], fetch=fetch)
 
+    assert results[0] == {"lat": LAT}
+    assert isinstance(results[1], RuntimeError)
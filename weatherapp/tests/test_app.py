@@ -0,0 +1,231 @@
+import gzip
+import json
+import time
+
+import pytest
+
+BU = (42.3493, -71.1041)
+LA = (34.0522, -118.2437)
+
+
+@pytest.fixture
+def auth_client(app):
+    """Fixture to provide a test client for routes that require a login."""
+    app.config["LOGIN_DISABLED"] = True
+    return app.test_client()
+
+@pytest.fixture
+def mock_weather(mocker):
+    """Fixture to mock the OpenWeather lookup used by the weather model."""
+    return mocker.patch("weather.models.weather_model.get_weather_data",
+                        side_effect=lambda lat, lon: {"lat": lat, "lon": lon, "temp": 280.0})
+
+def add_locations(client, count):
+    """Tracks count locations along a line of latitude through the add-location route."""
+    for i in range(count):
+        response = client.post("/api/add-location", json={"lat": 10.0 + i, "lon": 20.0})
+        assert response.status_code == 201, response.json
+
+
+##########################################################
+# Batch Weather
+##########################################################
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"locations": "42,-71"},
+    {"locations": [[42.0, -71.0]]},
+])
+def test_get_weather_batch_malformed(auth_client, body):
+    """Test that a missing or malformed locations list is rejected."""
+    response = auth_client.post("/api/get-weather-batch", json=body)
+    assert response.status_code == 400
+    assert response.json["status"] == "error"
+
+def test_get_weather_batch_too_many_locations(app, auth_client):
+    """Test that a batch over BATCH_MAX_LOCATIONS is rejected."""
+    app.config["BATCH_MAX_LOCATIONS"] = 2
+    locations = [{"lat": lat, "lon": lon} for lat, lon in (BU, LA, BU)]
+    response = auth_client.post("/api/get-weather-batch", json={"locations": locations})
+    assert response.status_code == 400
+    assert "At most 2 locations" in response.json["message"]
+
+def test_get_weather_batch_mixed(auth_client, mock_weather):
+    """Test that invalid locations get an error result while the rest are served, in order."""
+    locations = [{"lat": BU[0], "lon": BU[1]}, {"lat": 200, "lon": 0}, {"lat": "abc"}, {"lat": LA[0], "lon": LA[1]}]
+    response = auth_client.post("/api/get-weather-batch", json={"locations": locations})
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert [result["status"] for result in results] == ["success", "error", "error", "success"]
+    assert results[0]["weather"]["temp"] == 280.0
+    assert (results[3]["lat"], results[3]["lon"]) == LA
+    assert "Invalid location" in results[1]["message"]
+    assert response.json["message"] == "Retrieved weather for 2 of 4 locations"
+
+def test_get_weather_batch_deadline(app, auth_client, mocker):
+    """Test that a fetch missing the deadline is reported in its own result, not as a failed request."""
+    def fetch(lat, lon):
+        if (lat, lon) == LA:
+            time.sleep(0.5)
+        return {"temp": 280.0}
+
+    mocker.patch("weather.models.weather_model.get_weather_data", side_effect=fetch)
+    app.config["BATCH_DEADLINE_SECONDS"] = 0.1
+    locations = [{"lat": BU[0], "lon": BU[1]}, {"lat": LA[0], "lon": LA[1]}]
+    response = auth_client.post("/api/get-weather-batch", json={"locations": locations})
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert [result["status"] for result in results] == ["success", "error"]
+    assert results[1]["message"] == "Timed out after 0.1s"
+
+
+##########################################################
+# Compression and Conditional Requests
+##########################################################
+
+def test_get_all_locations_gzip(auth_client, mock_weather):
+    """Test that a large JSON body is gzipped, varies on Accept-Encoding and gets a coding-suffixed ETag."""
+    add_locations(auth_client, 40)
+    plain = auth_client.get("/api/get-all-locations")
+    response = auth_client.get("/api/get-all-locations", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+    assert gzip.decompress(response.data) == plain.data
+
+def test_get_weather_gzip(auth_client, mocker):
+    """Test that get-weather sends its cached body gzipped, with a coding-suffixed ETag."""
+    mocker.patch("weather.models.weather_model.get_weather_data", return_value={"description": "clear " * 200})
+    plain = auth_client.get(f"/api/get-weather/{BU[0]}/{BU[1]}")
+    response = auth_client.get(f"/api/get-weather/{BU[0]}/{BU[1]}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+    assert gzip.decompress(response.data) == plain.data
+    revalidated = auth_client.get(f"/api/get-weather/{BU[0]}/{BU[1]}",
+                                  headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+def test_small_body_is_not_compressed(auth_client, mock_weather):
+    """Test that a body under COMPRESSION_MIN_SIZE is sent as is, with its plain ETag."""
+    response = auth_client.get(f"/api/get-weather/{BU[0]}/{BU[1]}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert not response.headers["ETag"].endswith('-gzip"')
+    assert response.json["weather"]["temp"] == 280.0
+
+def test_coded_etag_gets_304(auth_client, mock_weather):
+    """Test that revalidating with the ETag of a gzipped response gets a 304, whatever coding is asked for."""
+    add_locations(auth_client, 40)
+    etag = auth_client.get("/api/get-all-locations", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    assert etag.endswith('-gzip"')
+    for accept in ("gzip", "identity"):
+        response = auth_client.get("/api/get-all-locations", headers={"Accept-Encoding": accept, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.data == b""
+
+    auth_client.post("/api/add-location", json={"lat": 0.0, "lon": 0.0})
+    response = auth_client.get("/api/get-all-locations", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 200, "A change to the locations should invalidate the coded ETag."
+
+
+##########################################################
+# History
+##########################################################
+
+@pytest.fixture
+def history_enabled(tmp_path, monkeypatch):
+    """Fixture to enable weather history for an app created after it."""
+    monkeypatch.setenv("HISTORY_DB_PATH", str(tmp_path / "history.db"))
+
+@pytest.mark.parametrize("query", ["to=abc", "from=abc", "to=inf", "from=-inf", "from=nan"])
+def test_history_invalid_range(history_enabled, auth_client, query):
+    """Test that a malformed or non-finite range is rejected rather than replaced by the default."""
+    response = auth_client.get(f"/api/history/{BU[0]}/{BU[1]}?{query}")
+    assert response.status_code == 400
+    assert response.json["status"] == "error"
+    assert "enabled" not in response.json["message"]
+
+def test_history_default_range(history_enabled, auth_client):
+    """Test that the range defaults to the last 24 hours."""
+    response = auth_client.get(f"/api/history/{BU[0]}/{BU[1]}")
+    assert response.status_code == 200
+    assert response.json["history"] == []
+
+
+##########################################################
+# Location Pages
+##########################################################
+
+@pytest.mark.parametrize("query", ["limit=abc", "limit=0", "limit=1001", "cursor=not-a-cursor", "cursor=bnVsbA"])
+def test_get_all_locations_invalid_page(auth_client, mock_weather, query):
+    """Test that a malformed limit or cursor is rejected rather than ignored."""
+    add_locations(auth_client, 1)
+    response = auth_client.get(f"/api/get-all-locations?{query}")
+    assert response.status_code == 400
+    assert response.json["status"] == "error"
+
+def test_get_all_locations_cursor_round_trip(auth_client, mock_weather):
+    """Test that following next_cursor visits every location once, in order."""
+    add_locations(auth_client, 5)
+    seen = []
+    cursor = None
+    while True:
+        query = "limit=2" + (f"&cursor={cursor}" if cursor else "")
+        response = auth_client.get(f"/api/get-all-locations?{query}")
+        assert response.status_code == 200
+        seen += [tuple(location) for location in response.json["locations"]]
+        cursor = response.json["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [(10.0 + i, 20.0) for i in range(5)]
+
+def test_get_all_locations_ndjson(auth_client, mock_weather):
+    """Test that format=ndjson streams one JSON document per location and line."""
+    add_locations(auth_client, 3)
+    response = auth_client.get("/api/get-all-locations?format=ndjson&include_weather=true")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    rows = [json.loads(line) for line in lines]
+    assert [tuple(row["location"]) for row in rows] == [(10.0 + i, 20.0) for i in range(3)]
+    assert rows[0]["weather"]["temp"] == 280.0
+
+
+##########################################################
+# Filter Locations
+##########################################################
+
+@pytest.mark.parametrize("limit", ["abc", "0", "-1"])
+def test_filter_locations_invalid_limit(auth_client, mock_weather, limit):
+    """Test that a non-integer or non-positive limit is rejected rather than ignored."""
+    add_locations(auth_client, 2)
+    response = auth_client.get(f"/api/filter-locations?temp_gt=0&limit={limit}")
+    assert response.status_code == 400
+    assert "limit must be" in response.json["message"]
+
+def test_filter_locations_limit(auth_client, mock_weather):
+    """Test that a valid limit caps the number of matches."""
+    add_locations(auth_client, 3)
+    response = auth_client.get("/api/filter-locations?limit=2")
+    assert response.status_code == 200
+    assert len(response.json["locations"]) == 2
+
+
+##########################################################
+# Nearest Location
+##########################################################
+
+@pytest.mark.parametrize("path", [
+    "/api/nearest-location/0/0?radius_km=inf",
+    "/api/nearest-location/0/0?radius_km=-5",
+    "/api/get-weather/0/0?nearest_km=inf",
+])
+def test_invalid_radius_is_rejected(auth_client, mock_weather, path):
+    """Test that an infinite or negative radius gets a 400 rather than a 500."""
+    response = auth_client.get(path)
+    assert response.status_code == 400
+    assert "finite positive" in response.json["message"]
@@ -0,0 +1,41 @@
+import pytest
+
+from weather.utils.cache import TTLCache
+
+
+@pytest.fixture
+def cache():
+    """Fixture to provide a small cache for each test."""
+    return TTLCache(max_entries=2, ttl_seconds=60)
+
+
+def test_get_hit_and_miss(cache):
+    """Test that the cache counts hits and misses."""
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["size"] == 1
+
+def test_expired_entry_is_a_miss(cache, mocker):
+    """Test that entries past their TTL are not returned."""
+    mocker.patch("weather.utils.cache.time.time", return_value=1000.0)
+    cache.set("a", 1)
+    mocker.patch("weather.utils.cache.time.time", return_value=1061.0)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+def test_lru_eviction(cache):
+    """Test that the least recently used entry is evicted when the cache is full."""
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.stats()["evictions"] == 1
+
+def test_invalid_max_entries():
+    """Test that a cache must be able to hold at least one entry."""
+    with pytest.raises(ValueError, match="max_entries must be at least 1"):
+        TTLCache(max_entries=0)
@@ -0,0 +1,77 @@
+import pytest
+
+from weather.models.columnar_store import ColumnarLocationStore
+
+BU = (42.3493, -71.1041)
+LA = (34.0522, -118.2437)
+NYC = (40.7128, -74.0060)
+
+
+@pytest.fixture
+def store():
+    """Fixture to provide a store holding three locations, starting small enough to grow."""
+    store = ColumnarLocationStore(capacity=1)
+    store.upsert(BU, {"temp": 280.0, "humidity": 60, "wind_speed": 6.0}, fetched_at=1.0)
+    store.upsert(LA, {"temp": 295.0, "humidity": 30, "wind_speed": 2.0}, fetched_at=2.0)
+    store.upsert(NYC, {"temp": 290.0, "humidity": None, "wind_speed": 4.0}, fetched_at=3.0)
+    return store
+
+
+def test_query_filters_and_sorts(store):
+    """Test combining filters and sorting the matches."""
+    rows = store.query([("temp", "gt", 285.0), ("wind_speed", "lt", 5.0)], sort_by="temp", descending=True)
+    assert [(row["lat"], row["lon"]) for row in rows] == [LA, NYC]
+    assert rows[1]["humidity"] is None
+
+def test_missing_values_never_match(store):
+    """Test that a missing value does not satisfy a filter."""
+    rows = store.query([("humidity", "gte", 0)])
+    assert len(rows) == 2
+
+def test_upsert_updates_in_place(store):
+    """Test that upserting an existing location updates its row."""
+    store.upsert(BU, {"temp": 300.0}, fetched_at=4.0)
+    assert len(store) == 3
+    assert store.query(sort_by="temp", descending=True, limit=1)[0]["temp"] == 300.0
+
+def test_remove_keeps_rows_dense(store):
+    """Test that removing a location moves the last row into its slot."""
+    store.remove(BU)
+    store.remove(BU)
+    assert len(store) == 2 and BU not in store
+    assert {(row["lat"], row["lon"]) for row in store.query()} == {LA, NYC}
+
+def test_unknown_column_or_operator(store):
+    """Test that unknown columns and operators are rejected."""
+    with pytest.raises(ValueError, match="Unknown column 'pressure'"):
+        store.query([("pressure", "gt", 1000)])
+    with pytest.raises(ValueError, match="Unknown operator 'eq'"):
+        store.query([("temp", "eq", 280)])
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_limit_below_one(store, limit):
+    """Test that a limit below 1 is rejected rather than slicing from the end."""
+    with pytest.raises(ValueError, match="limit must be at least 1"):
+        store.query(limit=limit)
+
+def test_in_bbox(store):
+    """Test selecting the locations inside a bounding box."""
+    assert set(store.in_bbox(40.0, -75.0, 43.0, -70.0)) == {BU, NYC}
+    assert store.in_bbox(0.0, 0.0, 1.0, 1.0) == []
+
+def test_in_bbox_across_antimeridian():
+    """Test a bounding box that crosses +/-180 degrees longitude."""
+    store = ColumnarLocationStore()
+    store.upsert((0.0, 179.5), {}, fetched_at=1.0)
+    store.upsert((0.0, -179.5), {}, fetched_at=1.0)
+    store.upsert((0.0, 0.0), {}, fetched_at=1.0)
+    assert set(store.in_bbox(-1.0, 179.0, 1.0, -179.0)) == {(0.0, 179.5), (0.0, -179.5)}
+
+def test_grid(store):
+    """Test aggregating locations onto a grid."""
+    cells = store.grid(30.0, -120.0, 45.0, -70.0, rows=1, cols=2)
+    assert [(cell["col"], cell["count"]) for cell in cells] == [(0, 1), (1, 2)]
+    east = cells[1]
+    assert east["temp_mean"] == pytest.approx(285.0)
+    assert east["humidity_mean"] == pytest.approx(60.0)
+    assert east["lat"] == pytest.approx(37.5) and east["lon"] == pytest.approx(-82.5)
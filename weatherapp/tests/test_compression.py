@@ -0,0 +1,55 @@
+import gzip
+
+import pytest
+from werkzeug.http import parse_accept_header
+
+from weather.utils import compression
+from weather.utils.cache import CacheEntry
+from weather.utils.compression import compress, encode, negotiate
+
+
+def accept(header: str):
+    return parse_accept_header(header)
+
+
+def test_negotiate_prefers_supported_codings():
+    """Test that the preferred coding the client accepts is chosen."""
+    assert negotiate(accept("gzip, deflate")) == "gzip"
+    assert negotiate(accept("identity")) is None
+    assert negotiate(accept("gzip;q=0")) is None
+    if compression.brotli is not None:
+        assert negotiate(accept("gzip, br")) == "br"
+
+def test_encode_skips_small_bodies():
+    """Test that bodies below the minimum size are sent as is."""
+    small = b"x" * (compression.COMPRESSION_MIN_SIZE - 1)
+    assert encode(small, "gzip") == (small, None)
+    assert encode(b"x" * 4096, None) == (b"x" * 4096, None)
+
+def test_encode_gzip_round_trip():
+    """Test that large bodies are gzipped deterministically."""
+    body = b'{"weather":' + b'"clear sky",' * 200 + b'"end":1}'
+    data, encoding = encode(body, "gzip")
+    assert encoding == "gzip"
+    assert len(data) < len(body)
+    assert gzip.decompress(data) == body
+    assert compress(body, "gzip") == data
+
+def test_compress_brotli_round_trip():
+    """Test brotli compression when the package is installed."""
+    brotli = pytest.importorskip("brotli")
+    body = b"clear sky " * 200
+    assert brotli.decompress(compress(body, "br")) == body
+
+def test_compress_unsupported():
+    """Test that an unknown coding is rejected."""
+    with pytest.raises(ValueError, match="Unsupported content encoding"):
+        compress(b"data", "zstd")
+
+def test_cache_entry_variant_is_built_once(mocker):
+    """Test that a derived representation is kept on the entry."""
+    entry = CacheEntry({"temp": 1}, 0, 10)
+    build = mocker.Mock(return_value=(b"compressed", "gzip"))
+    assert entry.variant("gzip", build) == (b"compressed", "gzip")
+    assert entry.variant("gzip", build) == (b"compressed", "gzip")
+    build.assert_called_once()
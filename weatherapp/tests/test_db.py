@@ -0,0 +1,33 @@
+from sqlalchemy import text
+
+from app import create_app
+from config import TestConfig
+from weather.db import db, engine_options, sqlite_pragmas
+
+
+def test_engine_options_sqlite():
+    """Test that SQLite only gets a busy timeout."""
+    options = engine_options("sqlite:///weather.db")
+    assert set(options) == {"connect_args"}
+    assert options["connect_args"]["timeout"] > 0
+
+def test_engine_options_server_database():
+    """Test that server databases get a sized, pre-pinged pool."""
+    options = engine_options("postgresql://user:pass@db/weather")
+    assert options["pool_pre_ping"] is True
+    assert options["pool_size"] > 0
+    assert options["pool_recycle"] > 0
+
+def test_sqlite_pragmas_applied_on_connect(tmp_path):
+    """Test that the configured pragmas are set on every new connection."""
+    class PragmaConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'weather.db'}"
+        SQLITE_PRAGMAS = sqlite_pragmas()
+
+    app = create_app(PragmaConfig)
+    with app.app_context():
+        with db.engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+            assert conn.execute(text("PRAGMA cache_size")).scalar() == PragmaConfig.SQLITE_PRAGMAS["cache_size"]
+        db.engine.dispose()
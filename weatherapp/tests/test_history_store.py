@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+from weather.models.weather_model import WeatherModel
+from weather.utils.history_store import DAILY_RESOLUTION, HOURLY_RESOLUTION, RAW_RESOLUTION, HistoryStore
+
+BU = (42.3493, -71.1041)
+LA = (34.0522, -118.2437)
+DAY = 86400
+START = 1700006400  # Midnight UTC, a multiple of DAILY_RESOLUTION
+
+
+@pytest.fixture
+def history(tmp_path):
+    """Fixture to provide an empty history store that keeps 1 day of raw and 7 days of hourly data."""
+    return HistoryStore(str(tmp_path / "history.db"), raw_retention=DAY, hourly_retention=7 * DAY,
+                        downsample_interval=float("inf"))
+
+
+def test_append_and_query(history):
+    """Test that observations are bucketed and queried by location and range."""
+    history.append(BU, {"temp": 280.0}, observed_at=START + 10)
+    history.append(BU, {"temp": 281.0}, observed_at=START + 20)
+    history.append(BU, {"temp": 282.0}, observed_at=START + RAW_RESOLUTION)
+    history.append(LA, {"temp": 295.0}, observed_at=START)
+
+    rows = history.query(BU, START, START + RAW_RESOLUTION)
+    assert [(row["ts"], row["temp"]) for row in rows] == [(START, 281.0), (START + RAW_RESOLUTION, 282.0)]
+    assert history.query(BU, START + 2 * RAW_RESOLUTION, START + DAY) == []
+
+def test_downsample_to_hourly(history):
+    """Test that raw buckets past retention are rolled up into hourly means."""
+    history.append(BU, {"temp": 280.0, "humidity": 50}, observed_at=START)
+    history.append(BU, {"temp": 284.0, "humidity": None}, observed_at=START + RAW_RESOLUTION)
+    history.append(BU, {"temp": 290.0}, observed_at=START + 2 * DAY)
+
+    history.downsample(now=START + 2 * DAY)
+
+    rows = history.query(BU, START, START + 2 * DAY)
+    assert [(row["ts"], row["resolution"]) for row in rows] == [
+        (START, HOURLY_RESOLUTION), (START + 2 * DAY, RAW_RESOLUTION)
+    ]
+    hourly = rows[0]
+    assert hourly["temp"] == pytest.approx(282.0)
+    assert hourly["humidity"] == pytest.approx(50.0)
+    assert hourly["samples"] == 2
+
+def test_downsample_to_daily(history):
+    """Test that hourly buckets past retention are rolled up into daily means weighted by samples."""
+    history.append(BU, {"temp": 280.0}, observed_at=START)
+    history.append(BU, {"temp": 280.0}, observed_at=START + RAW_RESOLUTION)
+    history.append(BU, {"temp": 289.0}, observed_at=START + HOURLY_RESOLUTION)
+    history.downsample(now=START + 2 * DAY)
+    history.downsample(now=START + 10 * DAY)
+
+    rows = history.query(BU, START, START + DAY)
+    assert len(rows) == 1
+    assert rows[0]["resolution"] == DAILY_RESOLUTION
+    assert rows[0]["temp"] == pytest.approx(283.0)
+    assert rows[0]["samples"] == 3
+
+def test_downsample_runs_in_background(tmp_path, mocker):
+    """Test that appends never roll up inline, and the background thread does."""
+    history = HistoryStore(str(tmp_path / "history.db"), downsample_interval=0.01)
+    downsample = mocker.spy(history, "downsample")
+    history.append(BU, {"temp": 280.0}, observed_at=START)
+    downsample.assert_not_called()
+
+    history.start()
+    try:
+        for _ in range(100):
+            if downsample.call_count:
+                break
+            time.sleep(0.01)
+    finally:
+        history.stop(timeout=1)
+    assert downsample.call_count >= 1
+
+def test_weather_model_records_history(tmp_path, monkeypatch, mocker):
+    """Test that fetches for tracked locations are appended to the history."""
+    monkeypatch.setenv("HISTORY_DB_PATH", str(tmp_path / "history.db"))
+    mocker.patch("weather.models.weather_model.get_weather_data",
+                 return_value={"main": {"temp": 280.0}, "dt": START})
+    model = WeatherModel()
+    append = mocker.spy(model.history, "append")
+    model.add_location(*BU)
+    model.update_location(*BU)
+    model.get_weather(*LA)
+
+    assert append.call_count == 2, "Each fetch of a tracked location should be recorded once."
+    assert [row["temp"] for row in model.get_history(*BU, START, START + DAY)] == [280.0]
+    assert model.get_history(*LA, START, START + DAY) == []
+
+def test_weather_model_history_disabled(monkeypatch):
+    """Test that history lookups fail when no history database is configured."""
+    monkeypatch.delenv("HISTORY_DB_PATH", raising=False)
+    with pytest.raises(ValueError, match="Weather history is not enabled"):
+        WeatherModel().get_history(*BU, START, START + DAY)
+
+@pytest.mark.parametrize("start, end", [(START, float("inf")), (float("-inf"), START), (float("nan"), START)])
+def test_weather_model_history_non_finite_range(tmp_path, monkeypatch, start, end):
+    """Test that a non-finite range is rejected before it reaches the history store."""
+    monkeypatch.setenv("HISTORY_DB_PATH", str(tmp_path / "history.db"))
+    with pytest.raises(ValueError, match="must be finite"):
+        WeatherModel().get_history(*BU, start, end)
@@ -0,0 +1,34 @@
+import datetime
+import json
+
+from weather.utils.cache import CacheEntry
+from weather.utils.json_provider import dumps
+
+
+def test_dumps_matches_stdlib():
+    """Test that the fast encoder produces the same document as the standard library."""
+    payload = {"name": "Zürich", "main": {"temp": 281.5, "humidity": 80}, "weather": [{"id": 800}], "b": None}
+    encoded = dumps(payload)
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == payload
+    assert encoded == json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode()
+
+def test_dumps_handles_flask_types():
+    """Test that types the default Flask provider understands are still serialized."""
+    assert json.loads(dumps({"at": datetime.date(2024, 1, 2)})) == {"at": "Tue, 02 Jan 2024 00:00:00 GMT"}
+
+def test_provider_serializes_responses(app):
+    """Test that jsonify goes through the fast provider and stays readable by get_json."""
+    with app.test_request_context():
+        response = app.json.response({"status": "success", "count": 2})
+    assert response.mimetype == "application/json"
+    assert response.get_data() == b'{"count":2,"status":"success"}'
+    assert app.json.loads(response.get_data()) == {"count": 2, "status": "success"}
+
+def test_cache_entry_json_is_encoded_once(mocker):
+    """Test that an entry's JSON encoding is computed once and reused."""
+    spy = mocker.patch("weather.utils.cache.dumps", return_value=b'{"temp":1}')
+    entry = CacheEntry({"temp": 1}, 0, 10)
+    assert entry.json() == b'{"temp":1}'
+    assert entry.json() == b'{"temp":1}'
+    spy.assert_called_once()
@@ -0,0 +1,95 @@
+import logging
+
+from flask.logging import default_handler
+
+from weather.utils import logger as logger_module
+from weather.utils.logger import LogSampler, Truncated, configure_logger
+
+
+def test_configure_logger_is_idempotent():
+    """Test that configuring a logger twice attaches a single handler."""
+    logger = logging.getLogger("test_logger.idempotent")
+    configure_logger(logger)
+    configure_logger(logger)
+    assert logger.handlers == [logger_module._queue_handler]
+
+def test_configure_logger_removes_flask_default_handler():
+    """Test that Flask's synchronous handler is replaced by the queue handler."""
+    logger = logging.getLogger("test_logger.flask")
+    logger.addHandler(default_handler)
+    configure_logger(logger)
+    assert default_handler not in logger.handlers
+    assert logger_module._queue_handler in logger.handlers
+
+def test_configure_logger_levels_from_env(monkeypatch):
+    """Test that LOG_LEVELS overrides LOG_LEVEL for the named logger."""
+    monkeypatch.setenv("LOG_LEVEL", "info")
+    monkeypatch.setenv("LOG_LEVELS", "test_logger.quiet=WARNING, other=ERROR")
+    quiet = logging.getLogger("test_logger.quiet")
+    default = logging.getLogger("test_logger.default")
+    configure_logger(quiet)
+    configure_logger(default)
+    assert quiet.level == logging.WARNING
+    assert default.level == logging.INFO
+
+def test_records_are_formatted_off_the_calling_thread(mocker):
+    """Test that log calls enqueue the record without formatting its message."""
+    logger = logging.getLogger("test_logger.deferred")
+    configure_logger(logger)
+    payload = mocker.MagicMock()
+    enqueue = mocker.patch.object(logger_module._queue_handler, "enqueue")
+
+    logger.info("payload: %s", payload)
+
+    record = enqueue.call_args.args[0]
+    assert record.args == (payload,)
+    payload.__str__.assert_not_called()
+
+
+def test_truncated_caps_long_values():
+    """Test that long values are cut to the limit and report their full length."""
+    assert str(Truncated("x" * 20, limit=5)) == "xxxxx... (20 chars)"
+    assert str(Truncated({"a": 1}, limit=50)) == "{'a': 1}"
+
+def test_truncated_stops_rendering_at_limit():
+    """Test that a large payload is only rendered up to the limit, and a small one matches str()."""
+    class Item:
+        rendered = 0
+
+        def __repr__(self):
+            Item.rendered += 1
+            return "item"
+
+    payload = {"items": [Item() for _ in range(100000)], "name": "x" * 100000}
+    assert str(Truncated(payload, limit=50)).endswith("... (truncated)")
+    assert Item.rendered < 20
+
+    small = {"a": [1, "b", (2,), None], "c": {"d": 1.5}}
+    assert str(Truncated(small, limit=100)) == str(small)
+
+def test_truncated_is_not_rendered_below_level(mocker):
+    """Test that a payload logged below the logger's level is never rendered."""
+    logger = logging.getLogger("test_logger.truncated")
+    configure_logger(logger)
+    logger.setLevel(logging.INFO)
+    payload = mocker.MagicMock()
+    logger.debug("payload: %s", Truncated(payload))
+    payload.__str__.assert_not_called()
+
+def test_log_sampler_keeps_one_in_n():
+    """Test that a sampled key is logged on its first and every Nth occurrence."""
+    sampler = LogSampler({"get_weather": 3})
+    assert [sampler.should_log("get_weather") for _ in range(7)] == [True, False, False, True, False, False, True]
+    assert all(sampler.should_log("other") for _ in range(3))
+
+def test_log_sampler_rates_below_one_always_log(monkeypatch):
+    """Test that a rate of 0 or less is treated as 1 rather than failing the request."""
+    monkeypatch.setenv("LOG_SAMPLE_RATES", "get_weather=0,history=-5")
+    sampler = LogSampler()
+    assert sampler.rates == {"get_weather": 1, "history": 1}
+    assert all(sampler.should_log("get_weather") for _ in range(3))
+
+def test_log_sampler_rates_from_env(monkeypatch):
+    """Test that sampling rates are read from LOG_SAMPLE_RATES."""
+    monkeypatch.setenv("LOG_SAMPLE_RATES", "get_weather=100, healthcheck=10")
+    assert LogSampler().rates == {"get_weather": 100, "healthcheck": 10}
@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+
+from weather.utils.metrics import Registry, cache_samples, timed
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+def test_counter(registry):
+    """Test that a counter adds up per label set."""
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    requests.inc("/a")
+    requests.inc("/a", amount=2)
+    requests.inc("/b")
+    assert requests.value("/a") == 3
+    assert requests.value("/b") == 1
+    assert requests.value("/c") == 0
+
+def test_counter_wrong_labels(registry):
+    """Test that recording with the wrong number of labels is rejected."""
+    requests = registry.counter("requests_total", "Requests.", ("route", "method"))
+    with pytest.raises(ValueError, match="expects labels"):
+        requests.inc("/a")
+
+def test_counter_sums_threads(registry):
+    """Test that increments from many threads are all counted."""
+    requests = registry.counter("requests_total", "Requests.")
+
+    def work():
+        for _ in range(10000):
+            requests.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert requests.value() == 80000
+
+def test_finished_threads_are_retired(registry):
+    """Test that shards of finished threads are folded into a total rather than kept per thread."""
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    for _ in range(500):
+        thread = threading.Thread(target=requests.inc, args=("/a",))
+        thread.start()
+        thread.join()
+    requests.inc("/a")
+    assert len(requests._shards) <= 2
+    assert requests.value("/a") == 501
+
+def test_histogram_render(registry):
+    """Test that a histogram renders cumulative buckets, sum and count."""
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    latency.observe(0.05, "/a")
+    latency.observe(0.1, "/a")
+    latency.observe(0.5, "/a")
+    latency.observe(3, "/a")
+    lines = registry.render().splitlines()
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/a"} 3.65' in lines
+    assert 'latency_seconds_count{route="/a"} 4' in lines
+
+def test_timed(registry):
+    """Test that timed observes calls that return and calls that raise."""
+    latency = registry.histogram("op_seconds", "Operation time.", ("operation",))
+
+    @timed(latency, "fail")
+    def fail():
+        raise RuntimeError("boom")
+
+    with latency.time("block"):
+        pass
+    with pytest.raises(RuntimeError):
+        fail()
+    assert latency.count("block") == 1
+    assert latency.count("fail") == 1
+
+def test_register_returns_existing_metric(registry):
+    """Test that registering a name again returns the same metric, and conflicting definitions fail."""
+    first = registry.counter("requests_total", "Requests.", ("route",))
+    assert registry.counter("requests_total", "Requests.", ("route",)) is first
+    with pytest.raises(ValueError, match="already registered"):
+        registry.histogram("requests_total", "Requests.", ("route",))
+
+def test_collector_and_label_escaping(registry):
+    """Test that collectors are read at scrape time, replace one another by name, and labels are escaped."""
+    registry.register_collector("cache", lambda: cache_samples("old_cache", {}))
+    stats = {"hits": 3, "stale_hits": 1, "misses": 2, "evictions": 0, "size": 5, "max_entries": 10}
+    registry.register_collector("cache", lambda: cache_samples("cache", stats))
+    registry.counter("errors_total", "Errors.", ("type",)).inc('say "hi"\n')
+    text = registry.render()
+    assert 'cache_lookups_total{result="hit"} 3' in text
+    assert "cache_entries 5" in text
+    assert "old_cache" not in text
+    assert 'errors_total{type="say \\"hi\\"\\n"} 1' in text
+    assert text.endswith("\n")
+
+def test_metrics_route(client):
+    """Test that the metrics endpoint exposes request counts in the Prometheus text format."""
+    client.get("/api/health")
+    client.get("/api/does-not-exist")
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert 'http_requests_total{route="/api/health",method="GET",status="200"}' in text
+    assert 'http_requests_total{route="unmatched",method="GET",status="404"}' in text
+    assert 'http_request_duration_seconds_count{route="/api/health",method="GET"}' in text
+    assert "weather_tracked_locations 0" in text
+    assert "users_identity_cache_max_entries" in text
@@ -0,0 +1,106 @@
+import sqlite3
+import time
+
+import pytest
+
+from weather.models.refresh_scheduler import RefreshScheduler
+from weather.models.weather_model import WeatherModel
+
+BU = (42.3493, -71.1041)
+LA = (34.0522, -118.2437)
+
+@pytest.fixture()
+def weather_model(mocker):
+    """Fixture to provide a WeatherModel tracking two locations with a mocked upstream."""
+    mocker.patch("weather.models.weather_model.get_weather_data", return_value={"temp": 1})
+    model = WeatherModel()
+    model.add_location(*BU)
+    model.add_location(*LA)
+    return model
+
+def test_nothing_due(weather_model):
+    """Test that freshly fetched locations are not refreshed"""
+    scheduler = RefreshScheduler(weather_model, interval_seconds=0, lead_seconds=60)
+    assert scheduler.run_once() == 0
+
+def test_due_locations_are_refreshed(weather_model, mocker):
+    """Test that locations expiring within the lead time are refreshed"""
+    mock_fetch = mocker.patch("weather.models.weather_model.get_weather_data", return_value={"temp": 2})
+    weather_model._cache.peek(BU).expires_at = 0
+    scheduler = RefreshScheduler(weather_model, interval_seconds=0, lead_seconds=60)
+
+    assert scheduler.run_once() == 1
+    mock_fetch.assert_called_once_with(*BU)
+    assert weather_model.locations[BU] == {"temp": 2}
+    assert weather_model.locations[LA] == {"temp": 1}
+
+def test_start_and_stop(weather_model):
+    """Test that the scheduler thread starts and stops cleanly"""
+    scheduler = RefreshScheduler(weather_model, interval_seconds=60, lead_seconds=0)
+    scheduler.start()
+    scheduler.start()
+    scheduler.stop(timeout=1)
+    assert scheduler._thread is None
+
+def test_evicted_locations_are_not_refetched(weather_model, mocker):
+    """Test that a location whose cache entry was evicted waits out its TTL instead of being due every pass"""
+    mock_fetch = mocker.patch("weather.models.weather_model.get_weather_data", return_value={"temp": 2})
+    weather_model._cache.pop(BU)
+    scheduler = RefreshScheduler(weather_model, interval_seconds=0, lead_seconds=60)
+
+    assert scheduler.run_once() == 0
+    mock_fetch.assert_not_called()
+
+    weather_model._refreshed_at[BU] -= weather_model.ttl_seconds
+    assert scheduler.run_once() == 1
+    mock_fetch.assert_called_once_with(*BU)
+
+def test_refresh_errors_are_logged(weather_model, mocker):
+    """Test that an unexpected error from a refresh is logged and does not stop the pass"""
+    mocker.patch.object(weather_model, "refresh_location", side_effect=sqlite3.OperationalError("database is locked"))
+    mock_logger = mocker.patch("weather.models.refresh_scheduler.logger")
+    weather_model._cache.peek(BU).expires_at = 0
+    weather_model._cache.peek(LA).expires_at = 0
+    scheduler = RefreshScheduler(weather_model, interval_seconds=0, lead_seconds=60)
+
+    assert scheduler.run_once() == 2
+    assert mock_logger.error.call_count == 2
+    assert "database is locked" in str(mock_logger.error.call_args)
+    assert not scheduler._pending
+
+def test_passes_start_once_per_interval(weather_model, mocker):
+    """Test that the time a pass spends spacing out submissions counts towards the interval"""
+    starts = []
+
+    def run_once():
+        starts.append(time.monotonic())
+        time.sleep(0.15)
+        return 0
+
+    scheduler = RefreshScheduler(weather_model, interval_seconds=0.2, lead_seconds=60)
+    mocker.patch.object(scheduler, "run_once", side_effect=run_once)
+    scheduler.start()
+    deadline = time.monotonic() + 5
+    while len(starts) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    scheduler.stop(timeout=1)
+
+    assert starts[2] - starts[0] < 0.55, "Passes should start one interval apart, not an interval after the last ended."
+
+def test_only_lease_holder_refreshes(tmp_path, monkeypatch, mocker):
+    """Test that workers sharing a sqlite store refresh ahead one at a time"""
+    monkeypatch.setenv("WEATHER_STORE", "sqlite")
+    monkeypatch.setenv("WEATHER_STORE_PATH", str(tmp_path / "weather_store.db"))
+    mock_fetch = mocker.patch("weather.models.weather_model.get_weather_data", return_value={"temp": 1})
+    first, second = WeatherModel(), WeatherModel()
+    first.add_location(*BU)
+    first._cache.pop(BU)
+    first_scheduler = RefreshScheduler(first, interval_seconds=0, lead_seconds=60)
+    second_scheduler = RefreshScheduler(second, interval_seconds=0, lead_seconds=60)
+
+    assert first_scheduler.run_once() == 0, "Stored weather should not be due yet."
+    assert second_scheduler.run_once() == 0, "The lease holder should be the only worker refreshing."
+    first_scheduler.stop()
+    mock_fetch.reset_mock()
+    assert second_scheduler.run_once() == 1, "A released lease should be taken over."
+    mock_fetch.assert_called_once_with(*BU)
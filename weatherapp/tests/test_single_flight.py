@@ -0,0 +1,45 @@
+import threading
+import time
+
+import pytest
+
+from weather.utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_are_coalesced():
+    """Test that callers arriving while a call is in flight share its result."""
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def fn():
+        calls.append(1)
+        release.wait(timeout=5)
+        return "result"
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", fn))) for _ in range(5)]
+    threads[0].start()
+    while not flight.in_flight("key"):
+        time.sleep(0.001)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["result"] * 5
+    assert not flight.in_flight("key")
+
+def test_error_is_shared():
+    """Test that an error raised by the call is raised for the caller."""
+    flight = SingleFlight()
+
+    def fn():
+        raise RuntimeError("upstream failed")
+
+    with pytest.raises(RuntimeError, match="upstream failed"):
+        flight.do("key", fn)
+    assert not flight.in_flight("key")
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from weather.models.spatial_index import MAX_RADIUS_KM, SpatialIndex, haversine_km
+
+BU = (42.3493, -71.1041)
+MIT = (42.3601, -71.0942)
+LA = (34.0522, -118.2437)
+
+
+@pytest.fixture
+def index():
+    """Fixture to provide an index holding three locations."""
+    index = SpatialIndex(cell_degrees=0.25)
+    for location in (BU, MIT, LA):
+        index.add(location)
+    return index
+
+
+def test_haversine_km():
+    """Test the great-circle distance between Boston and Los Angeles."""
+    assert haversine_km(*BU, *LA) == pytest.approx(4170, rel=0.01)
+
+def test_nearest_within_radius(index):
+    """Test that the closest location within the radius is returned."""
+    location, distance = index.nearest(42.355, -71.10, radius_km=5)
+    assert location == BU
+    assert distance == pytest.approx(haversine_km(42.355, -71.10, *BU))
+
+def test_nearest_outside_radius(index):
+    """Test that nothing is returned when no location is within the radius."""
+    assert index.nearest(40.7128, -74.0060, radius_km=100) is None
+
+def test_nearest_across_antimeridian():
+    """Test that the search wraps around at +/-180 degrees longitude."""
+    index = SpatialIndex(cell_degrees=0.25)
+    index.add((0.0, 179.95))
+    location, _ = index.nearest(0.0, -179.95, radius_km=20)
+    assert location == (0.0, 179.95)
+
+def test_remove(index):
+    """Test that removed locations are no longer returned."""
+    index.remove(BU)
+    index.remove(BU)
+    assert index.nearest(*BU, radius_km=5)[0] == MIT
+    assert len(index) == 2
+
+def test_matches_linear_scan():
+    """Test that lookups agree with a brute-force scan."""
+    rng = random.Random(411)
+    points = [(rng.uniform(-80, 80), rng.uniform(-180, 180)) for _ in range(2000)]
+    index = SpatialIndex(cell_degrees=1.0)
+    for point in points:
+        index.add(point)
+
+    for _ in range(100):
+        lat, lon = rng.uniform(-80, 80), rng.uniform(-180, 180)
+        in_range = [(haversine_km(lat, lon, *p), p) for p in points if haversine_km(lat, lon, *p) <= 500]
+        expected = min(in_range)[1] if in_range else None
+        result = index.nearest(lat, lon, radius_km=500)
+        assert (result[0] if result else None) == expected
+
+def test_whole_earth_radius_is_bounded():
+    """Test that a radius past half the circumference is clamped, and an empty index answers at once."""
+    assert SpatialIndex(cell_degrees=0.25).nearest(0.0, 0.0, radius_km=1e308) is None
+
+    index = SpatialIndex(cell_degrees=0.25)
+    index.add((-10.0, 179.0))
+    location, distance = index.nearest(10.0, -1.0, radius_km=60000)
+    assert location == (-10.0, 179.0)
+    assert distance <= MAX_RADIUS_KM
+
+def test_near_pole_matches_linear_scan():
+    """Test that rings reaching past the pole skip the rows beyond it and still find the nearest location."""
+    rng = random.Random(7)
+    points = [(rng.uniform(80, 90), rng.uniform(-180, 180)) for _ in range(500)]
+    index = SpatialIndex(cell_degrees=1.0)
+    for point in points:
+        index.add(point)
+
+    for _ in range(50):
+        lat, lon = rng.uniform(85, 90), rng.uniform(-180, 180)
+        expected = min((haversine_km(lat, lon, *p), p) for p in points)
+        result = index.nearest(lat, lon, radius_km=300)
+        assert result is not None and result[0] == expected[1]
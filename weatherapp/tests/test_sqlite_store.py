@@ -0,0 +1,137 @@
+import pytest
+
+from weather.models.weather_model import WeatherModel
+from weather.utils.sqlite_store import SQLiteCache, SQLiteLease, SQLiteLocations
+
+BU = (42.3493, -71.1041)
+LA = (34.0522, -118.2437)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Fixture to provide a fresh SQLite file for each test."""
+    return str(tmp_path / "weather_store.db")
+
+
+def test_cache_is_shared(db_path):
+    """Test that an entry set through one cache is visible through another on the same file."""
+    SQLiteCache(db_path, ttl_seconds=60).set(BU, {"temp": 1})
+    other = SQLiteCache(db_path, ttl_seconds=60)
+    assert other.get(BU) == {"temp": 1}
+    assert other.stats()["hits"] == 1
+
+def test_cache_expiry_and_stale_window(db_path):
+    """Test that expired entries are only served through get_entry within the stale window."""
+    cache = SQLiteCache(db_path, ttl_seconds=0, stale_seconds=60)
+    cache.set(BU, {"temp": 1})
+    assert cache.get(BU) is None
+    entry = cache.get_entry(BU)
+    assert entry.value == {"temp": 1} and not entry.is_fresh()
+
+def test_cache_eviction(db_path):
+    """Test that the oldest entries are evicted when the cache is full."""
+    cache = SQLiteCache(db_path, max_entries=1)
+    cache.set(BU, {"temp": 1})
+    cache.set(LA, {"temp": 2})
+    assert len(cache) == 1 and LA in cache
+    assert cache.stats()["evictions"] == 1
+
+def test_cache_reuses_decoded_entries(db_path):
+    """Test that reads of the same fetch return the same entry, and a new fetch replaces it."""
+    cache = SQLiteCache(db_path, ttl_seconds=60)
+    cache.set(BU, {"temp": 1})
+    entry = cache.get_entry(BU)
+    assert cache.get_entry(BU) is entry
+    SQLiteCache(db_path, ttl_seconds=60).set(BU, {"temp": 2})
+    assert cache.get_entry(BU).value == {"temp": 2}
+
+
+def test_locations_mapping(db_path):
+    """Test that tracked locations behave like a dictionary shared across instances."""
+    locations = SQLiteLocations(db_path)
+    locations[BU] = {"temp": 1}
+    other = SQLiteLocations(db_path)
+    assert BU in other and other[BU] == {"temp": 1}
+    assert list(other) == [BU] and len(other) == 1
+    del other[BU]
+    assert BU not in locations
+    with pytest.raises(KeyError):
+        del locations[BU]
+
+def test_locations_version(db_path):
+    """Test that the shared version counts additions and removals, not updates."""
+    locations = SQLiteLocations(db_path)
+    assert locations.version()[0] == 0
+    locations[BU] = {"temp": 1}
+    locations[BU] = {"temp": 2}
+    assert SQLiteLocations(db_path).version()[0] == 1
+    del locations[BU]
+    assert locations.version()[0] == 2
+
+def test_locations_changes(db_path):
+    """Test that the shared change counter counts every write, updates included."""
+    locations = SQLiteLocations(db_path)
+    assert locations.changes() == 0
+    locations[BU] = {"temp": 1}
+    locations[BU] = {"temp": 2}
+    del locations[BU]
+    assert SQLiteLocations(db_path).changes() == 3
+
+
+def test_locations_page(db_path):
+    """Test that locations are paged in (lat, lon) order after a cursor."""
+    locations = SQLiteLocations(db_path)
+    for key in [(2.0, 1.0), (1.0, 5.0), (1.0, 2.0)]:
+        locations[key] = {}
+    assert locations.page(None, 2) == [(1.0, 2.0), (1.0, 5.0)]
+    assert locations.page((1.0, 5.0), 2) == [(2.0, 1.0)]
+
+
+def test_lease(db_path):
+    """Test that one holder at a time has a lease, and that it can be taken over once released or expired."""
+    first, second = SQLiteLease(db_path, "refresh-ahead"), SQLiteLease(db_path, "refresh-ahead")
+    assert first.acquire("a", 60)
+    assert first.acquire("a", 60), "The holder should be able to renew its lease."
+    assert not second.acquire("b", 60)
+    first.release("a")
+    assert second.acquire("b", -1)
+    assert first.acquire("a", 60), "An expired lease should be taken over."
+    assert not second.acquire("b", 60)
+
+def test_weather_model_sqlite_backend(db_path, monkeypatch, mocker):
+    """Test that two models on the same store share locations and cached weather."""
+    monkeypatch.setenv("WEATHER_STORE", "sqlite")
+    monkeypatch.setenv("WEATHER_STORE_PATH", db_path)
+    mock_fetch = mocker.patch("weather.models.weather_model.get_weather_data", return_value={"temp": 1})
+
+    first, second = WeatherModel(), WeatherModel()
+    first.add_location(*BU)
+    assert second.get_all_locations() == [BU]
+    assert second.get_weather(*BU) == {"temp": 1}
+    assert mock_fetch.call_count == 1
+
+def test_weather_model_sqlite_views_follow_other_workers(db_path, monkeypatch, mocker):
+    """Test that nearest-location and filter lookups see locations added, refreshed and removed by another model."""
+    monkeypatch.setenv("WEATHER_STORE", "sqlite")
+    monkeypatch.setenv("WEATHER_STORE_PATH", db_path)
+    mock_fetch = mocker.patch("weather.models.weather_model.get_weather_data",
+                              return_value={"main": {"temp": 280.0}})
+
+    first, second = WeatherModel(), WeatherModel()
+    first.add_location(*BU)
+    assert (second.find_nearest_location(*BU, 1)["lat"], second.filter_locations()[0]["temp"]) == (BU[0], 280.0)
+
+    mock_fetch.return_value = {"main": {"temp": 290.0}}
+    first.update_location(*BU)
+    assert second.filter_locations()[0]["temp"] == 290.0
+
+    first.remove_location(*BU)
+    assert second.filter_locations() == []
+    with pytest.raises(ValueError, match="No tracked location"):
+        second.find_nearest_location(*BU, 1)
+
+def test_weather_model_unknown_backend(monkeypatch):
+    """Test that an unknown store backend is rejected."""
+    monkeypatch.setenv("WEATHER_STORE", "redis")
+    with pytest.raises(ValueError, match="Unknown weather store backend: redis"):
+        WeatherModel()
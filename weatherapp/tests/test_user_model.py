@@ -1,6 +1,6 @@
 import pytest
 
-from weather.models.user_model import Users
+from weather.models.user_model import DB_LATENCY, Users
 
 
 @pytest.fixture
@@ -112,3 +112,131 @@ def test_get_id_by_username_user_not_found(session):
     """
     with pytest.raises(ValueError, match="User nonexistentuser not found"):
         Users.get_id_by_username("nonexistentuser")
+
+
+##########################################################
+# Identity Cache
+##########################################################
+
+def test_get_by_username_is_cached(session, sample_user, mocker):
+    """Test that a user is only queried once while cached."""
+    Users.create_user(**sample_user)
+    first = Users.get_by_username(sample_user["username"])
+    query = mocker.patch.object(Users, "query")
+    second = Users.get_by_username(sample_user["username"])
+    assert second is first, "Cached lookup should return the same user object."
+    query.filter_by.assert_not_called()
+    assert first.username == sample_user["username"]
+
+def test_db_timings(session, sample_user):
+    """Test that database work on the Users paths is timed, and identity cache hits are not."""
+    before = {op: DB_LATENCY.count(op) for op in ("create_user", "get_by_username", "update_password", "delete_user")}
+    Users.create_user(**sample_user)
+    Users.get_by_username(sample_user["username"])
+    Users.get_by_username(sample_user["username"])
+    Users.update_password(sample_user["username"], "newpassword")
+    Users.delete_user(sample_user["username"])
+    for op, count in before.items():
+        assert DB_LATENCY.count(op) == count + 1, f"Expected one timed {op} query."
+
+def test_get_by_username_not_found(session):
+    """Test that an unknown username returns None."""
+    assert Users.get_by_username("nonexistentuser") is None
+
+def test_authenticate(session, sample_user):
+    """Test authenticating with a correct and an incorrect password."""
+    Users.create_user(**sample_user)
+    user = Users.authenticate(sample_user["username"], sample_user["password"])
+    assert user is not None and user.username == sample_user["username"]
+    assert Users.authenticate(sample_user["username"], "wrongpassword") is None
+
+def test_authenticate_reads_database(session, sample_user):
+    """Test that a password changed behind the identity cache (e.g. by another worker) takes effect at once."""
+    Users.create_user(**sample_user)
+    assert Users.authenticate(sample_user["username"], sample_user["password"]) is not None
+    salt, hashed_password = Users._generate_hashed_password("changedelsewhere")
+    session.query(Users).filter_by(username=sample_user["username"]).update({"salt": salt, "password": hashed_password})
+    session.commit()
+    assert Users.authenticate(sample_user["username"], sample_user["password"]) is None
+    assert Users.authenticate(sample_user["username"], "changedelsewhere") is not None
+
+def test_authenticate_deleted_elsewhere(session, sample_user):
+    """Test that a user deleted behind the identity cache can no longer log in."""
+    Users.create_user(**sample_user)
+    assert Users.get_by_username(sample_user["username"]) is not None
+    session.query(Users).filter_by(username=sample_user["username"]).delete()
+    session.commit()
+    with pytest.raises(ValueError, match="not found"):
+        Users.authenticate(sample_user["username"], sample_user["password"])
+
+def test_update_password_invalidates_identity(session, sample_user):
+    """Test that a cached identity is dropped when the password changes."""
+    Users.create_user(**sample_user)
+    assert Users.check_password(sample_user["username"], sample_user["password"])
+    Users.update_password(sample_user["username"], "newpassword456")
+    assert Users.check_password(sample_user["username"], "newpassword456")
+    assert not Users.check_password(sample_user["username"], sample_user["password"])
+
+def test_delete_user_invalidates_identity(session, sample_user):
+    """Test that a cached identity is dropped when the user is deleted."""
+    Users.create_user(**sample_user)
+    assert Users.get_by_username(sample_user["username"]) is not None
+    Users.delete_user(sample_user["username"])
+    assert Users.get_by_username(sample_user["username"]) is None
+
+
+##########################################################
+# Bulk Creation
+##########################################################
+
+def test_bulk_create(session):
+    """Test creating users across several batches."""
+    rows = [(f"user{i}", f"password{i}") for i in range(5)]
+    results = Users.bulk_create(iter(rows), batch_size=2)
+    assert [result["status"] for result in results] == ["created"] * 5
+    assert session.query(Users).count() == 5
+    assert Users.check_password("user3", "password3")
+
+def test_bulk_create_reports_duplicates_and_invalid_rows(session, sample_user):
+    """Test that duplicate and invalid rows are reported without aborting the import."""
+    Users.create_user(**sample_user)
+    rows = [
+        (sample_user["username"], "otherpassword"),
+        ("newuser", "password1"),
+        ("newuser", "password2"),
+        ("", "password3"),
+        ("nopassword", ""),
+    ]
+    results = Users.bulk_create(rows, batch_size=2)
+    assert [result["status"] for result in results] == ["duplicate", "created", "duplicate", "invalid", "invalid"]
+    assert session.query(Users).count() == 2
+    assert Users.check_password("newuser", "password1")
+    assert Users.check_password(sample_user["username"], sample_user["password"])
+
+def test_create_users_route_rejects_non_string_rows(client, session):
+    """Test that rows with a non-string username or password are reported invalid and the rest are created."""
+    response = client.put("/api/create-users", json={"users": [
+        {"username": 123, "password": "pw"},
+        {"username": "bob", "password": 5},
+        {"username": ["carol"], "password": "pw"},
+        {"username": "dave", "password": "pw"},
+    ]})
+    assert response.status_code == 201
+    assert [result["status"] for result in response.json["results"]] == ["invalid", "invalid", "invalid", "created"]
+    assert session.query(Users).count() == 1
+    assert Users.check_password("dave", "pw")
+
+def test_bulk_create_invalid_batch_size(session):
+    """Test that a non-positive batch size is rejected."""
+    with pytest.raises(ValueError, match="batch_size must be at least 1"):
+        Users.bulk_create([("user", "password")], batch_size=0)
+
+def test_import_users_cli(app, tmp_path):
+    """Test importing users from a CSV file through the CLI."""
+    csv_file = tmp_path / "users.csv"
+    csv_file.write_text("username,password\nalice,pw1\nbob,pw2\nalice,pw3\n")
+    result = app.test_cli_runner().invoke(args=["import-users", str(csv_file), "--batch-size", "2"])
+    assert result.exit_code == 0, result.output
+    assert "Created 2 of 3 users" in result.output
+    assert "line 4: duplicate user 'alice'" in result.output
+    assert Users.check_password("bob", "pw2")
@@ -1,3 +1,6 @@
+import sqlite3
+import threading
+
 import pytest
 
 from weather.models.weather_model import WeatherModel
@@ -47,6 +50,51 @@ def test_remove_location(weather_model, mock_weather_api):
     weather_model.remove_location(BU[0], BU[1])
     assert len(weather_model.locations) == 0
 
+def test_locations_version(weather_model, mock_weather_api):
+    """Test that the locations version changes on add and remove but not on update"""
+    initial, _ = weather_model.get_locations_version()
+    weather_model.add_location(BU[0], BU[1])
+    added, _ = weather_model.get_locations_version()
+    weather_model.update_location(BU[0], BU[1])
+    assert weather_model.get_locations_version()[0] == added
+    weather_model.remove_location(BU[0], BU[1])
+    assert len({initial, added, weather_model.get_locations_version()[0]}) == 3
+
+def test_get_locations_page(weather_model, mock_weather_api):
+    """Test paging through locations in (lat, lon) order with a cursor"""
+    weather_model.add_location(BU[0], BU[1])
+    weather_model.add_location(LA[0], LA[1])
+    weather_model.add_location(10.0, 20.0)
+    page, after = weather_model.get_locations_page(limit=2)
+    assert page == [(10.0, 20.0), LA]
+    assert after == LA
+    page, after = weather_model.get_locations_page(after, limit=2)
+    assert page == [BU]
+    assert after is None
+
+def test_get_locations_page_after_removal(weather_model, mock_weather_api):
+    """Test that removing the cursor's location does not disturb the next page"""
+    weather_model.add_location(BU[0], BU[1])
+    weather_model.add_location(LA[0], LA[1])
+    weather_model.add_location(10.0, 20.0)
+    _, after = weather_model.get_locations_page(limit=2)
+    weather_model.remove_location(*LA)
+    assert weather_model.get_locations_page(after, limit=2) == ([BU], None)
+
+def test_concurrent_add_is_paged_once(weather_model, mock_weather_api):
+    """Test that a location recorded as added twice, as by two racing adds, is paged once"""
+    weather_model.add_location(BU[0], BU[1])
+    weather_model._locations_changed(BU, added=True)
+    assert weather_model.get_locations_page(limit=10) == ([BU], None)
+
+def test_iter_locations_with_weather(weather_model, mock_weather_api):
+    """Test iterating over every location with its weather, across pages"""
+    weather_model.add_location(BU[0], BU[1])
+    weather_model.add_location(LA[0], LA[1])
+    rows = list(weather_model.iter_locations(include_weather=True, batch_size=1))
+    assert [row["location"] for row in rows] == [LA, BU]
+    assert rows[0]["weather"] == mock_weather_api
+
 def test_remove_location_empty(weather_model, mock_weather_api):
     """Test trying to remove a location from model thats empty"""
     with pytest.raises(ValueError, match="Locations dictionray is empty"):
@@ -79,3 +127,229 @@ def test_update_location_inv(weather_model, mock_weather_api):
     """Test updating a location that does not exist in the list of locations"""
     with pytest.raises(ValueError, match=r"Location \(42\.3493.*-71\.1041\) not found"):
         weather_model.update_location(BU[0], BU[1])
+
+def test_get_weather_cached(weather_model, mocker):
+    """Test that repeated lookups for the same location are served from the cache"""
+    mock_fetch = mocker.patch("weather.models.weather_model.get_weather_data", return_value={"lat": BU[0]})
+    weather_model.get_weather(BU[0], BU[1])
+    weather_model.get_weather(BU[0], BU[1])
+    assert mock_fetch.call_count == 1
+    stats = weather_model.get_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+def test_get_weather_cache_expired(weather_model, mocker):
+    """Test that an expired cache entry is fetched again"""
+    mock_fetch = mocker.patch("weather.models.weather_model.get_weather_data", return_value={"lat": BU[0]})
+    weather_model._cache.ttl_seconds = 0
+    weather_model._cache.stale_seconds = 0
+    weather_model.get_weather(BU[0], BU[1])
+    weather_model.get_weather(BU[0], BU[1])
+    assert mock_fetch.call_count == 2
+
+def test_update_location_refreshes_cache(weather_model, mocker):
+    """Test that updating a location bypasses the cache and stores the new data"""
+    mock_fetch = mocker.patch("weather.models.weather_model.get_weather_data", return_value={"temp": 1})
+    weather_model.add_location(BU[0], BU[1])
+    mock_fetch.return_value = {"temp": 2}
+    weather_model.update_location(BU[0], BU[1])
+    assert weather_model.locations[BU] == {"temp": 2}
+    assert weather_model.get_weather(BU[0], BU[1]) == {"temp": 2}
+    assert mock_fetch.call_count == 2
+
+def test_validate_location_quantizes(weather_model):
+    """Test that nearby coordinates are canonicalized to the same key"""
+    weather_model.coord_precision = 3
+    assert weather_model.validate_location(42.3493, -71.1041) == weather_model.validate_location(42.3494, -71.1040)
+    assert weather_model.validate_location("42.3493", "-71.1041") == (42.349, -71.104)
+
+def test_nearby_locations_share_cache(weather_model, mocker):
+    """Test that slightly different GPS fixes are served from one cache entry"""
+    mock_fetch = mocker.patch("weather.models.weather_model.get_weather_data", return_value={"lat": BU[0]})
+    weather_model.coord_precision = 3
+    weather_model.get_weather(42.3493, -71.1041)
+    weather_model.get_weather(42.3494, -71.1040)
+    assert mock_fetch.call_count == 1
+    mock_fetch.assert_called_with(42.349, -71.104)
+
+def test_get_weather_batch(weather_model, mocker):
+    """Test fetching a batch of locations with cache hits, misses and invalid input"""
+    mock_fetch = mocker.patch("weather.models.weather_model.get_weather_data", side_effect=lambda lat, lon: {"lat": lat})
+    weather_model.get_weather(BU[0], BU[1])
+    results = weather_model.get_weather_batch([BU, LA, INV, LA])
+    assert results[0] == {"lat": BU[0]}
+    assert results[1] == results[3] == {"lat": LA[0]}
+    assert isinstance(results[2], ValueError)
+    assert mock_fetch.call_count == 2
+
+def test_get_weather_batch_serves_stale_entries(weather_model, mocker):
+    """Test that a batch serves stale cached weather and refreshes it in the background"""
+    mock_fetch = mocker.patch("weather.models.weather_model.get_weather_data", return_value={"temp": 1})
+    weather_model.get_weather(BU[0], BU[1])
+    entry = weather_model._cache.peek(BU)
+    entry.expires_at = 0
+    weather_model._cache.stale_seconds = float("inf")
+    revalidate = mocker.patch.object(weather_model, "_revalidate")
+    assert weather_model.get_weather_batch([BU]) == [{"temp": 1}]
+    revalidate.assert_called_once_with(BU)
+    assert mock_fetch.call_count == 1
+
+def test_update_all_locations(weather_model, mocker):
+    """Test refreshing every tracked location with one failing upstream call"""
+    mock_fetch = mocker.patch("weather.models.weather_model.get_weather_data", return_value={"temp": 1})
+    weather_model.add_location(BU[0], BU[1])
+    weather_model.add_location(LA[0], LA[1])
+
+    def fetch(lat, lon):
+        if (lat, lon) == LA:
+            raise RuntimeError("OpenWeather API request timed out")
+        return {"temp": 2}
+    mock_fetch.side_effect = fetch
+
+    reports = {(r["lat"], r["lon"]): r for r in weather_model.update_all_locations()}
+    assert reports[BU]["status"] == "success" and "latency_ms" in reports[BU]
+    assert reports[LA]["status"] == "error" and "timed out" in reports[LA]["error"]
+    assert weather_model.locations[BU] == {"temp": 2}
+    assert weather_model.locations[LA] == {"temp": 1}
+
+def test_update_all_locations_unexpected_error(weather_model, mocker):
+    """Test that an unexpected error refreshing one location is reported instead of failing the whole update"""
+    mocker.patch("weather.models.weather_model.get_weather_data", return_value={"temp": 1})
+    weather_model.add_location(BU[0], BU[1])
+    weather_model.add_location(LA[0], LA[1])
+    refresh = weather_model.refresh_location
+
+    def refresh_location(location):
+        if location == LA:
+            raise sqlite3.OperationalError("database is locked")
+        return refresh(location)
+    mocker.patch.object(weather_model, "refresh_location", side_effect=refresh_location)
+
+    reports = {(r["lat"], r["lon"]): r for r in weather_model.update_all_locations()}
+    assert reports[BU]["status"] == "success"
+    assert reports[LA] == {"lat": LA[0], "lon": LA[1], "status": "error", "error": "database is locked"}
+
+def test_update_all_locations_empty(weather_model):
+    """Test refreshing all locations on an empty model"""
+    with pytest.raises(ValueError, match="Locations dictionray is empty"):
+        weather_model.update_all_locations()
+
+def test_get_weather_stale_while_revalidate(weather_model, mocker):
+    """Test that a stale entry is served immediately while a fresh copy is fetched in the background"""
+    mock_fetch = mocker.patch("weather.models.weather_model.get_weather_data", return_value={"temp": 1})
+    weather_model.get_weather(BU[0], BU[1])
+    weather_model._cache.peek(BU).expires_at = 0
+    weather_model._cache.stale_seconds = float("inf")
+    mock_fetch.return_value = {"temp": 2}
+
+    entry = weather_model.get_weather_entry(BU[0], BU[1])
+    assert entry.value == {"temp": 1} and not entry.is_fresh()
+
+    weather_model._revalidator.shutdown(wait=True)
+    assert mock_fetch.call_count == 2
+    assert weather_model.get_weather(BU[0], BU[1]) == {"temp": 2}
+
+def test_get_weather_past_stale_window(weather_model, mocker):
+    """Test that an entry past the stale window is fetched synchronously"""
+    mock_fetch = mocker.patch("weather.models.weather_model.get_weather_data", return_value={"temp": 1})
+    weather_model.get_weather(BU[0], BU[1])
+    weather_model._cache.peek(BU).expires_at = 0
+    mock_fetch.return_value = {"temp": 2}
+
+    assert weather_model.get_weather(BU[0], BU[1]) == {"temp": 2}
+
+def test_compact_locations(mocker, monkeypatch, mock_weather_api):
+    """Test that tracked locations are stored as compact records when enabled"""
+    monkeypatch.setenv("COMPACT_LOCATIONS", "true")
+    weather_model = WeatherModel()
+    weather_model.add_location(BU[0], BU[1])
+    assert weather_model.locations[BU].temp == 285.32
+    assert weather_model.get_location_weather(BU[0], BU[1]) == mock_weather_api
+
+def test_get_location_weather_not_found(weather_model):
+    """Test getting stored weather for a location that is not tracked"""
+    with pytest.raises(ValueError, match=r"Location \(42\.3493.*-71\.1041\) not found"):
+        weather_model.get_location_weather(BU[0], BU[1])
+
+def test_filter_locations(weather_model, mocker):
+    """Test that the columnar view follows adds and removes"""
+    mocker.patch("weather.models.weather_model.get_weather_data",
+                 side_effect=lambda lat, lon: {"main": {"temp": 300.0 if lat == LA[0] else 280.0}})
+    weather_model.add_location(BU[0], BU[1])
+    weather_model.add_location(LA[0], LA[1])
+    rows = weather_model.filter_locations([("temp", "gt", 290.0)])
+    assert [(row["lat"], row["lon"]) for row in rows] == [LA]
+
+    weather_model.remove_location(LA[0], LA[1])
+    assert weather_model.filter_locations([("temp", "gt", 290.0)]) == []
+
+def test_find_nearest_location(weather_model, mock_weather_api):
+    """Test finding the nearest tracked location within a radius"""
+    weather_model.add_location(BU[0], BU[1])
+    weather_model.add_location(LA[0], LA[1])
+    nearest = weather_model.find_nearest_location(42.36, -71.10, 5)
+    assert (nearest["lat"], nearest["lon"]) == BU
+
+    weather_model.remove_location(BU[0], BU[1])
+    with pytest.raises(ValueError, match="No tracked location within 5 km"):
+        weather_model.find_nearest_location(42.36, -71.10, 5)
+
+@pytest.mark.parametrize("radius_km", [0, -1, float("inf"), float("nan")])
+def test_find_nearest_location_invalid_radius(weather_model, mock_weather_api, radius_km):
+    """Test that a radius that is not finite and positive is rejected, for both nearest lookups"""
+    weather_model.add_location(BU[0], BU[1])
+    with pytest.raises(ValueError, match="finite positive"):
+        weather_model.find_nearest_location(42.36, -71.10, radius_km)
+    with pytest.raises(ValueError, match="finite positive"):
+        weather_model.get_weather_entry(42.36, -71.10, nearest_km=radius_km)
+
+def test_get_weather_from_nearest(weather_model, mocker):
+    """Test serving the cached weather of a nearby tracked location instead of calling upstream"""
+    mock_fetch = mocker.patch("weather.models.weather_model.get_weather_data", return_value={"temp": 1})
+    weather_model.add_location(BU[0], BU[1])
+    entry = weather_model.get_weather_entry(42.36, -71.10, nearest_km=5)
+    assert entry.key == BU and entry.value == {"temp": 1}
+    assert mock_fetch.call_count == 1
+
+    weather_model.get_weather(LA[0], LA[1], nearest_km=5)
+    assert mock_fetch.call_count == 2
+
+def test_get_weather_in_bbox(weather_model, mock_weather_api):
+    """Test getting the weather of tracked locations inside a bounding box"""
+    weather_model.add_location(BU[0], BU[1])
+    weather_model.add_location(LA[0], LA[1])
+    results = weather_model.get_weather_in_bbox(40, -75, 45, -70)
+    assert results == [{"lat": BU[0], "lon": BU[1], "weather": mock_weather_api}]
+
+    cells = weather_model.get_weather_in_bbox(30, -120, 45, -70, grid=(2, 2))
+    assert sum(cell["count"] for cell in cells) == 2
+
+def test_get_weather_in_bbox_invalid(weather_model):
+    """Test rejecting inverted boxes and oversized grids"""
+    with pytest.raises(ValueError, match="must not be greater than max_lat"):
+        weather_model.get_weather_in_bbox(45, -75, 40, -70)
+    with pytest.raises(ValueError, match="Grid must have between 1 and"):
+        weather_model.get_weather_in_bbox(40, -75, 45, -70, grid=(1000, 1000))
+
+def test_refresh_racing_removal_does_not_restore(weather_model, mock_weather_api, mocker):
+    """Test that a removal racing a refresh's store is not undone by it"""
+    weather_model.add_location(BU[0], BU[1])
+    store = weather_model._store_location
+    removal = threading.Thread(target=weather_model.remove_location, args=BU)
+
+    def store_while_removing(location, weather_data):
+        removal.start()
+        removal.join(0.1)
+        store(location, weather_data)
+
+    mocker.patch.object(weather_model, "_store_location", side_effect=store_while_removing)
+    weather_model.refresh_location(BU)
+    removal.join()
+    assert BU not in weather_model.locations
+    assert BU not in weather_model.columns
+    assert weather_model.spatial_index.nearest(BU[0], BU[1], 1) is None
+    assert weather_model.get_locations_page(limit=10) == ([], None)
+
+def test_revalidate_workers_configurable(monkeypatch):
+    """Test that the background revalidation pool is sized from REVALIDATE_WORKERS"""
+    monkeypatch.setenv("REVALIDATE_WORKERS", "2")
+    assert WeatherModel()._revalidator._max_workers == 2
@@ -0,0 +1,45 @@
+import pytest
+
+from weather.models.weather_record import WeatherRecord
+
+CURRENT_WEATHER = {
+    "coord": {"lon": -71.1041, "lat": 42.3493},
+    "weather": [{"id": 800, "main": "Clear", "description": "clear sky", "icon": "01d"}],
+    "main": {"temp": 285.32, "feels_like": 284.1, "pressure": 1012, "humidity": 54},
+    "wind": {"speed": 4.1, "deg": 250},
+    "dt": 1700000000,
+    "name": "Boston",
+}
+
+
+@pytest.fixture
+def record():
+    return WeatherRecord.from_payload(CURRENT_WEATHER)
+
+
+def test_from_payload(record):
+    """Test that the served fields are extracted from a current weather response."""
+    assert record.to_dict() == {
+        "temp": 285.32,
+        "humidity": 54,
+        "pressure": 1012,
+        "wind_speed": 4.1,
+        "wind_deg": 250,
+        "conditions": "clear sky",
+        "timestamp": 1700000000,
+    }
+
+def test_payload_is_lossless(record):
+    """Test that the full payload can be recovered from the record."""
+    assert record.payload() == CURRENT_WEATHER
+
+def test_from_one_call_payload():
+    """Test that One Call responses with a "current" block are understood."""
+    record = WeatherRecord.from_payload({"current": {"temp": 280.0, "humidity": 40, "wind_speed": 2.5,
+                                                     "dt": 1, "weather": [{"description": "mist"}]}})
+    assert record.temp == 280.0 and record.wind_speed == 2.5 and record.conditions == "mist"
+    assert record.pressure is None
+
+def test_record_has_no_dict(record):
+    """Test that records are slotted."""
+    assert not hasattr(record, "__dict__")
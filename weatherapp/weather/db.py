@@ -1,3 +1,74 @@
+import os
+import sqlite3
+
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+
+db = SQLAlchemy()
+
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", 5))
+
+
+def sqlite_pragmas() -> dict:
+    """
+    Returns the pragmas applied to every new SQLite connection in production.
+
+    WAL lets logins read while another connection writes, and synchronous=NORMAL is durable in WAL mode
+    except for the last transactions before a power loss. A negative cache_size is in KiB.
+
+    Returns:
+        dict: The pragma names and values, read from the environment.
+    """
+    return {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", 16384)),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 128 * 1024 * 1024)),
+        "temp_store": "MEMORY",
+    }
+
+
+def engine_options(database_uri: str) -> dict:
+    """
+    Returns the SQLALCHEMY_ENGINE_OPTIONS for a database.
+
+    SQLite gets a busy timeout so writers queue instead of failing. Server databases get a sized
+    connection pool that recycles connections before the server drops them and checks them on checkout.
+
+    Args:
+        database_uri (str): The SQLAlchemy database URI.
+
+    Returns:
+        dict: Keyword arguments for create_engine.
+    """
+    if database_uri.startswith("sqlite"):
+        return {"connect_args": {"timeout": SQLITE_BUSY_TIMEOUT}}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 20)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": True,
+    }
+
+
+def configure_engine(app: Flask) -> None:
+    """
+    Applies the app's SQLITE_PRAGMAS to every connection its engine opens.
+
+    Must be called inside an app context, before the engine opens its first connection.
+
+    Args:
+        app (Flask): The application whose engine is configured.
+    """
+    pragmas = app.config.get("SQLITE_PRAGMAS")
+    if not pragmas or db.engine.dialect.name != "sqlite":
+        return
 
-db = SQLAlchemy()
\ No newline at end of file
+    @event.listens_for(db.engine, "connect")
+    def apply_pragmas(dbapi_connection: sqlite3.Connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
@@ -0,0 +1,241 @@
+import logging
+import math
+import threading
+from typing import Iterable, Optional
+
+import numpy as np
+
+from weather.utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+Location = tuple[float, float]
+
+OPERATORS = {
+    "gt": np.greater,
+    "gte": np.greater_equal,
+    "lt": np.less,
+    "lte": np.less_equal,
+}
+
+
+class ColumnarLocationStore:
+    """
+    Parallel NumPy arrays holding the served weather fields of every tracked location.
+
+    Each location occupies one row across all columns. Rows are updated in place, and removing a location
+    moves the last row into its slot, so the arrays stay dense and every query is a handful of vectorized
+    operations over them. Missing values are stored as NaN and never match a filter.
+    """
+
+    COLUMNS = ("lat", "lon", "temp", "humidity", "wind_speed", "fetched_at")
+
+    def __init__(self, capacity: int = 1024):
+        """Initializes an empty store.
+
+        Args:
+            capacity (int): The number of rows allocated up front; the arrays double when full.
+        """
+        self._columns = {name: np.full(max(1, capacity), np.nan) for name in self.COLUMNS}
+        self._rows: dict[Location, int] = {}
+        self._keys: list[Location] = []
+        self._lock = threading.Lock()
+
+    def upsert(self, location: Location, fields: dict, fetched_at: float) -> None:
+        """Inserts or updates the row of a location.
+
+        Args:
+            location (Location): The (lat, lon) key of the location.
+            fields (dict): The weather fields, as returned by WeatherRecord.extract_fields.
+            fetched_at (float): When the weather data was fetched.
+        """
+        values = {
+            "lat": location[0],
+            "lon": location[1],
+            "temp": fields.get("temp"),
+            "humidity": fields.get("humidity"),
+            "wind_speed": fields.get("wind_speed"),
+            "fetched_at": fetched_at,
+        }
+        with self._lock:
+            row = self._rows.get(location)
+            if row is None:
+                row = len(self._keys)
+                if row == len(self._columns["lat"]):
+                    self._grow()
+                self._rows[location] = row
+                self._keys.append(location)
+            for name, value in values.items():
+                self._columns[name][row] = np.nan if value is None else value
+
+    def remove(self, location: Location) -> None:
+        """Removes the row of a location, if present, by moving the last row into its slot.
+
+        Args:
+            location (Location): The (lat, lon) key of the location.
+        """
+        with self._lock:
+            row = self._rows.pop(location, None)
+            if row is None:
+                return
+            last = len(self._keys) - 1
+            last_location = self._keys.pop()
+            if row != last:
+                for column in self._columns.values():
+                    column[row] = column[last]
+                self._keys[row] = last_location
+                self._rows[last_location] = row
+            for column in self._columns.values():
+                column[last] = np.nan
+
+    def query(self, conditions: Iterable[tuple[str, str, float]] = (), sort_by: Optional[str] = None,
+              descending: bool = False, limit: Optional[int] = None) -> list[dict]:
+        """Returns the rows matching every condition.
+
+        Args:
+            conditions (Iterable[tuple[str, str, float]]): (column, operator, value) triples, where the
+                operator is one of "gt", "gte", "lt" or "lte".
+            sort_by (str, optional): The column to sort the matches by.
+            descending (bool): Whether to sort in descending order.
+            limit (int, optional): The maximum number of rows to return, at least 1.
+
+        Returns:
+            list[dict]: One dictionary of column values per matching location. Missing values are None.
+
+        Raises:
+            ValueError: If a column or operator is unknown, or the limit is less than 1.
+        """
+        conditions = list(conditions)
+        for column, op, _ in conditions:
+            self._check_column(column)
+            if op not in OPERATORS:
+                raise ValueError(f"Unknown operator '{op}', expected one of {', '.join(OPERATORS)}")
+        if sort_by is not None:
+            self._check_column(sort_by)
+        if limit is not None and limit < 1:
+            raise ValueError(f"limit must be at least 1, got {limit}")
+
+        with self._lock:
+            size = len(self._keys)
+            columns = {name: column[:size] for name, column in self._columns.items()}
+            mask = np.ones(size, dtype=bool)
+            for column, op, value in conditions:
+                mask &= OPERATORS[op](columns[column], value)
+            rows = np.flatnonzero(mask)
+            if sort_by is not None:
+                # Negating for descending order keeps rows with missing values last either way
+                sort_values = columns[sort_by][rows]
+                rows = rows[np.argsort(-sort_values if descending else sort_values, kind="stable")]
+            if limit is not None:
+                rows = rows[:limit]
+            selected = {name: column[rows].tolist() for name, column in columns.items()}
+
+        return [
+            {name: (None if math.isnan(value) else value) for name, value in zip(self.COLUMNS, values)}
+            for values in zip(*(selected[name] for name in self.COLUMNS))
+        ]
+
+    def in_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> list[Location]:
+        """Returns the locations inside a bounding box.
+
+        A box whose min_lon is greater than its max_lon crosses the antimeridian.
+
+        Args:
+            min_lat (float): The southern edge of the box.
+            min_lon (float): The western edge of the box.
+            max_lat (float): The northern edge of the box.
+            max_lon (float): The eastern edge of the box.
+
+        Returns:
+            list[Location]: The (lat, lon) keys of the locations inside the box, edges included.
+        """
+        with self._lock:
+            size = len(self._keys)
+            mask, _, _ = self._bbox_mask(size, min_lat, min_lon, max_lat, max_lon)
+            return [self._keys[row] for row in np.flatnonzero(mask)]
+
+    def grid(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+             rows: int, cols: int) -> list[dict]:
+        """Aggregates the locations inside a bounding box onto a rows x cols grid.
+
+        Args:
+            min_lat (float): The southern edge of the box.
+            min_lon (float): The western edge of the box.
+            max_lat (float): The northern edge of the box.
+            max_lon (float): The eastern edge of the box.
+            rows (int): The number of grid rows, south to north.
+            cols (int): The number of grid columns, west to east.
+
+        Returns:
+            list[dict]: One dictionary per non-empty cell with its row, col, center lat and lon, the number
+                of locations in it and the mean temp, humidity and wind_speed (None if no location has one).
+        """
+        with self._lock:
+            size = len(self._keys)
+            mask, lon_offset, width = self._bbox_mask(size, min_lat, min_lon, max_lat, max_lon)
+            lats = self._columns["lat"][:size][mask]
+            lon_offset = lon_offset[mask]
+            values = {name: self._columns[name][:size][mask] for name in ("temp", "humidity", "wind_speed")}
+
+        height = max_lat - min_lat
+        cells = self._bin(lats - min_lat, height, rows) * cols + self._bin(lon_offset, width, cols)
+        counts = np.bincount(cells, minlength=rows * cols)
+
+        means = {}
+        for name, column in values.items():
+            valid = ~np.isnan(column)
+            sums = np.bincount(cells[valid], weights=column[valid], minlength=rows * cols)
+            present = np.bincount(cells[valid], minlength=rows * cols)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means[name] = np.where(present > 0, sums / present, np.nan)
+
+        result = []
+        for cell in np.flatnonzero(counts):
+            row, col = divmod(int(cell), cols)
+            center_lon = min_lon + (col + 0.5) * width / cols
+            result.append({
+                "row": row,
+                "col": col,
+                "lat": min_lat + (row + 0.5) * height / rows,
+                "lon": center_lon - 360 if center_lon > 180 else center_lon,
+                "count": int(counts[cell]),
+                **{f"{name}_mean": (None if np.isnan(mean[cell]) else float(mean[cell])) for name, mean in means.items()},
+            })
+        return result
+
+    @staticmethod
+    def _bin(offsets: np.ndarray, extent: float, bins: int) -> np.ndarray:
+        """Maps non-negative offsets within an extent onto bin indexes 0..bins-1."""
+        if extent <= 0:
+            return np.zeros(len(offsets), dtype=int)
+        return np.clip((offsets / extent * bins).astype(int), 0, bins - 1)
+
+    def _bbox_mask(self, size: int, min_lat: float, min_lon: float, max_lat: float,
+                   max_lon: float) -> tuple[np.ndarray, np.ndarray, float]:
+        """Returns the rows inside a box, each row's longitude offset east of min_lon, and the box width.
+
+        Caller holds the lock.
+        """
+        width = max_lon - min_lon if max_lon >= min_lon else max_lon - min_lon + 360
+        lats = self._columns["lat"][:size]
+        lon_offset = (self._columns["lon"][:size] - min_lon) % 360
+        mask = (lats >= min_lat) & (lats <= max_lat) & (lon_offset <= width)
+        return mask, lon_offset, width
+
+    def _check_column(self, column: str) -> None:
+        if column not in self._columns:
+            raise ValueError(f"Unknown column '{column}', expected one of {', '.join(self.COLUMNS)}")
+
+    def _grow(self) -> None:
+        """Doubles the capacity of every column. Caller holds the lock."""
+        for name, column in self._columns.items():
+            grown = np.full(len(column) * 2, np.nan)
+            grown[:len(column)] = column
+            self._columns[name] = grown
+
+    def __contains__(self, location: object) -> bool:
+        return location in self._rows
+
+    def __len__(self) -> int:
+        return len(self._keys)
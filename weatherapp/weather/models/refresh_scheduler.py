@@ -0,0 +1,131 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from weather.models.weather_model import WeatherModel
+from weather.utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class RefreshScheduler:
+    """
+    Re-fetches tracked locations in the background shortly before their cached weather expires.
+
+    Every interval the scheduler asks the model which locations expire within the lead time and
+    refreshes them on a bounded worker pool. Submissions are spaced out across the interval so a
+    batch of locations that expire together does not turn into a burst of upstream requests.
+
+    When workers share a sqlite store, each pass first takes the model's refresh lease, so only one
+    worker refreshes at a time and another takes over if it stops.
+    """
+
+    def __init__(self, weather_model: WeatherModel, interval_seconds: float = 30,
+                 lead_seconds: float = 300, max_concurrency: int = 4):
+        """Initializes the scheduler without starting it.
+
+        Args:
+            weather_model (WeatherModel): The model whose tracked locations are refreshed.
+            interval_seconds (float): How often to look for locations that are due.
+            lead_seconds (float): How long before expiry a location is refreshed.
+            max_concurrency (int): The maximum number of refreshes running at once.
+        """
+        self.weather_model = weather_model
+        self.interval_seconds = interval_seconds
+        self.lead_seconds = lead_seconds
+        self.max_concurrency = max_concurrency
+        self._pending: set[tuple[float, float]] = set()
+        self._pending_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lease_holder = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def start(self) -> None:
+        """Starts the background thread. Calling start on a running scheduler does nothing."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        logger.info("Starting refresh-ahead scheduler (interval %ss, lead %ss, concurrency %d)",
+                    self.interval_seconds, self.lead_seconds, self.max_concurrency)
+        max_entries = self.weather_model.max_cache_entries
+        if len(self.weather_model.locations) > max_entries:
+            logger.warning("Tracking more locations than the weather cache holds (CACHE_MAX_ENTRIES=%d); "
+                           "evicted locations are refreshed once per TTL", max_entries)
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="weather-refresh")
+        self._thread = threading.Thread(target=self._run, name="weather-refresh-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stops the background thread and waits for running refreshes to finish.
+
+        Args:
+            timeout (float, optional): How long to wait for the scheduler thread to exit.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.weather_model.release_refresh_lease(self._lease_holder)
+        logger.info("Refresh-ahead scheduler stopped")
+
+    def run_once(self) -> int:
+        """Schedules a refresh for every location that is due and not already being refreshed.
+
+        Returns:
+            int: The number of refreshes scheduled, 0 if another worker holds the refresh lease.
+        """
+        # The lease outlives a pass, which takes up to one interval, with room for a slow pass
+        if not self.weather_model.acquire_refresh_lease(self._lease_holder, max(3 * self.interval_seconds, 60)):
+            return 0
+        with self._pending_lock:
+            due = [location for location in self.weather_model.get_locations_due_for_refresh(self.lead_seconds)
+                   if location not in self._pending]
+            self._pending.update(due)
+        if not due:
+            return 0
+
+        logger.debug("Scheduling refresh of %d locations", len(due))
+        spacing = self.interval_seconds / len(due)
+        for i, location in enumerate(due):
+            if i and self._stop.wait(spacing):
+                with self._pending_lock:
+                    self._pending.difference_update(due[i:])
+                return i
+            self._submit(location)
+        return len(due)
+
+    def _submit(self, location: tuple[float, float]) -> None:
+        """Refreshes a location on the worker pool, or inline if the scheduler is not running."""
+        if self._executor is None:
+            self._refresh(location)
+        else:
+            self._executor.submit(self._refresh, location)
+
+    def _refresh(self, location: tuple[float, float]) -> None:
+        # Upstream failures are reported by refresh_location; this catches the rest, which the pool would swallow
+        try:
+            self.weather_model.refresh_location(location)
+        except Exception as e:
+            logger.error("Refresh of location %s failed: %s", location, e)
+        finally:
+            with self._pending_lock:
+                self._pending.discard(location)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error("Refresh-ahead pass failed: %s", e)
+            # A pass spaces its submissions across the interval, so only wait for what is left of it
+            self._stop.wait(max(0.0, self.interval_seconds - (time.monotonic() - started)))
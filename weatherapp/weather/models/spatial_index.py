@@ -0,0 +1,134 @@
+import math
+import threading
+from typing import Optional
+
+Location = tuple[float, float]
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Half the Earth's circumference; every point is within this distance of every other
+MAX_RADIUS_KM = math.pi * EARTH_RADIUS_KM
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Returns the great-circle distance between two points in kilometers."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex:
+    """
+    A grid index over tracked locations for nearest-neighbour lookups by haversine distance.
+
+    Locations are bucketed into fixed-size lat/lon cells. A query only visits the cells in rings around
+    the query point, nearest ring first, and stops once no unvisited cell can hold a closer location,
+    so its cost depends on the search radius and local density rather than on the number of locations.
+    A search whose rings would cover more cells than hold locations scans the occupied cells instead.
+    """
+
+    def __init__(self, cell_degrees: float = 0.25):
+        """Initializes an empty index.
+
+        Args:
+            cell_degrees (float): The width and height of a grid cell in degrees.
+
+        Raises:
+            ValueError: If cell_degrees is not positive.
+        """
+        if cell_degrees <= 0:
+            raise ValueError(f"cell_degrees must be positive, got {cell_degrees}")
+        self.cell_degrees = cell_degrees
+        self._lon_cells = math.ceil(360 / cell_degrees)
+        self._lat_cells = math.ceil(180 / cell_degrees)
+        self._cells: dict[tuple[int, int], set[Location]] = {}
+        self._lock = threading.Lock()
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return (math.floor((lat + 90) / self.cell_degrees),
+                math.floor((lon + 180) / self.cell_degrees) % self._lon_cells)
+
+    def add(self, location: Location) -> None:
+        """Adds a location to the index. Adding a location twice has no effect."""
+        with self._lock:
+            self._cells.setdefault(self._cell(*location), set()).add(location)
+
+    def remove(self, location: Location) -> None:
+        """Removes a location from the index if it is present."""
+        cell = self._cell(*location)
+        with self._lock:
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.discard(location)
+                if not bucket:
+                    del self._cells[cell]
+
+    def nearest(self, lat: float, lon: float, radius_km: float) -> Optional[tuple[Location, float]]:
+        """Finds the indexed location closest to a point, within a radius.
+
+        Args:
+            lat (float): Latitude of the query point.
+            lon (float): Longitude of the query point.
+            radius_km (float): The maximum distance in kilometers. Values past MAX_RADIUS_KM are treated as it.
+
+        Returns:
+            tuple: The nearest location and its distance in kilometers, or None if none is within the radius.
+        """
+        radius_km = min(radius_km, MAX_RADIUS_KM)
+        ci, cj = self._cell(lat, lon)
+        cell_km = self.cell_degrees * KM_PER_DEGREE
+        # Cells shrink east-west towards the poles, so size the search for the most poleward latitude it reaches
+        max_lat = min(90.0, abs(lat) + radius_km / KM_PER_DEGREE + self.cell_degrees)
+        cos_lat = math.cos(math.radians(max_lat))
+        lat_rings = min(self._lat_cells, math.ceil(radius_km / cell_km))
+        half_lon = self._lon_cells // 2
+        lon_rings = half_lon if cos_lat < 1e-9 else min(half_lon, math.ceil(radius_km / (cell_km * cos_lat)))
+
+        best: Optional[tuple[Location, float]] = None
+        seen: set[tuple[int, int]] = set()
+        with self._lock:
+            if (2 * lat_rings + 1) * (2 * lon_rings + 1) > len(self._cells):
+                return self._scan(lat, lon, radius_km)
+            for ring in range(max(lat_rings, lon_rings) + 1):
+                # Every cell in this ring is at least (ring - 1) cells away from the query point
+                if best is not None and best[1] <= (ring - 1) * cell_km * cos_lat:
+                    break
+                for di, dj in self._ring_offsets(ring, lat_rings, lon_rings):
+                    # Rows past the poles hold nothing; the row at lat 90 is self._lat_cells
+                    if not 0 <= ci + di <= self._lat_cells:
+                        continue
+                    cell = (ci + di, (cj + dj) % self._lon_cells)
+                    if cell in seen:
+                        continue
+                    seen.add(cell)
+                    for location in self._cells.get(cell, ()):
+                        distance = haversine_km(lat, lon, *location)
+                        if distance <= radius_km and (best is None or distance < best[1]):
+                            best = (location, distance)
+        return best
+
+    def _scan(self, lat: float, lon: float, radius_km: float) -> Optional[tuple[Location, float]]:
+        """Checks every indexed location. Caller holds the lock."""
+        best: Optional[tuple[Location, float]] = None
+        for bucket in self._cells.values():
+            for location in bucket:
+                distance = haversine_km(lat, lon, *location)
+                if distance <= radius_km and (best is None or distance < best[1]):
+                    best = (location, distance)
+        return best
+
+    @staticmethod
+    def _ring_offsets(ring: int, lat_rings: int, lon_rings: int):
+        """Yields the (lat, lon) cell offsets on the perimeter of a ring, clipped to the search extent."""
+        di_max, dj_max = min(ring, lat_rings), min(ring, lon_rings)
+        for di in range(-di_max, di_max + 1):
+            if abs(di) == ring:
+                yield from ((di, dj) for dj in range(-dj_max, dj_max + 1))
+            elif ring <= lon_rings:
+                yield from ((di, -ring), (di, ring))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(bucket) for bucket in self._cells.values())
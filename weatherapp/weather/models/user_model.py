@@ -1,17 +1,39 @@
 import hashlib
 import logging
 import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Optional
 
 from flask_login import UserMixin
+from sqlalchemy import insert
 from sqlalchemy.exc import IntegrityError
 
 from weather.db import db
+from weather.utils.cache import TTLCache
 from weather.utils.logger import configure_logger
+from weather.utils.metrics import REGISTRY, cache_samples, timed
 
 
 logger = logging.getLogger(__name__)
 configure_logger(logger)
 
+# Detached Users objects by username, so authenticated requests do not each query the database.
+# Entries are invalidated when a user's password changes or the user is deleted; across worker
+# processes the TTL bounds how long a stale identity can be served.
+_identity_cache = TTLCache(
+    max_entries=int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", 4096)),
+    ttl_seconds=float(os.getenv("IDENTITY_CACHE_TTL", 300)),
+)
+
+# Time spent in the database only; password hashing and identity cache hits are not included
+DB_LATENCY = REGISTRY.histogram(
+    "users_db_query_duration_seconds",
+    "Time spent on users table queries and commits, by Users operation.",
+    ("operation",),
+)
+REGISTRY.register_collector("identity_cache", lambda: cache_samples("users_identity_cache", _identity_cache.stats()))
+
 
 class Users(db.Model, UserMixin):
     __tablename__ = 'users'
@@ -51,8 +73,10 @@ class Users(db.Model, UserMixin):
         salt, hashed_password = cls._generate_hashed_password(password)
         new_user = cls(username=username, salt=salt, password=hashed_password)
         try:
-            db.session.add(new_user)
-            db.session.commit()
+            with DB_LATENCY.time("create_user"):
+                db.session.add(new_user)
+                db.session.commit()
+            cls.invalidate_identity(username)
             logger.info("User successfully added to the database: %s", username)
         except IntegrityError:
             db.session.rollback()
@@ -63,6 +87,120 @@ class Users(db.Model, UserMixin):
             logger.error("Database error: %s", str(e))
             raise
 
+    @classmethod
+    def bulk_create(cls, rows: Iterable[tuple[str, str]], batch_size: int = 1000,
+                    hash_workers: int = 1) -> list[dict]:
+        """
+        Create many users, one transaction per batch.
+
+        Rows are consumed lazily, so a generator over a large file is read one batch at a time.
+        Rows with a missing username or password, or a username that already exists (in the database
+        or earlier in the input), are reported and skipped rather than aborting the import.
+
+        Args:
+            rows (Iterable[tuple[str, str]]): (username, password) pairs.
+            batch_size (int): The number of rows inserted per transaction.
+            hash_workers (int): The number of processes used to hash passwords. With 1, passwords
+                are hashed in this process.
+
+        Returns:
+            list[dict]: One dictionary per row, in input order, with the username and a status of
+                "created", "duplicate" or "invalid". Rows whose username or password is missing, empty or
+                not a string, or whose username is too long, are invalid.
+
+        Raises:
+            ValueError: If batch_size or hash_workers is less than 1.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+        if hash_workers < 1:
+            raise ValueError(f"hash_workers must be at least 1, got {hash_workers}")
+
+        rows = iter(rows)
+        results = []
+        seen = set()
+        pool = ProcessPoolExecutor(max_workers=hash_workers) if hash_workers > 1 else None
+        try:
+            while batch := list(islice(rows, batch_size)):
+                results.extend(cls._create_batch(batch, seen, pool))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        created = sum(result["status"] == "created" for result in results)
+        logger.info("Bulk import created %d of %d users", created, len(results))
+        return results
+
+    @classmethod
+    def _create_batch(cls, batch: list[tuple[str, str]], seen: set[str],
+                      pool: Optional[ProcessPoolExecutor]) -> list[dict]:
+        """Inserts one batch of bulk_create rows in a single transaction."""
+        results = []
+        pending = []
+        for username, password in batch:
+            if (not isinstance(username, str) or not isinstance(password, str) or not username or not password
+                    or len(username) > cls.username.type.length):
+                results.append({"username": username, "status": "invalid"})
+            elif username in seen:
+                results.append({"username": username, "status": "duplicate"})
+            else:
+                seen.add(username)
+                result = {"username": username, "status": "created"}
+                results.append(result)
+                pending.append((result, password))
+
+        usernames = [result["username"] for result, _ in pending]
+        existing = set()
+        if usernames:
+            with DB_LATENCY.time("bulk_create_lookup"):
+                existing = {
+                    username for (username,) in
+                    db.session.query(cls.username).filter(cls.username.in_(usernames))
+                }
+        pending = [(result, password) for result, password in pending if result["username"] not in existing]
+        for result in results:
+            if result["status"] == "created" and result["username"] in existing:
+                result["status"] = "duplicate"
+        if not pending:
+            return results
+
+        passwords = [password for _, password in pending]
+        hashed = list(pool.map(cls._generate_hashed_password, passwords, chunksize=64) if pool
+                      else map(cls._generate_hashed_password, passwords))
+        values = [
+            {"username": result["username"], "salt": salt, "password": hashed_password}
+            for (result, _), (salt, hashed_password) in zip(pending, hashed)
+        ]
+        try:
+            with DB_LATENCY.time("bulk_create"):
+                cls._insert_rows(pending, values)
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Database error: %s", str(e))
+            raise
+
+        for result, _ in pending:
+            cls.invalidate_identity(result["username"])
+        return results
+
+    @classmethod
+    def _insert_rows(cls, pending: list[tuple[dict, str]], values: list[dict]) -> None:
+        """Inserts a batch of hashed rows, marking the ones whose username was taken meanwhile as duplicates."""
+        try:
+            db.session.execute(insert(cls), values)
+            db.session.commit()
+        except IntegrityError:
+            # Another writer took one of the usernames since the check; fall back to one row at a time
+            db.session.rollback()
+            logger.warning("Batch insert hit a duplicate username, retrying %d rows individually", len(values))
+            for (result, _), row in zip(pending, values):
+                try:
+                    db.session.execute(insert(cls), [row])
+                    db.session.commit()
+                except IntegrityError:
+                    db.session.rollback()
+                    result["status"] = "duplicate"
+
     @classmethod
     def check_password(cls, username: str, password: str) -> bool:
         """
@@ -78,14 +216,80 @@ class Users(db.Model, UserMixin):
         Raises:
             ValueError: If the user does not exist.
         """
-        user = cls.query.filter_by(username=username).first()
+        return cls.authenticate(username, password) is not None
+
+    @classmethod
+    def authenticate(cls, username: str, password: str) -> Optional["Users"]:
+        """
+        Look up a user and check their password in a single query.
+
+        The identity cache is only local to this process, so the salt and hash are always read from the
+        database; a password changed or a user deleted through another worker takes effect at once.
+        The row read is used to refresh the identity cache.
+
+        Args:
+            username (str): The username of the user.
+            password (str): The password to check.
+
+        Returns:
+            Users: The user if the password is correct, None otherwise.
+
+        Raises:
+            ValueError: If the user does not exist.
+        """
+        user = cls._load(username, "authenticate")
         if not user:
             logger.info("User %s not found", username)
             raise ValueError(f"User {username} not found")
         hashed_password = hashlib.sha256((password + user.salt).encode()).hexdigest()
-        return hashed_password == user.password
+        return user if hashed_password == user.password else None
+
+    @classmethod
+    def get_by_username(cls, username: str) -> Optional["Users"]:
+        """
+        Retrieve a user by username through the identity cache.
+
+        Users loaded from the database are detached from the session before being cached,
+        so the same object can be handed to later requests.
+
+        Args:
+            username (str): The username of the user.
+
+        Returns:
+            Users: The user, or None if no user has that username.
+        """
+        user = _identity_cache.get(username)
+        if user is None:
+            user = cls._load(username, "get_by_username")
+        return user
+
+    @classmethod
+    def _load(cls, username: str, operation: str) -> Optional["Users"]:
+        """Reads a user from the database and stores it, detached, in the identity cache."""
+        with DB_LATENCY.time(operation):
+            user = cls.query.filter_by(username=username).first()
+        if user:
+            db.session.expunge(user)
+            _identity_cache.set(username, user)
+        else:
+            _identity_cache.pop(username)
+        return user
+
+    @staticmethod
+    def invalidate_identity(username: Optional[str] = None) -> None:
+        """
+        Drop a user, or every user, from the identity cache.
+
+        Args:
+            username (str, optional): The username to drop. If omitted, the whole cache is cleared.
+        """
+        if username is None:
+            _identity_cache.clear()
+        else:
+            _identity_cache.pop(username)
 
     @classmethod
+    @timed(DB_LATENCY, "delete_user")
     def delete_user(cls, username: str) -> None:
         """
         Delete a user from the database.
@@ -102,6 +306,7 @@ class Users(db.Model, UserMixin):
             raise ValueError(f"User {username} not found")
         db.session.delete(user)
         db.session.commit()
+        cls.invalidate_identity(username)
         logger.info("User %s deleted successfully", username)
 
     def get_id(self) -> str:
@@ -114,6 +319,7 @@ class Users(db.Model, UserMixin):
         return self.username
 
     @classmethod
+    @timed(DB_LATENCY, "get_id_by_username")
     def get_id_by_username(cls, username: str) -> int:
         """
         Retrieve the ID of a user by username.
@@ -134,6 +340,7 @@ class Users(db.Model, UserMixin):
         return user.id
 
     @classmethod
+    @timed(DB_LATENCY, "update_password")
     def update_password(cls, username: str, new_password: str) -> None:
         """
         Update the password for a user.
@@ -154,4 +361,5 @@ class Users(db.Model, UserMixin):
         user.salt = salt
         user.password = hashed_password
         db.session.commit()
+        cls.invalidate_identity(username)
         logger.info("Password updated successfully for user: %s", username)
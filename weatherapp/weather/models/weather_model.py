@@ -1,14 +1,28 @@
 import logging
 import os
+import bisect
+import math
+import threading
 import time
-from typing import Dict
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, Union
 
-from weather.utils.api_utils import get_weather_data
+from weather.models.columnar_store import ColumnarLocationStore
+from weather.models.spatial_index import MAX_RADIUS_KM, SpatialIndex
+from weather.models.weather_record import WeatherRecord
+from weather.utils.api_utils import get_weather_data, get_weather_data_many
+from weather.utils.cache import CacheEntry, TTLCache
+from weather.utils.history_store import HistoryStore
 from weather.utils.logger import configure_logger
+from weather.utils.single_flight import SingleFlight
+from weather.utils.sqlite_store import SQLiteCache, SQLiteLease, SQLiteLocations
 
 logger = logging.getLogger(__name__)
 configure_logger(logger)
 
+MAX_GRID_CELLS = 10000
+
 
 class WeatherModel:
     """
@@ -19,11 +33,86 @@ class WeatherModel:
         """Initializes the WeatherModel with an empty dictionary of locations and caching.
 
         The TTL (Time To Live) for weather caching is set to a default value from the environment variable "TTL",
-        which defaults to 1 hour if not set.
+        which defaults to 1 hour if not set. The cache holds at most "CACHE_MAX_ENTRIES" coordinates
+        (default 1024) and evicts the least recently used one when full.
+
+        Coordinates are rounded to "COORD_PRECISION" decimal places (default 4, roughly 11 meters) so nearby
+        GPS fixes share one entry in both the cache and the locations dictionary.
+
+        Expired entries are still served for "STALE_WHILE_REVALIDATE" seconds (default 300) while a fresh copy
+        is fetched in the background; past that window a lookup waits for upstream.
+
+        "WEATHER_STORE" selects where the cache and the tracked locations live: "memory" (the default) keeps
+        them in this process, "sqlite" shares them with every worker through the file at "WEATHER_STORE_PATH".
+        Tracked locations are indexed on a grid of "SPATIAL_CELL_DEGREES" (default 0.25) for nearest-location lookups.
+        Each worker keeps its own index and columnar view; with the sqlite backend they are rebuilt on the next
+        lookup after another worker changes the shared locations.
+
+        With the memory backend, "COMPACT_LOCATIONS=true" stores tracked locations as compact WeatherRecords
+        instead of raw OpenWeather dictionaries.
+
+        If "HISTORY_DB_PATH" is set, every observation fetched for a tracked location is also appended to a
+        downsampled history in that SQLite file.
+
+        Raises:
+            ValueError: If "WEATHER_STORE" names an unknown backend.
         """
-        self.locations: dict[(float, float), dict] = {}
-        self._ttl: dict[str, float] = {}
         self.ttl_seconds = int(os.getenv("TTL", 3600))  # Default TTL is 1 hour
+        self.max_cache_entries = int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+        self.coord_precision = int(os.getenv("COORD_PRECISION", 4))
+        self.stale_seconds = int(os.getenv("STALE_WHILE_REVALIDATE", 300))
+        self.store_backend = os.getenv("WEATHER_STORE", "memory").lower()
+        self.compact_locations = False
+        if self.store_backend == "memory":
+            self.locations: dict[(float, float), Union[dict, WeatherRecord]] = {}
+            self.compact_locations = os.getenv("COMPACT_LOCATIONS", "false").lower() == "true"
+            self._cache = TTLCache(max_entries=self.max_cache_entries, ttl_seconds=self.ttl_seconds,
+                                   stale_seconds=self.stale_seconds)
+            self._refresh_lease = None
+        elif self.store_backend == "sqlite":
+            path = os.getenv("WEATHER_STORE_PATH", "weather_store.db")
+            logger.info("Sharing weather cache and locations through %s", path)
+            self.locations = SQLiteLocations(path)
+            self._cache = SQLiteCache(path, max_entries=self.max_cache_entries, ttl_seconds=self.ttl_seconds,
+                                      stale_seconds=self.stale_seconds)
+            # Every worker sees the same locations and cache, so only one of them should refresh ahead
+            self._refresh_lease = SQLiteLease(path, "refresh-ahead")
+        else:
+            raise ValueError(f"Unknown weather store backend: {self.store_backend}")
+
+        history_path = os.getenv("HISTORY_DB_PATH")
+        self.history: Optional[HistoryStore] = None
+        if history_path:
+            self.history = HistoryStore(
+                history_path,
+                raw_retention=float(os.getenv("HISTORY_RAW_RETENTION", 2 * 86400)),
+                hourly_retention=float(os.getenv("HISTORY_HOURLY_RETENTION", 30 * 86400)),
+                downsample_interval=float(os.getenv("HISTORY_DOWNSAMPLE_INTERVAL", 600)),
+            )
+            self.history.start()
+
+        # Columnar view of the tracked locations for vectorized queries, kept in step with self.locations
+        self.spatial_cell_degrees = float(os.getenv("SPATIAL_CELL_DEGREES", 0.25))
+        self._views_lock = threading.Lock()
+        self._views_changes = None
+        self.columns, self.spatial_index = ColumnarLocationStore(), SpatialIndex(cell_degrees=self.spatial_cell_degrees)
+        self._sync_views()
+        # Bumped whenever a location is added or removed; the token keeps versions of different processes apart
+        self._locations_version = 0
+        self._locations_modified_at = time.time()
+        self._locations_token = uuid.uuid4().hex[:8]
+        # The memory backend's keys in (lat, lon) order, for cursor pagination; sqlite pages by primary key
+        self._sorted_locations = [] if isinstance(self.locations, SQLiteLocations) else sorted(self.locations)
+        self._locations_lock = threading.Lock()
+        # Held while a location is stored or removed, so a refresh that finishes after a removal cannot re-add it
+        self._membership_lock = threading.Lock()
+        self._in_flight = SingleFlight()
+        # When each tracked location's weather was last stored, so an evicted cache entry does not make it due
+        self._refreshed_at: dict[tuple[float, float], float] = {}
+        self._revalidating: set[tuple[float, float]] = set()
+        self._revalidating_lock = threading.Lock()
+        self._revalidator = ThreadPoolExecutor(max_workers=int(os.getenv("REVALIDATE_WORKERS", 4)),
+                                               thread_name_prefix="weather-revalidate")
 
     def add_location(self, lat: float, lon: float) -> None:
         """
@@ -36,14 +125,17 @@ class WeatherModel:
         Raises:
             ValueError: If the location is invalid or already exists.
         """
-        logger.info(f"Received request to add location with coordinates ({lat}, {lon})")
-        self.validate_location(lat, lon)
-        location = (float(lat), float(lon))
+        logger.info("Received request to add location with coordinates (%s, %s)", lat, lon)
+        location = self.validate_location(lat, lon)
         if location in self.locations:
             raise ValueError(f"Location ({lat}, {lon}) already exists")
-        weather_data = self.get_weather(lat, lon)
-        self.locations[location] = weather_data
-        logger.info(f"Successfully added location ({lat}, {lon})")
+        weather_data = self.get_weather(*location)
+        with self._membership_lock:
+            if location in self.locations:
+                raise ValueError(f"Location ({lat}, {lon}) already exists")
+            self._store_location(location, weather_data)
+            self._locations_changed(location, added=True)
+        logger.info("Successfully added location (%s, %s)", lat, lon)
 
     def remove_location(self, lat: float, lon: float) -> None:
         """
@@ -56,16 +148,20 @@ class WeatherModel:
         Raises:
             ValueError: If the location is not found or model is empty.
         """
-        logger.info(f"Received request to remove location with coordinates ({lat}, {lon})")
+        logger.info("Received request to remove location with coordinates (%s, %s)", lat, lon)
         self.check_if_empty()
-        self.validate_location(lat, lon)
-        location = (float(lat), float(lon))
-        if location not in self.locations:
-            raise ValueError(f"Location ({lat}, {lon}) not found")
-        del self.locations[location]
-        logger.info(f"Successfully removed location ({lat}, {lon})")
+        location = self.validate_location(lat, lon)
+        with self._membership_lock:
+            if location not in self.locations:
+                raise ValueError(f"Location ({lat}, {lon}) not found")
+            del self.locations[location]
+            self._refreshed_at.pop(location, None)
+            self.columns.remove(location)
+            self.spatial_index.remove(location)
+            self._locations_changed(location, added=False)
+        logger.info("Successfully removed location (%s, %s)", lat, lon)
 
-    def validate_location(self, lat: float, lon: float) -> None:
+    def validate_location(self, lat: float, lon: float) -> tuple[float, float]:
         """
         Validates the given latitude and longitude values to ensure they are within valid geographic ranges.
 
@@ -73,6 +169,9 @@ class WeatherModel:
             lat (float): Latitude value to validate, must be between -90 and 90.
             lon (float): Longitude value to validate, must be between -180 and 180.
 
+        Returns:
+            tuple[float, float]: The canonical (lat, lon) key, rounded to the configured coordinate precision.
+
         Raises:
             ValueError: If either latitude or longitude is not a valid number or is out of range.
 
@@ -84,8 +183,28 @@ class WeatherModel:
             if not (-180 <= lon <= 180):
                 raise ValueError(f"Longitude {lon} out of range (-180 to 180)")
         except (ValueError, TypeError) as e:
-            logger.error(f"Invalid location: ({lat}, {lon}) - {e}")
+            logger.error("Invalid location: (%s, %s) - %s", lat, lon, e)
             raise ValueError(f"Invalid location: ({lat}, {lon}) - {e}")
+        # Adding 0.0 folds -0.0 into 0.0 so both render as the same key
+        return (round(lat, self.coord_precision) + 0.0, round(lon, self.coord_precision) + 0.0)
+
+    @staticmethod
+    def validate_radius(radius_km: float) -> float:
+        """
+        Validates a search radius, clamping it to half the Earth's circumference.
+
+        Args:
+            radius_km (float): The radius in kilometers.
+
+        Returns:
+            float: The radius, at most MAX_RADIUS_KM.
+
+        Raises:
+            ValueError: If the radius is not a finite positive number.
+        """
+        if not (isinstance(radius_km, (int, float)) and math.isfinite(radius_km) and radius_km > 0):
+            raise ValueError(f"Radius {radius_km} must be a finite positive number of kilometers")
+        return min(float(radius_km), MAX_RADIUS_KM)
 
     def check_if_empty(self) -> None:
         """
@@ -111,6 +230,98 @@ class WeatherModel:
         self.check_if_empty()
         return [l for l in self.locations.keys()]
 
+    def get_locations_version(self) -> tuple[str, float]:
+        """ Get a version of the set of tracked locations and the time it last changed.
+
+        The version changes whenever a location is added or removed, so it can serve as an ETag for the
+        list of locations. With the sqlite backend it is shared by every worker.
+
+        Returns:
+            tuple[str, float]: An opaque version string and the time of the last change in epoch seconds.
+        """
+        if isinstance(self.locations, SQLiteLocations):
+            version, modified_at = self.locations.version()
+            return str(version), modified_at
+        with self._locations_lock:
+            return f"{self._locations_token}.{self._locations_version}", self._locations_modified_at
+
+    def get_locations_page(self, after: Optional[tuple[float, float]] = None, limit: int = 100,
+                           include_weather: bool = False) -> tuple[list, Optional[tuple[float, float]]]:
+        """ Get a page of tracked locations in (lat, lon) order.
+
+        Pages are keyed by the last location of the previous page rather than by offset, so adding or
+        removing locations between requests never skips or repeats the others.
+
+        Args:
+            after (tuple[float, float], optional): Only return locations after this one.
+            limit (int): The maximum number of locations to return.
+            include_weather (bool): Whether to include each location's stored weather data.
+
+        Returns:
+            tuple: The page, as (lat, lon) tuples or, with include_weather, dictionaries with the location
+                and its weather, and the location to pass as after for the next page, or None on the last page.
+
+        Raises:
+            ValueError: If limit is less than 1.
+        """
+        if limit < 1:
+            raise ValueError(f"limit must be at least 1, got {limit}")
+        if isinstance(self.locations, SQLiteLocations):
+            keys = self.locations.page(after, limit + 1)
+        else:
+            with self._locations_lock:
+                start = 0 if after is None else bisect.bisect_right(self._sorted_locations, tuple(after))
+                keys = self._sorted_locations[start:start + limit + 1]
+        next_after = keys[limit - 1] if len(keys) > limit else None
+        keys = keys[:limit]
+        if not include_weather:
+            return keys, next_after
+
+        rows = []
+        for location in keys:
+            value = self.locations.get(location)
+            if value is None:
+                continue  # Removed since the keys were read
+            rows.append({
+                "location": location,
+                "weather": value.payload() if isinstance(value, WeatherRecord) else value,
+            })
+        return rows, next_after
+
+    def iter_locations(self, include_weather: bool = False, batch_size: int = 500) -> Iterator:
+        """ Iterate over every tracked location in (lat, lon) order, one page at a time.
+
+        Only one page is held at a time, so memory does not grow with the number of locations.
+
+        Args:
+            include_weather (bool): Whether to include each location's stored weather data.
+            batch_size (int): The number of locations read per page.
+
+        Yields:
+            The locations, in the format of get_locations_page.
+        """
+        after = None
+        while True:
+            page, after = self.get_locations_page(after, batch_size, include_weather)
+            yield from page
+            if after is None:
+                return
+
+    def _locations_changed(self, location: tuple[float, float], added: bool) -> None:
+        """ Record that a location was added or removed. The sqlite backend keeps its own version and order. """
+        with self._locations_lock:
+            self._locations_version += 1
+            self._locations_modified_at = time.time()
+            if isinstance(self.locations, SQLiteLocations):
+                return
+            index = bisect.bisect_left(self._sorted_locations, location)
+            present = index < len(self._sorted_locations) and self._sorted_locations[index] == location
+            # Two concurrent adds of the same location both get here
+            if added and not present:
+                self._sorted_locations.insert(index, location)
+            elif not added and present:
+                del self._sorted_locations[index]
+
     def update_location(self, lat:float, lon:float) -> None:
         """ Update the location in the list with new weather data.
 
@@ -122,20 +333,490 @@ class WeatherModel:
             ValueError: If the location does not exist in the dictionary.
         """
         logger.info("Received request to update location with new data")
-        location = (float(lat), float(lon))
+        location = self.validate_location(lat, lon)
         if location not in self.locations:
             raise ValueError(f"Location ({lat}, {lon}) not found")
-        self.locations[location] = self.get_weather(lat, lon)
+        weather_data = self._fetch(location)
+        if not self._store_if_tracked(location, weather_data):
+            raise ValueError(f"Location ({lat}, {lon}) not found")
+
+    def update_all_locations(self, max_concurrency: Optional[int] = None) -> list[dict]:
+        """ Refresh the weather data of every tracked location in parallel.
+
+        Args:
+            max_concurrency (int, optional): The maximum number of concurrent upstream fetches.
+
+        Returns:
+            list[dict]: One report per location with its lat, lon, status ("success" or "error"),
+                latency in milliseconds and, on failure, the error message. A location whose refresh
+                raised an unexpected error gets no latency.
+
+        Raises:
+            ValueError: If the model is empty.
+        """
+        logger.info("Received request to update all locations")
+        self.check_if_empty()
+
+        locations = list(self.locations)
+        results = get_weather_data_many(
+            locations,
+            max_concurrency=max_concurrency,
+            fetch=lambda lat, lon: self.refresh_location((lat, lon)),
+        )
+        reports = []
+        for (lat, lon), result in zip(locations, results):
+            # refresh_location reports upstream failures itself; anything else (e.g. a locked store) arrives raised
+            if isinstance(result, Exception):
+                logger.error("Failed to update location %s: %s", (lat, lon), result)
+                result = {"lat": lat, "lon": lon, "status": "error", "error": str(result)}
+            reports.append(result)
+        failed = sum(1 for report in reports if report["status"] != "success")
+        logger.info("Updated %d locations, %d failed", len(reports) - failed, failed)
+        return reports
+
+    def refresh_location(self, location: tuple[float, float]) -> dict:
+        """ Fetch fresh weather data for a tracked location and store it.
+
+        Args:
+            location (tuple[float, float]): The canonical (lat, lon) key of the location.
+
+        Returns:
+            dict: A report with the location's lat, lon, status ("success" or "error"),
+                latency in milliseconds and, on failure, the error message.
+        """
+        report = {"lat": location[0], "lon": location[1]}
+        start = time.perf_counter()
+        try:
+            self._store_if_tracked(location, self._fetch(location))
+            report["status"] = "success"
+        except (ValueError, RuntimeError) as e:
+            logger.warning("Failed to update location %s: %s", location, e)
+            report["status"] = "error"
+            report["error"] = str(e)
+        report["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return report
+
+    def get_locations_due_for_refresh(self, lead_seconds: float) -> list[tuple[float, float]]:
+        """ Get the tracked locations whose cached weather expires within the given lead time.
+
+        A location whose cache entry was evicted is due one TTL after this process last stored its
+        weather, so locations that do not fit in the cache are not re-fetched on every pass. A location
+        this process has never stored is due at once.
+
+        Args:
+            lead_seconds (float): How far ahead of expiry a location becomes due.
+
+        Returns:
+            list[(float, float)]: The due locations, soonest expiry first.
+        """
+        deadline = time.time() + lead_seconds
+        due = []
+        for location in list(self.locations):
+            entry = self._cache.peek(location)
+            if entry is not None:
+                expires_at = entry.expires_at
+            else:
+                expires_at = self._refreshed_at.get(location, -self.ttl_seconds) + self.ttl_seconds
+            if expires_at <= deadline:
+                due.append((expires_at, location))
+        due.sort()
+        return [location for _, location in due]
+
+    def acquire_refresh_lease(self, holder: str, ttl_seconds: float) -> bool:
+        """ Take or renew the right to refresh tracked locations ahead of expiry.
+
+        With the sqlite backend, workers share one set of locations and only the lease holder refreshes
+        them. With the memory backend each process has its own locations, so the lease is always granted.
+
+        Args:
+            holder (str): An identifier unique to the refreshing process.
+            ttl_seconds (float): How long the lease lasts unless it is renewed.
+
+        Returns:
+            bool: True if the holder may refresh.
+        """
+        if self._refresh_lease is None:
+            return True
+        return self._refresh_lease.acquire(holder, ttl_seconds)
+
+    def release_refresh_lease(self, holder: str) -> None:
+        """ Give up the refresh lease so another worker can take it over at once.
+
+        Args:
+            holder (str): The identifier the lease was acquired with.
+        """
+        if self._refresh_lease is not None:
+            self._refresh_lease.release(holder)
+
+    def get_weather(self, lat:float, lon:float, nearest_km: Optional[float] = None):
+        """ Get the weather data from a location, served from the cache while it is fresh.
+
+        Args:
+            lat (float): The location's lattitude
+            lon (float): The location's longitude
+            nearest_km (float, optional): If given, serve the cached weather of the nearest tracked
+                location within this many kilometers instead of the exact coordinates.
+
+        Returns:
+            dict: A dictionary of all weather data
+
+        Raises:
+            ValueError: If the location is invalid.
+        """
+        return self.get_weather_entry(lat, lon, nearest_km=nearest_km).value
+
+    def get_weather_entry(self, lat: float, lon: float, nearest_km: Optional[float] = None) -> CacheEntry:
+        """ Get the cached weather entry for a location, fetching it if needed.
+
+        A fresh entry is returned as is. An expired entry still inside the stale window is returned
+        immediately and a background re-fetch is started. Otherwise the data is fetched from upstream.
+
+        If nearest_km is given and a tracked location within that distance has cached weather, its entry
+        is served instead; the entry's key tells the caller which location it belongs to.
+
+        Args:
+            lat (float): The location's lattitude
+            lon (float): The location's longitude
+            nearest_km (float, optional): The radius to search for a tracked location with cached weather.
+
+        Returns:
+            CacheEntry: The entry holding the weather data, its location and the time it was fetched.
+
+        Raises:
+            ValueError: If the location or nearest_km is invalid.
+        """
+        location = self.validate_location(lat, lon)
+        entry = None
+        if nearest_km is not None:
+            self._sync_views()
+            nearest = self.spatial_index.nearest(*location, self.validate_radius(nearest_km))
+            if nearest is not None and nearest[0] != location:
+                entry = self._cache.get_entry(nearest[0])
+                if entry is not None:
+                    location = nearest[0]
+        if entry is None:
+            entry = self._cache.get_entry(location)
+        if entry is None:
+            logger.debug("Cache miss for location %s", location)
+            return self._fetch_entry(location)
+        if not entry.is_fresh():
+            logger.debug("Serving stale weather for location %s", location)
+            self._revalidate(location)
+        else:
+            logger.debug("Cache hit for location %s", location)
+        return entry
+
+    def get_weather_batch(self, coords: Iterable[tuple[float, float]], max_concurrency: Optional[int] = None,
+                          timeout: Optional[float] = None) -> list[Union[dict, Exception]]:
+        """ Get the weather data for many locations at once.
+
+        Cache hits are served immediately, stale ones while they are refreshed in the background.
+        Misses are fetched from upstream concurrently, each distinct location once.
+
+        Args:
+            coords (Iterable[tuple[float, float]]): The (lat, lon) pairs to look up.
+            max_concurrency (int, optional): The maximum number of concurrent upstream fetches.
+            timeout (float, optional): Overall deadline in seconds for the upstream fetches.
+
+        Returns:
+            list: One entry per coordinate, in order. Each entry is either a dictionary of weather data
+                or the exception raised for that coordinate (ValueError if it is invalid, TimeoutError
+                if it was not fetched before the deadline).
+        """
+        results: list[Union[dict, Exception, None]] = []
+        misses: dict[tuple[float, float], list[int]] = {}
+        for i, (lat, lon) in enumerate(coords):
+            try:
+                location = self.validate_location(lat, lon)
+            except ValueError as e:
+                results.append(e)
+                continue
+            entry = self._cache.get_entry(location)
+            if entry is None:
+                results.append(None)
+                misses.setdefault(location, []).append(i)
+                continue
+            if not entry.is_fresh():
+                self._revalidate(location)
+            results.append(entry.value)
+
+        if misses:
+            logger.info("Fetching %d uncached locations", len(misses))
+            fetched = get_weather_data_many(
+                misses.keys(),
+                max_concurrency=max_concurrency,
+                fetch=lambda lat, lon: self._fetch((lat, lon)),
+                timeout=timeout,
+            )
+            for indexes, result in zip(misses.values(), fetched):
+                for i in indexes:
+                    results[i] = result
+        return results
+
+    def find_nearest_location(self, lat: float, lon: float, radius_km: float) -> dict:
+        """ Find the tracked location closest to a point.
+
+        Args:
+            lat (float): The point's lattitude
+            lon (float): The point's longitude
+            radius_km (float): The maximum distance in kilometers.
+
+        Returns:
+            dict: The lat and lon of the nearest tracked location and its distance_km.
+
+        Raises:
+            ValueError: If the point or radius is invalid, or no location is within the radius.
+        """
+        location = self.validate_location(lat, lon)
+        self._sync_views()
+        nearest = self.spatial_index.nearest(*location, self.validate_radius(radius_km))
+        if nearest is None:
+            raise ValueError(f"No tracked location within {radius_km} km of ({lat}, {lon})")
+        (nearest_lat, nearest_lon), distance = nearest
+        return {"lat": nearest_lat, "lon": nearest_lon, "distance_km": round(distance, 3)}
+
+    def get_weather_in_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                            grid: Optional[tuple[int, int]] = None) -> list[dict]:
+        """ Get the stored weather of every tracked location inside a bounding box.
+
+        Args:
+            min_lat (float): The southern edge of the box.
+            min_lon (float): The western edge of the box. If greater than max_lon, the box crosses
+                the antimeridian.
+            max_lat (float): The northern edge of the box.
+            max_lon (float): The eastern edge of the box.
+            grid (tuple[int, int], optional): If given, aggregate the locations onto a grid of this many
+                rows and columns instead of returning each one.
+
+        Returns:
+            list[dict]: Either the lat, lon and weather of each location in the box, or, with a grid,
+                the row, col, center, count and mean temp, humidity and wind_speed of each non-empty cell.
+
+        Raises:
+            ValueError: If the box or grid is invalid.
+        """
+        logger.info("Received request to get weather in bounding box")
+        self.validate_location(min_lat, min_lon)
+        self.validate_location(max_lat, max_lon)
+        min_lat, min_lon, max_lat, max_lon = float(min_lat), float(min_lon), float(max_lat), float(max_lon)
+        if min_lat > max_lat:
+            raise ValueError(f"min_lat {min_lat} must not be greater than max_lat {max_lat}")
+
+        self._sync_views()
+        if grid is not None:
+            rows, cols = grid
+            if rows < 1 or cols < 1 or rows * cols > MAX_GRID_CELLS:
+                raise ValueError(f"Grid must have between 1 and {MAX_GRID_CELLS} cells, got {rows}x{cols}")
+            return self.columns.grid(min_lat, min_lon, max_lat, max_lon, rows, cols)
+
+        results = []
+        for location in self.columns.in_bbox(min_lat, min_lon, max_lat, max_lon):
+            value = self.locations.get(location)
+            if value is not None:
+                weather_data = value.payload() if isinstance(value, WeatherRecord) else value
+                results.append({"lat": location[0], "lon": location[1], "weather": weather_data})
+        return results
+
+    def get_history(self, lat: float, lon: float, start: float, end: float) -> list[dict]:
+        """ Get the recorded weather history of a location.
+
+        Args:
+            lat (float): The location's lattitude
+            lon (float): The location's longitude
+            start (float): The start of the range in epoch seconds.
+            end (float): The end of the range in epoch seconds.
+
+        Returns:
+            list[dict]: The buckets in the range, oldest first. Recent data is in 5-minute buckets;
+                older data has been rolled up to hourly and daily means.
+
+        Raises:
+            ValueError: If history is disabled, or the location or range is invalid.
+        """
+        if self.history is None:
+            raise ValueError("Weather history is not enabled")
+        location = self.validate_location(lat, lon)
+        if not (math.isfinite(start) and math.isfinite(end)):
+            raise ValueError(f"Range {start} to {end} must be finite epoch seconds")
+        if start > end:
+            raise ValueError(f"Start {start} must not be after end {end}")
+        return self.history.query(location, start, end)
+
+    def filter_locations(self, conditions: Iterable[tuple[str, str, float]] = (), sort_by: Optional[str] = None,
+                         descending: bool = False, limit: Optional[int] = None) -> list[dict]:
+        """ Find the tracked locations whose weather matches every condition.
+
+        Args:
+            conditions (Iterable[tuple[str, str, float]]): (column, operator, value) triples, for example
+                ("temp", "gt", 290.0). Columns are lat, lon, temp, humidity, wind_speed and fetched_at;
+                operators are gt, gte, lt and lte.
+            sort_by (str, optional): The column to sort the matches by.
+            descending (bool): Whether to sort in descending order.
+            limit (int, optional): The maximum number of locations to return.
+
+        Returns:
+            list[dict]: The lat, lon, temp, humidity, wind_speed and fetched_at of each match.
+
+        Raises:
+            ValueError: If a column or operator is unknown.
+        """
+        logger.info("Received request to filter locations")
+        self._sync_views()
+        return self.columns.query(conditions, sort_by=sort_by, descending=descending, limit=limit)
 
-    def get_weather(self, lat:float, lon:float):
-        """ Get the weather data from a location
+    def get_location_weather(self, lat: float, lon: float) -> dict:
+        """ Get the stored weather data of a tracked location without contacting upstream.
 
         Args:
             lat (float): The location's lattitude
             lon (float): The location's longitude
 
+        Returns:
+            dict: The full OpenWeather payload last stored for the location.
+
+        Raises:
+            ValueError: If the location is invalid or not tracked.
+        """
+        location = self.validate_location(lat, lon)
+        try:
+            value = self.locations[location]
+        except KeyError:
+            raise ValueError(f"Location ({lat}, {lon}) not found")
+        return value.payload() if isinstance(value, WeatherRecord) else value
+
+    def _store_if_tracked(self, location: tuple[float, float], weather_data: dict) -> bool:
+        """ Store freshly fetched weather data for a location unless it was removed while the fetch ran.
+
+        Args:
+            location (tuple[float, float]): The canonical (lat, lon) key of the location.
+            weather_data (dict): The OpenWeather payload.
+
+        Returns:
+            bool: True if the location is still tracked and its data was stored.
+        """
+        with self._membership_lock:
+            if location not in self.locations:
+                return False
+            self._store_location(location, weather_data)
+            return True
+
+    def _store_location(self, location: tuple[float, float], weather_data: dict) -> None:
+        """ Store the weather data of a tracked location, compacting it if enabled.
+
+        Args:
+            location (tuple[float, float]): The canonical (lat, lon) key of the location.
+            weather_data (dict): The OpenWeather payload.
+        """
+        self.locations[location] = WeatherRecord.from_payload(weather_data) if self.compact_locations else weather_data
+        self._refreshed_at[location] = time.time()
+        self._index_location(location, weather_data)
+        self._record_history(location, weather_data)
+
+    def _record_history(self, location: tuple[float, float], weather_data: dict) -> None:
+        """ Append an observation of a tracked location to the history, if history is enabled.
+
+        Args:
+            location (tuple[float, float]): The canonical (lat, lon) key of the location.
+            weather_data (dict): The OpenWeather payload.
+        """
+        if self.history is None:
+            return
+        fields = WeatherRecord.extract_fields(weather_data)
+        self.history.append(location, fields, observed_at=fields["timestamp"])
+
+    def _index_location(self, location: tuple[float, float], weather_data: Union[dict, WeatherRecord],
+                        columns: Optional[ColumnarLocationStore] = None,
+                        spatial_index: Optional[SpatialIndex] = None) -> None:
+        """ Update the columnar view and spatial index with a tracked location's weather data.
+
+        Args:
+            location (tuple[float, float]): The canonical (lat, lon) key of the location.
+            weather_data (dict | WeatherRecord): The stored weather data.
+            columns (ColumnarLocationStore, optional): The view to update, given with spatial_index when
+                building new views. Defaults to self.columns.
+            spatial_index (SpatialIndex, optional): The index to update. Defaults to self.spatial_index.
+        """
+        if isinstance(weather_data, WeatherRecord):
+            fields = {"temp": weather_data.temp, "humidity": weather_data.humidity,
+                      "wind_speed": weather_data.wind_speed}
+        else:
+            fields = WeatherRecord.extract_fields(weather_data)
+        if columns is None:
+            columns, spatial_index = self.columns, self.spatial_index
+        entry = self._cache.peek(location)
+        columns.upsert(location, fields, entry.fetched_at if entry is not None else time.time())
+        spatial_index.add(location)
+
+    def _sync_views(self) -> None:
+        """ Rebuild the columnar view and spatial index if the shared sqlite locations changed since they were built.
+
+        This worker's own writes update the views in place as well, so a rebuild only catches up on what
+        other workers added, removed or refreshed. The memory backend's views never go stale.
+        """
+        if not isinstance(self.locations, SQLiteLocations):
+            return
+        with self._views_lock:
+            # Read before the rows, so a write that lands during the rebuild triggers another one
+            changes = self.locations.changes()
+            if changes == self._views_changes:
+                return
+            columns, spatial_index = ColumnarLocationStore(), SpatialIndex(cell_degrees=self.spatial_cell_degrees)
+            for location, weather_data in self.locations.rows():
+                self._index_location(location, weather_data, columns, spatial_index)
+            self.columns, self.spatial_index = columns, spatial_index
+            self._views_changes = changes
+
+    def get_cache_stats(self) -> dict:
+        """ Get the weather cache counters.
+
+        Returns:
+            dict: The cache hits, misses, evictions, current size and capacity.
+        """
+        return self._cache.stats()
+
+    def _fetch(self, location: tuple[float, float]) -> dict:
+        """ Fetch fresh weather data for a location from upstream and store it in the cache.
+
+        Args:
+            location (tuple[float, float]): The (lat, lon) key of the location.
+
         Returns:
             dict: A dictionary of all weather data
         """
+        return self._fetch_entry(location).value
+
+    def _fetch_entry(self, location: tuple[float, float]) -> CacheEntry:
+        """ Fetch fresh weather data for a location from upstream and store it in the cache.
+
+        Concurrent fetches for the same location are coalesced so only one upstream request is made;
+        every caller receives its result, or the error it raised.
+
+        Args:
+            location (tuple[float, float]): The (lat, lon) key of the location.
+
+        Returns:
+            CacheEntry: The newly cached entry.
+        """
+        return self._in_flight.do(location, lambda: self._cache.set(location, get_weather_data(*location)))
+
+    def _revalidate(self, location: tuple[float, float]) -> None:
+        """ Start a background re-fetch of a location unless one is already running.
+
+        Args:
+            location (tuple[float, float]): The (lat, lon) key of the location.
+        """
+        with self._revalidating_lock:
+            if location in self._revalidating:
+                return
+            self._revalidating.add(location)
+
+        def revalidate() -> None:
+            try:
+                self._fetch(location)
+            except (ValueError, RuntimeError) as e:
+                logger.warning("Background refresh of location %s failed: %s", location, e)
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.discard(location)
 
-        return get_weather_data(lat, lon)
+        self._revalidator.submit(revalidate)
@@ -0,0 +1,103 @@
+import json
+import sys
+import zlib
+from typing import Optional
+
+# Preset dictionary of the keys and common values in an OpenWeather response. Payloads are only a few hundred
+# bytes, too short for deflate to learn their structure on its own, so priming it roughly halves their size.
+_PAYLOAD_ZDICT = (
+    b'{"coord":{"lon":,"lat":},"weather":[{"id":,"main":"Clear","description":"clear sky","icon":"01d"}],'
+    b'"base":"stations","main":{"temp":,"feels_like":,"temp_min":,"temp_max":,"pressure":,"humidity":,'
+    b'"sea_level":,"grnd_level":},"visibility":10000,"wind":{"speed":,"deg":,"gust":},"clouds":{"all":},'
+    b'"dt":,"sys":{"type":,"id":,"country":"","sunrise":,"sunset":},"timezone":,"id":,"name":"","cod":200}'
+)
+
+
+def _compress(payload: dict) -> bytes:
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=_PAYLOAD_ZDICT)
+    return compressor.compress(json.dumps(payload, separators=(",", ":")).encode()) + compressor.flush()
+
+
+def _decompress(data: bytes) -> dict:
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=_PAYLOAD_ZDICT)
+    return json.loads(decompressor.decompress(data) + decompressor.flush())
+
+
+class WeatherRecord:
+    """
+    A compact, slotted record of the weather fields the API serves for a location.
+
+    The full OpenWeather payload is kept as deflate-compressed JSON and only decoded when it is asked for,
+    so a record takes a small fraction of the memory of the nested dictionaries it replaces.
+    """
+
+    __slots__ = ("temp", "humidity", "pressure", "wind_speed", "wind_deg", "conditions", "timestamp", "_payload")
+
+    def __init__(self, temp: Optional[float], humidity: Optional[float], pressure: Optional[float],
+                 wind_speed: Optional[float], wind_deg: Optional[float], conditions: Optional[str],
+                 timestamp: Optional[int], payload: bytes):
+        self.temp = temp
+        self.humidity = humidity
+        self.pressure = pressure
+        self.wind_speed = wind_speed
+        self.wind_deg = wind_deg
+        self.conditions = conditions
+        self.timestamp = timestamp
+        self._payload = payload
+
+    @staticmethod
+    def extract_fields(payload: dict) -> dict:
+        """Extracts the served fields from an OpenWeather response.
+
+        Both the current weather format ("main" and "wind" blocks) and the One Call format
+        (a "current" block) are understood; missing fields are returned as None.
+
+        Args:
+            payload (dict): The weather data returned by OpenWeather.
+
+        Returns:
+            dict: The temp, humidity, pressure, wind_speed, wind_deg, conditions and timestamp.
+        """
+        current = payload.get("current") or {}
+        main = payload.get("main") or current
+        wind = payload.get("wind") or {}
+        weather = payload.get("weather") or current.get("weather") or [{}]
+        conditions = weather[0].get("description")
+        return {
+            "temp": main.get("temp"),
+            "humidity": main.get("humidity"),
+            "pressure": main.get("pressure"),
+            "wind_speed": wind.get("speed", current.get("wind_speed")),
+            "wind_deg": wind.get("deg", current.get("wind_deg")),
+            # Conditions come from a small vocabulary, so share one string object per description
+            "conditions": sys.intern(conditions) if conditions else None,
+            "timestamp": payload.get("dt", current.get("dt")),
+        }
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "WeatherRecord":
+        """Builds a record from an OpenWeather response.
+
+        Args:
+            payload (dict): The weather data returned by OpenWeather.
+
+        Returns:
+            WeatherRecord: The compact record.
+        """
+        return cls(payload=_compress(payload), **cls.extract_fields(payload))
+
+    def payload(self) -> dict:
+        """Decodes and returns the full OpenWeather payload the record was built from."""
+        return _decompress(self._payload)
+
+    def to_dict(self) -> dict:
+        """Returns the served fields as a dictionary."""
+        return {field: getattr(self, field) for field in self.__slots__ if not field.startswith("_")}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, WeatherRecord):
+            return NotImplemented
+        return self._payload == other._payload
+
+    def __repr__(self) -> str:
+        return f"WeatherRecord({self.to_dict()})"
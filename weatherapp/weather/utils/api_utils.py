@@ -1,14 +1,111 @@
+import itertools
 import logging
 import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Optional, Union
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from weather.utils.logger import configure_logger
+from weather.utils.logger import Truncated, configure_logger
+from weather.utils.metrics import REGISTRY
 
 logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 OPENWEATHER_URL = os.getenv("OPENWEATHER_URL", "https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={api_key}")
 
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 20))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.05))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 5))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 2))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", 0.25))
+HTTP_BACKOFF_JITTER = float(os.getenv("HTTP_BACKOFF_JITTER", 0.25))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", 2))
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", HTTP_POOL_SIZE))
+
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "weather_upstream_request_duration_seconds",
+    "Time spent fetching weather data from OpenWeather, retries included.",
+    ("outcome",),
+)
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "weather_upstream_errors_total",
+    "Failed OpenWeather requests by error type.",
+    ("type",),
+)
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+
+_batch_executor: Optional[ThreadPoolExecutor] = None
+_batch_executor_pid: Optional[int] = None
+_batch_executor_lock = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    """
+    Builds a requests session with a keep-alive connection pool and bounded retries.
+
+    Transient failures (connection errors, read timeouts and the status codes in RETRY_STATUS_CODES)
+    are retried up to HTTP_MAX_RETRIES times with jittered exponential backoff.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        connect=HTTP_MAX_RETRIES,
+        read=HTTP_MAX_RETRIES,
+        status=HTTP_MAX_RETRIES,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({"GET"}),
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        backoff_jitter=HTTP_BACKOFF_JITTER,
+        backoff_max=HTTP_BACKOFF_MAX,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the process-wide pooled session, creating it on first use.
+
+    The session is rebuilt after a fork so worker processes never share sockets with their parent.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                logger.info("Creating pooled HTTP session (pool size %d)", HTTP_POOL_SIZE)
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+
+def _error_type(error: requests.exceptions.RequestException) -> str:
+    """Returns the weather_upstream_errors_total type label for a failed request."""
+    if isinstance(error, requests.exceptions.HTTPError):
+        return "http_error"
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return "connection_error"
+    return "request_error"
+
+
 def get_weather_data(lat: float, lon: float) -> dict:
     """
     Fetches weather data from OpenWeather API.
@@ -26,33 +123,122 @@ def get_weather_data(lat: float, lon: float) -> dict:
     """
     api_key = os.getenv("OPENWEATHER_API_KEY")
     url = OPENWEATHER_URL.format(lat=lat, lon=lon, api_key=api_key)
+    start = time.perf_counter()
+    outcome = "error"
 
     try:
-        logger.info(f"Fetching weather data from OpenWeather API for ({lat}, {lon})")
+        logger.info("Fetching weather data from OpenWeather API for (%s, %s)", lat, lon)
 
-        response = requests.get(url, timeout=5)
+        response = get_session().get(url, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
 
         # Check if the request was successful
         response.raise_for_status()
 
-        weather_data_str = response.text.strip()
-
         try:
             weather_data = response.json()
         except ValueError:
-            logger.error(f"Invalid response from OpenWeather API: {weather_data_str}")
+            UPSTREAM_ERRORS.inc("invalid_json")
+            weather_data_str = response.text.strip()
+            logger.error("Invalid response from OpenWeather API: %s", Truncated(weather_data_str))
             raise ValueError(f"Invalid response from OpenWeather API: {weather_data_str}")
 
-        logger.debug(f"Received weather data: {weather_data}")
-        logger.info(f"Successfully fetched weather data")
+        logger.debug("Received weather data: %s", Truncated(weather_data))
+        logger.info("Successfully fetched weather data")
 
+        outcome = "success"
         return weather_data
 
     except requests.exceptions.Timeout:
+        UPSTREAM_ERRORS.inc("timeout")
         logger.error("Request to OpenWeather timed out")
         raise RuntimeError("OpenWeather API request timed out")
 
     except requests.exceptions.RequestException as e:
-        logger.error(f"OpenWeather API request failed: {e}")
+        UPSTREAM_ERRORS.inc(_error_type(e))
+        logger.error("OpenWeather API request failed: %s", e)
         raise RuntimeError(f"OpenWeather API request failed: {e}")
 
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - start, outcome)
+
+
+def get_batch_executor() -> ThreadPoolExecutor:
+    """
+    Returns the process-wide pool that batch fetches run on, creating it on first use.
+
+    The pool has BATCH_MAX_CONCURRENCY workers and is shared by every batch, so concurrent batches
+    together never run more fetches than that. It is rebuilt after a fork, since its threads are not.
+
+    Returns:
+        ThreadPoolExecutor: The shared pool.
+    """
+    global _batch_executor, _batch_executor_pid
+    pid = os.getpid()
+    if _batch_executor is None or _batch_executor_pid != pid:
+        with _batch_executor_lock:
+            if _batch_executor is None or _batch_executor_pid != pid:
+                _batch_executor = ThreadPoolExecutor(max_workers=max(1, BATCH_MAX_CONCURRENCY),
+                                                     thread_name_prefix="weather-fetch")
+                _batch_executor_pid = pid
+    return _batch_executor
+
+
+def get_weather_data_many(
+    coords: Iterable[tuple[float, float]],
+    max_concurrency: Optional[int] = None,
+    fetch: Optional[Callable[[float, float], dict]] = None,
+    timeout: Optional[float] = None,
+) -> list[Union[dict, Exception]]:
+    """
+    Fetches weather data for many coordinates concurrently.
+
+    Each fetch is a blocking call over the shared pooled session, so fetches run on the shared batch
+    pool; this batch keeps at most max_concurrency of them in flight, submitting the next coordinate
+    as each one finishes.
+
+    Args:
+        coords (Iterable[tuple[float, float]]): The (lat, lon) pairs to fetch.
+        max_concurrency (int, optional): The maximum number of concurrent fetches for this batch.
+            Defaults to, and is capped at, BATCH_MAX_CONCURRENCY.
+        fetch (Callable, optional): The function used to fetch a single coordinate.
+            Defaults to get_weather_data.
+        timeout (float, optional): Overall deadline in seconds for the whole batch. Coordinates not
+            yet submitted at the deadline are skipped; fetches already running finish in the background.
+
+    Returns:
+        list: One entry per coordinate, in order. Each entry is either the weather data dictionary
+            or the exception raised while fetching it (TimeoutError if the deadline passed first).
+    """
+    coords = list(coords)
+    if not coords:
+        return []
+    fetch = fetch or get_weather_data
+    limit = max(1, min(max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY, len(coords)))
+    deadline = None if timeout is None else time.monotonic() + timeout
+    executor = get_batch_executor()
+
+    logger.info("Fetching weather data for %d locations (concurrency %d)", len(coords), limit)
+    results: list[Union[dict, Exception, None]] = [None] * len(coords)
+    queued = iter(range(len(coords)))
+    running = {}
+    for i in itertools.islice(queued, limit):
+        running[executor.submit(fetch, *coords[i])] = i
+
+    while running:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            break
+        done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            results[running.pop(future)] = future.exception() or future.result()
+            i = next(queued, None)
+            if i is not None:
+                running[executor.submit(fetch, *coords[i])] = i
+
+    missed = list(running.values()) + list(queued)
+    if missed:
+        # Fetches that overran the deadline keep their worker until they complete on their own
+        logger.warning("%d of %d fetches missed the %ss deadline", len(missed), len(coords), timeout)
+        for i in missed:
+            results[i] = TimeoutError(f"Timed out after {timeout}s")
+    return results
@@ -0,0 +1,212 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from weather.utils.json_provider import dumps
+from weather.utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class CacheEntry:
+    """
+    A single cached value along with its key, the time it was fetched and the time it expires.
+
+    The value's JSON encoding, and any other representation built from it such as a compressed
+    response body, is kept alongside it once computed, so an entry served many times is only
+    serialized and compressed once.
+    """
+
+    __slots__ = ("value", "fetched_at", "expires_at", "key", "_json", "_variants")
+
+    def __init__(self, value: Any, fetched_at: float, expires_at: float, key: Optional[Hashable] = None,
+                 json: Optional[bytes] = None):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+        self.key = key
+        self._json = json
+        self._variants: dict[Hashable, Any] = {}
+
+    def json(self) -> bytes:
+        """Returns the value serialized as JSON, encoding it on first use."""
+        if self._json is None:
+            # Entries are never mutated, so a concurrent first call at worst encodes the same bytes twice
+            self._json = dumps(self.value)
+        return self._json
+
+    def variant(self, name: Hashable, build: Callable[[], Any]) -> Any:
+        """Returns a representation derived from the entry, building and keeping it on first use.
+
+        Args:
+            name (Hashable): Identifies the representation, e.g. a content coding.
+            build (Callable[[], Any]): Builds the representation.
+
+        Returns:
+            Any: The kept or newly built representation.
+        """
+        variant = self._variants.get(name)
+        if variant is None:
+            variant = self._variants[name] = build()
+        return variant
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        """Returns True if the entry has not yet reached its expiry time."""
+        return (time.time() if now is None else now) < self.expires_at
+
+    def age(self, now: Optional[float] = None) -> float:
+        """Returns the number of seconds since the entry was fetched."""
+        return max(0.0, (time.time() if now is None else now) - self.fetched_at)
+
+
+class TTLCache:
+    """
+    A thread-safe, size-bounded cache whose entries expire after a fixed TTL.
+
+    When the cache is full, the least recently used entry is evicted to make room.
+    Expired entries are kept for a further stale window so they can still be served while a
+    fresh copy is fetched. Hits, misses and evictions are counted so the cache can be monitored.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600, stale_seconds: float = 0):
+        """Initializes an empty cache.
+
+        Args:
+            max_entries (int): The maximum number of entries held before LRU eviction kicks in.
+            ttl_seconds (float): How long an entry stays fresh after being set.
+            stale_seconds (float): How long an expired entry may still be served by get_entry.
+
+        Raises:
+            ValueError: If max_entries is less than 1.
+        """
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be at least 1, got {max_entries}")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the cached value for a key, or None if it is missing or expired.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            The cached value, or None on a miss.
+        """
+        with self._lock:
+            entry = self._lookup(key, time.time())
+            if entry is None or not entry.is_fresh():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def get_entry(self, key: Hashable) -> Optional[CacheEntry]:
+        """Returns the entry for a key if it is fresh or still within the stale window.
+
+        Callers should check CacheEntry.is_fresh to tell the two apart.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            CacheEntry: The entry, or None on a miss.
+        """
+        with self._lock:
+            entry = self._lookup(key, time.time())
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if entry.is_fresh():
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return entry
+
+    def _lookup(self, key: Hashable, now: float) -> Optional[CacheEntry]:
+        """Returns the entry for a key, dropping it if it is past the stale window. Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is not None and now >= entry.expires_at + self.stale_seconds:
+            del self._entries[key]
+            return None
+        return entry
+
+    def set(self, key: Hashable, value: Any) -> CacheEntry:
+        """Stores a value, evicting the least recently used entries if the cache is full.
+
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value to cache.
+
+        Returns:
+            CacheEntry: The entry that was stored.
+        """
+        now = time.time()
+        entry = CacheEntry(value, now, now + self.ttl_seconds, key)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                logger.debug("Evicted %s from cache", evicted_key)
+        return entry
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """Returns the entry for a key, fresh or not, without touching recency or counters.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            CacheEntry: The entry, or None if the key is not cached.
+        """
+        with self._lock:
+            return self._entries.get(key)
+
+    def pop(self, key: Hashable) -> None:
+        """Removes a key from the cache if it is present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Removes every entry from the cache. Counters are left untouched."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Returns the cache counters.
+
+        Returns:
+            dict: The hits, stale hits, misses, evictions, current size and capacity of the cache.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.is_fresh()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,71 @@
+import gzip
+import os
+from typing import Optional
+
+from werkzeug.datastructures import Accept
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 512))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 5))
+
+# In order of preference; brotli is only offered when the package is installed
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encodings: Accept) -> Optional[str]:
+    """
+    Picks the content coding to use for a response from the client's Accept-Encoding header.
+
+    Args:
+        accept_encodings (Accept): The parsed Accept-Encoding header, e.g. request.accept_encodings.
+
+    Returns:
+        str: The preferred supported coding the client accepts, or None to send the body as is.
+    """
+    for encoding in ENCODINGS:
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """
+    Compresses a response body.
+
+    Args:
+        data (bytes): The body to compress.
+        encoding (str): "br" or "gzip".
+
+    Returns:
+        bytes: The compressed body.
+
+    Raises:
+        ValueError: If the encoding is not supported.
+    """
+    if encoding == "gzip":
+        # A fixed mtime keeps the output, and so any cached copy of it, deterministic
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(data, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def encode(data: bytes, encoding: Optional[str]) -> tuple[bytes, Optional[str]]:
+    """
+    Compresses a response body if a coding was negotiated and the body is large enough to benefit.
+
+    Args:
+        data (bytes): The body.
+        encoding (str, optional): The negotiated coding, or None.
+
+    Returns:
+        tuple[bytes, Optional[str]]: The body to send and its Content-Encoding, or None if it is sent as is.
+    """
+    if encoding is None or len(data) < COMPRESSION_MIN_SIZE:
+        return data, None
+    return compress(data, encoding), encoding
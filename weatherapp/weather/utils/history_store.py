@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+from weather.utils.logger import configure_logger
+from weather.utils.sqlite_store import SQLiteConnections
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+Location = tuple[float, float]
+
+RAW_RESOLUTION = 300  # 5 minutes
+HOURLY_RESOLUTION = 3600
+DAILY_RESOLUTION = 86400
+
+FIELDS = ("temp", "humidity", "pressure", "wind_speed")
+
+
+class HistoryStore:
+    """
+    An append-only time series of weather observations per location, stored in SQLite.
+
+    Observations land in 5-minute buckets (the latest observation in a bucket wins). Older data is rolled up
+    into hourly and then daily buckets that hold sample-weighted means, so the table grows with the number of
+    locations rather than with the number of fetches. The primary key (lat, lon, ts, resolution) makes a
+    location's time range a single index range scan.
+
+    Rollups run on a background thread started by start(), so an append never waits on one.
+    """
+
+    def __init__(self, path: str, raw_retention: float = 2 * 86400, hourly_retention: float = 30 * 86400,
+                 downsample_interval: float = 600):
+        """Initializes the store, creating its table if needed.
+
+        Args:
+            path (str): The path of the SQLite database file.
+            raw_retention (float): Seconds of 5-minute data kept before it is rolled up to hourly.
+            hourly_retention (float): Seconds of hourly data kept before it is rolled up to daily.
+            downsample_interval (float): Seconds between rollups once start() has been called.
+        """
+        self.raw_retention = raw_retention
+        self.hourly_retention = hourly_retention
+        self.downsample_interval = downsample_interval
+        self._connections = SQLiteConnections(path)
+        self._downsample_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        conn = self._connections.get()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS weather_history ("
+            " lat REAL NOT NULL, lon REAL NOT NULL, ts INTEGER NOT NULL, resolution INTEGER NOT NULL,"
+            " temp REAL, humidity REAL, pressure REAL, wind_speed REAL, samples INTEGER NOT NULL,"
+            " PRIMARY KEY (lat, lon, ts, resolution)) WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS weather_history_resolution_ts ON weather_history (resolution, ts)"
+        )
+
+    def append(self, location: Location, fields: dict, observed_at: Optional[float] = None) -> None:
+        """Records an observation for a location.
+
+        Args:
+            location (Location): The (lat, lon) key of the location.
+            fields (dict): The weather fields, as returned by WeatherRecord.extract_fields.
+            observed_at (float, optional): When the observation was made. Defaults to now.
+        """
+        observed_at = time.time() if observed_at is None else observed_at
+        bucket = int(observed_at) // RAW_RESOLUTION * RAW_RESOLUTION
+        self._connections.get().execute(
+            "INSERT OR REPLACE INTO weather_history"
+            " (lat, lon, ts, resolution, temp, humidity, pressure, wind_speed, samples)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)",
+            (location[0], location[1], bucket, RAW_RESOLUTION, *(fields.get(name) for name in FIELDS)),
+        )
+
+    def start(self) -> None:
+        """Starts the background rollup thread. Calling start on a running store does nothing."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="weather-history-downsample", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stops the background rollup thread.
+
+        Args:
+            timeout (float, optional): How long to wait for the thread to exit.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.downsample_interval):
+            try:
+                self.downsample()
+            except Exception as e:
+                logger.error("History rollup failed: %s", e)
+
+    def query(self, location: Location, start: float, end: float) -> list[dict]:
+        """Returns a location's observations between two times, oldest first.
+
+        Args:
+            location (Location): The (lat, lon) key of the location.
+            start (float): The earliest bucket start to include, in epoch seconds.
+            end (float): The latest bucket start to include, in epoch seconds.
+
+        Returns:
+            list[dict]: The ts, resolution, temp, humidity, pressure, wind_speed and samples of each bucket.
+        """
+        rows = self._connections.get().execute(
+            "SELECT ts, resolution, temp, humidity, pressure, wind_speed, samples FROM weather_history"
+            " WHERE lat = ? AND lon = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+            (location[0], location[1], int(start), int(end)),
+        ).fetchall()
+        columns = ("ts", "resolution") + FIELDS + ("samples",)
+        return [dict(zip(columns, row)) for row in rows]
+
+    def downsample(self, now: Optional[float] = None) -> None:
+        """Rolls 5-minute buckets past the raw retention up to hourly, and hourly past the hourly retention to daily.
+
+        Only whole target buckets are rolled up, so a bucket is never merged twice.
+
+        Args:
+            now (float, optional): The current time. Defaults to now.
+        """
+        if not self._downsample_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.time() if now is None else now
+            self._rollup(RAW_RESOLUTION, HOURLY_RESOLUTION, now - self.raw_retention)
+            self._rollup(HOURLY_RESOLUTION, DAILY_RESOLUTION, now - self.hourly_retention)
+        finally:
+            self._downsample_lock.release()
+
+    def _rollup(self, from_resolution: int, to_resolution: int, older_than: float) -> None:
+        cutoff = int(older_than) // to_resolution * to_resolution
+        means = ", ".join(
+            f"SUM({name} * samples) * 1.0 / SUM(CASE WHEN {name} IS NOT NULL THEN samples END)" for name in FIELDS
+        )
+        conn = self._connections.get()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO weather_history"
+                " (lat, lon, ts, resolution, temp, humidity, pressure, wind_speed, samples)"
+                f" SELECT lat, lon, ts / {to_resolution} * {to_resolution}, {to_resolution}, {means}, SUM(samples)"
+                " FROM weather_history WHERE resolution = ? AND ts < ?"
+                f" GROUP BY lat, lon, ts / {to_resolution}",
+                (from_resolution, cutoff),
+            )
+            deleted = conn.execute(
+                "DELETE FROM weather_history WHERE resolution = ? AND ts < ?", (from_resolution, cutoff)
+            ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if deleted:
+            logger.info("Rolled %d buckets of %ds history up to %ds", deleted, from_resolution, to_resolution)
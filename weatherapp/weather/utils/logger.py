@@ -1,27 +1,201 @@
+import atexit
+import itertools
 import logging
+import os
+import queue
 import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Iterator, Optional
 
-from flask import current_app, has_request_context
+from flask.logging import default_handler
 
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", 512))
 
-def configure_logger(logger):
-    logger.setLevel(logging.DEBUG)
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    A QueueHandler that enqueues records untouched.
+
+    The stock QueueHandler formats the message on the calling thread so records can be pickled across
+    processes. The queue here never leaves the process, so formatting is left to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_queue_handler = _DeferredQueueHandler(queue.SimpleQueue())
+
+
+def _level(name: str) -> str:
+    """Returns the level configured for a logger in LOG_LEVELS, falling back to LOG_LEVEL.
+
+    LOG_LEVELS is a comma-separated list of logger=LEVEL pairs, e.g. "weather.utils.api_utils=WARNING".
+    """
+    overrides = dict(
+        pair.strip().split("=", 1) for pair in os.getenv("LOG_LEVELS", "").split(",") if "=" in pair
+    )
+    return overrides.get(name, os.getenv("LOG_LEVEL", "DEBUG")).strip().upper()
 
-    # Create a console handler that logs to stderr
+
+def _start_listener() -> None:
+    """Starts the thread that writes queued records to stderr. Caller holds the setup lock."""
+    global _listener
     handler = logging.StreamHandler(sys.stderr)
-    handler.setLevel(logging.DEBUG)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    _listener = QueueListener(_queue_handler.queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_listener_in_child() -> None:
+    # The listener thread does not survive a fork, so each worker process starts its own on a fresh
+    # queue; records the parent had not written yet stay the parent's
+    global _setup_lock
+    _setup_lock = threading.Lock()
+    _queue_handler.queue = queue.SimpleQueue()
+    if _listener is not None:
+        _start_listener()
+
+
+def stop_logging() -> None:
+    """Flushes queued records and stops the listener thread."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _render(value: Any, limit: int, nested: bool = False) -> Iterator[str]:
+    """Yields the text of str(value) piece by piece, so a caller can stop once it has enough.
+
+    Plain dictionaries, lists and tuples are walked item by item; strings nested in them are cut past the
+    limit. Anything else, subclasses included, is rendered whole.
+    """
+    if type(value) is dict:
+        yield "{"
+        for i, (key, item) in enumerate(value.items()):
+            if i:
+                yield ", "
+            yield from _render(key, limit, nested=True)
+            yield ": "
+            yield from _render(item, limit, nested=True)
+        yield "}"
+    elif type(value) in (list, tuple):
+        yield "[" if type(value) is list else "("
+        for i, item in enumerate(value):
+            if i:
+                yield ", "
+            yield from _render(item, limit, nested=True)
+        yield "]" if type(value) is list else ",)" if len(value) == 1 else ")"
+    elif isinstance(value, str):
+        yield repr(value[:limit + 1]) if nested else value[:limit + 1]
+    else:
+        yield repr(value) if nested else str(value)
+
+
+class Truncated:
+    """
+    A log argument that renders a value only when the record is formatted, cut to a maximum length.
+
+    Pass it as an argument rather than formatting it into the message, e.g.
+    logger.debug("Received weather data: %s", Truncated(weather_data)). A record below the logger's
+    level is never rendered, and rendering a string, dictionary, list or tuple stops once the limit is
+    reached, so the cost stays bounded however large the payload is.
+    """
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: Optional[int] = None):
+        self.value = value
+        self.limit = LOG_PAYLOAD_MAX_CHARS if limit is None else limit
+
+    def __str__(self) -> str:
+        if isinstance(self.value, str):
+            if len(self.value) <= self.limit:
+                return self.value
+            return f"{self.value[:self.limit]}... ({len(self.value)} chars)"
+
+        pieces = []
+        size = 0
+        for piece in _render(self.value, self.limit):
+            pieces.append(piece)
+            size += len(piece)
+            if size > self.limit:
+                return f"{''.join(pieces)[:self.limit]}... (truncated)"
+        return "".join(pieces)
+
+
+class LogSampler:
+    """
+    Decides which occurrences of a frequent log line to keep, e.g. 1 in 100 successful requests to a route.
+
+    Sampling is deterministic: with a rate of N, the first occurrence and every Nth after it are kept.
+    Rates come from LOG_SAMPLE_RATES, a comma-separated list of key=N pairs such as "get_weather=100".
+    Keys without a rate, or with a rate below 1, are always logged.
+    """
+
+    def __init__(self, rates: Optional[dict] = None):
+        """Initializes the sampler.
+
+        Args:
+            rates (dict, optional): Sampling rates by key. Defaults to those in LOG_SAMPLE_RATES.
+        """
+        if rates is None:
+            rates = {
+                key.strip(): int(rate)
+                for key, _, rate in (pair.partition("=") for pair in os.getenv("LOG_SAMPLE_RATES", "get_weather=100").split(","))
+                if rate
+            }
+        self.rates = {key: max(1, int(rate)) for key, rate in rates.items()}
+        self._counters = {key: itertools.count() for key in self.rates}
+
+    def should_log(self, key: str) -> bool:
+        """Returns whether this occurrence of a sampled log line should be written.
+
+        Args:
+            key (str): The name of the sampled line, typically the route's endpoint name.
+
+        Returns:
+            bool: True for the occurrences that fall on the key's sampling rate.
+        """
+        counter = self._counters.get(key)
+        if counter is None:
+            return True
+        # next() on itertools.count is atomic under the GIL, so no lock is needed
+        return next(counter) % self.rates[key] == 0
+
+
+def configure_logger(logger):
+    """
+    Routes a logger through the shared logging queue.
+
+    Log calls only put the record on an in-process queue; a single listener thread formats it and
+    writes it to stderr. Records do not propagate to the root logger. Calling this more than once
+    for the same logger has no further effect. The level comes from LOG_LEVELS or LOG_LEVEL
+    (default DEBUG).
 
-    # Create a formatter with a timestamp
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    Args:
+        logger (logging.Logger): The logger to configure.
+    """
+    with _setup_lock:
+        if _listener is None:
+            _start_listener()
+    logger.setLevel(_level(logger.name))
 
-    # Add the formatter to the handler
-    handler.setFormatter(formatter)
+    # Flask's own handler, or any handler on the root logger, would write synchronously and
+    # duplicate every line
+    logger.removeHandler(default_handler)
+    logger.propagate = False
+    if _queue_handler not in logger.handlers:
+        logger.addHandler(_queue_handler)
 
-    # Add the handler to the logger
-    logger.addHandler(handler)
 
-    # We also need to add the handler to the Flask logger
-    if has_request_context():
-        app_logger = current_app.logger
-        for handler in app_logger.handlers:
-            logger.addHandler(handler)
+atexit.register(stop_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_in_child)
@@ -0,0 +1,309 @@
+import functools
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds, from a cache hit to an upstream call close to its read timeout
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class _ShardHolder:
+    """Holds a thread's shard in its thread-local storage, so the shard can be retired when the thread ends."""
+
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self, shard: dict):
+        self.shard = shard
+
+
+def _add_into(total: dict, labels: tuple, values: list) -> None:
+    current = total.get(labels)
+    if current is None:
+        total[labels] = list(values)
+    else:
+        for i, value in enumerate(values):
+            current[i] += value
+
+
+class _Metric:
+    """
+    A metric whose samples are kept in one shard per thread.
+
+    A thread only ever writes its own shard, so recording a sample takes no lock; the lock is only
+    taken the first time a thread records anything and when it ends. When a thread ends, its shard is
+    folded into a retired total, so short-lived threads (executor workers, per-request server threads)
+    do not accumulate. A scrape sums the retired total and the live shards, and may see an update that
+    is in progress on another thread as not yet applied.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._local = threading.local()
+        self._shards: dict[int, dict] = {}
+        self._retired: dict = {}
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            shard = {}
+            holder = _ShardHolder(shard)
+            with self._shards_lock:
+                self._shards[id(shard)] = shard
+            # The thread's local storage, and with it the holder, is released when the thread ends
+            weakref.finalize(holder, self._retire, shard)
+            self._local.holder = holder
+        return holder.shard
+
+    def _retire(self, shard: dict) -> None:
+        with self._shards_lock:
+            if self._shards.pop(id(shard), None) is None:
+                return
+            for labels, values in shard.items():
+                _add_into(self._retired, labels, values)
+
+    def _check_labels(self, labels: tuple) -> None:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {labels}")
+
+    def _merged(self) -> dict:
+        with self._shards_lock:
+            shards = list(self._shards.values())
+            merged = {labels: list(values) for labels, values in self._retired.items()}
+        for shard in shards:
+            # list() copies the items in one step, so a new label set added meanwhile is not an error
+            for labels, values in list(shard.items()):
+                _add_into(merged, labels, values)
+        return merged
+
+    def clear(self) -> None:
+        """Drops every recorded sample."""
+        with self._shards_lock:
+            self._retired.clear()
+            for shard in self._shards.values():
+                shard.clear()
+
+    def render(self) -> list[str]:
+        """Returns the metric's lines in the Prometheus text format."""
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A count that only goes up, such as requests served or errors seen."""
+
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """Adds to the count for a set of label values.
+
+        Args:
+            *labels (str): The label values, in the order of the metric's label names.
+            amount (float): The amount to add. Defaults to 1.
+        """
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            self._check_labels(labels)
+            values = shard[labels] = [0]
+        values[0] += amount
+
+    def value(self, *labels: str) -> float:
+        """Returns the count for a set of label values, summed across threads."""
+        return self._merged().get(labels, [0])[0]
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(values[0])}"
+            for labels, values in sorted(self._merged().items())
+        ]
+
+
+class Histogram(_Metric):
+    """A distribution of observed values, such as latencies, counted into fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Records an observation.
+
+        Args:
+            value (float): The observed value, e.g. a duration in seconds.
+            *labels (str): The label values, in the order of the metric's label names.
+        """
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            self._check_labels(labels)
+            # One count per bucket, one for values above the last bucket, then the sum
+            values = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Observes the duration of the block it wraps, in seconds, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels: str) -> int:
+        """Returns the number of observations for a set of label values."""
+        values = self._merged().get(labels)
+        return sum(values[:-1]) if values else 0
+
+    def render(self) -> list[str]:
+        names = self.label_names + ("le",)
+        lines = []
+        for labels, values in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}")
+            suffix = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(values[-1])}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    The metrics exposed by the application, and the collectors that read values like cache sizes at scrape time.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: dict[str, Callable[[], list[tuple]]] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                    raise ValueError(f"Metric {metric.name} is already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, label_names: tuple = ()) -> Counter:
+        """Returns the counter with this name, registering it on first use."""
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: tuple = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        """Returns the histogram with this name, registering it on first use."""
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def register_collector(self, name: str, collect: Callable[[], list[tuple]]) -> None:
+        """
+        Registers a function that reports values read at scrape time, replacing any collector of the same name.
+
+        Args:
+            name (str): A name for the collector, so registering again (e.g. a new app) replaces the old one.
+            collect (Callable): Returns (name, kind, documentation, label names, samples) tuples, where kind
+                is "gauge" or "counter" and samples maps a tuple of label values to a number.
+        """
+        with self._lock:
+            self._collectors[name] = collect
+
+    def render(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition, ending with a newline.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collect in collectors:
+            for name, kind, documentation, label_names, samples in collect():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, sample in sorted(samples.items()):
+                    lines.append(f"{name}{_format_labels(label_names, labels)} {_format_value(sample)}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        """Drops every recorded sample, keeping the metrics registered."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+REGISTRY = Registry()
+
+
+def timed(histogram: Histogram, *labels: str) -> Callable:
+    """
+    Decorates a function so each call's duration is observed by a histogram.
+
+    Args:
+        histogram (Histogram): The histogram to observe.
+        *labels (str): The label values for the observations.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(*labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def cache_samples(prefix: str, stats: dict) -> list[tuple]:
+    """
+    Turns the counters returned by TTLCache.stats() into collector samples.
+
+    Args:
+        prefix (str): The metric name prefix, e.g. "weather_cache".
+        stats (dict): The cache's hits, stale hits, misses, evictions, size and capacity.
+
+    Returns:
+        list[tuple]: Samples in the form Registry.register_collector expects.
+    """
+    lookups = {(result,): stats[key] for result, key in (("hit", "hits"), ("stale_hit", "stale_hits"), ("miss", "misses"))}
+    return [
+        (f"{prefix}_lookups_total", "counter", "Cache lookups by result.", ("result",), lookups),
+        (f"{prefix}_evictions_total", "counter", "Entries evicted to stay within capacity.", (), {(): stats["evictions"]}),
+        (f"{prefix}_entries", "gauge", "Entries currently in the cache.", (), {(): stats["size"]}),
+        (f"{prefix}_max_entries", "gauge", "Capacity of the cache.", (), {(): stats["max_entries"]}),
+    ]
@@ -0,0 +1,74 @@
+import logging
+import threading
+from typing import Any, Callable, Hashable, Optional
+
+from weather.utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class _Call:
+    """An in-progress call whose result or error is shared by every waiter."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into a single execution.
+
+    The first caller for a key runs the function; every caller that arrives while it is still
+    running waits for it and receives the same result, or has the same exception raised.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Runs fn once for all concurrent callers of the same key.
+
+        Args:
+            key (Hashable): The key identifying the call.
+            fn (Callable): The function to run if no call for the key is already in flight.
+
+        Returns:
+            The value returned by fn.
+
+        Raises:
+            Any exception raised by fn.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            logger.debug("Waiting on in-flight call for %s", key)
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Returns True if a call for the key is currently running."""
+        with self._lock:
+            return key in self._calls
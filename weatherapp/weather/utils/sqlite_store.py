@@ -0,0 +1,372 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Iterator, Optional
+
+from weather.utils.cache import CacheEntry
+from weather.utils.json_provider import dumps
+from weather.utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+Location = tuple[float, float]
+
+
+class SQLiteConnections:
+    """
+    Hands out one SQLite connection per thread and process for a database file in WAL mode.
+
+    WAL lets readers in every worker process proceed while one writer commits, so several gunicorn
+    workers on a node can share the same file.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        """Initializes the connection factory.
+
+        Args:
+            path (str): The path of the SQLite database file.
+            busy_timeout (float): Seconds to wait for a lock held by another connection.
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        """Returns this thread's connection, opening it on first use or after a fork."""
+        pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != pid:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+
+class SQLiteCache:
+    """
+    A weather cache shared by every process that opens the same SQLite file.
+
+    It offers the same interface as TTLCache. When the cache grows past max_entries the entries
+    fetched longest ago are evicted. Hit, miss and eviction counters are kept per process, as are
+    the decoded entries, which are reused until another fetch replaces the row.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1024, ttl_seconds: float = 3600, stale_seconds: float = 0):
+        """Initializes the cache, creating its table if needed.
+
+        Args:
+            path (str): The path of the SQLite database file.
+            max_entries (int): The maximum number of entries held before eviction kicks in.
+            ttl_seconds (float): How long an entry stays fresh after being set.
+            stale_seconds (float): How long an expired entry may still be served by get_entry.
+
+        Raises:
+            ValueError: If max_entries is less than 1.
+        """
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be at least 1, got {max_entries}")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._connections = SQLiteConnections(path)
+        self._lock = threading.Lock()
+        # The entries this process has decoded, reused while the row still holds the same fetch
+        self._decoded: "OrderedDict[Location, CacheEntry]" = OrderedDict()
+        self._connections.get().execute(
+            "CREATE TABLE IF NOT EXISTS weather_cache ("
+            " lat REAL NOT NULL, lon REAL NOT NULL, value TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL, expires_at REAL NOT NULL,"
+            " PRIMARY KEY (lat, lon)) WITHOUT ROWID"
+        )
+        self._connections.get().execute(
+            "CREATE INDEX IF NOT EXISTS weather_cache_fetched_at ON weather_cache (fetched_at)"
+        )
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def peek(self, key: Location) -> Optional[CacheEntry]:
+        """Returns the entry for a key, fresh or not, without touching counters."""
+        row = self._connections.get().execute(
+            "SELECT value, fetched_at, expires_at FROM weather_cache WHERE lat = ? AND lon = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        key = tuple(key)
+        with self._lock:
+            entry = self._decoded.get(key)
+            if entry is not None and entry.fetched_at == row[1]:
+                self._decoded.move_to_end(key)
+                return entry
+        # The stored text is already the entry's JSON encoding, so keep it for serving
+        entry = CacheEntry(json.loads(row[0]), row[1], row[2], key, json=row[0].encode())
+        self._remember(entry)
+        return entry
+
+    def _remember(self, entry: CacheEntry) -> None:
+        """Keeps a decoded entry, so later reads of the same fetch reuse it along with its variants."""
+        with self._lock:
+            self._decoded[entry.key] = entry
+            self._decoded.move_to_end(entry.key)
+            while len(self._decoded) > self.max_entries:
+                self._decoded.popitem(last=False)
+
+    def get_entry(self, key: Location) -> Optional[CacheEntry]:
+        """Returns the entry for a key if it is fresh or still within the stale window."""
+        entry = self.peek(key)
+        if entry is None or time.time() >= entry.expires_at + self.stale_seconds:
+            self._count("misses")
+            return None
+        self._count("hits" if entry.is_fresh() else "stale_hits")
+        return entry
+
+    def get(self, key: Location) -> Optional[Any]:
+        """Returns the cached value for a key, or None if it is missing or expired."""
+        entry = self.peek(key)
+        if entry is None or not entry.is_fresh():
+            self._count("misses")
+            return None
+        self._count("hits")
+        return entry.value
+
+    def set(self, key: Location, value: Any) -> CacheEntry:
+        """Stores a value, evicting the oldest entries if the cache is full."""
+        now = time.time()
+        entry = CacheEntry(value, now, now + self.ttl_seconds, tuple(key), json=dumps(value))
+        conn = self._connections.get()
+        conn.execute(
+            "INSERT OR REPLACE INTO weather_cache (lat, lon, value, fetched_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (key[0], key[1], entry.json().decode(), entry.fetched_at, entry.expires_at),
+        )
+        self._remember(entry)
+        overflow = len(self) - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM weather_cache WHERE (lat, lon) IN"
+                " (SELECT lat, lon FROM weather_cache ORDER BY fetched_at LIMIT ?)",
+                (overflow,),
+            )
+            with self._lock:
+                self.evictions += overflow
+        return entry
+
+    def pop(self, key: Location) -> None:
+        """Removes a key from the cache if it is present."""
+        self._connections.get().execute("DELETE FROM weather_cache WHERE lat = ? AND lon = ?", key)
+        with self._lock:
+            self._decoded.pop(tuple(key), None)
+
+    def clear(self) -> None:
+        """Removes every entry from the cache. Counters are left untouched."""
+        self._connections.get().execute("DELETE FROM weather_cache")
+        with self._lock:
+            self._decoded.clear()
+
+    def stats(self) -> dict:
+        """Returns this process's counters along with the shared size and capacity."""
+        with self._lock:
+            counters = {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+        counters.update(size=len(self), max_entries=self.max_entries)
+        return counters
+
+    def __contains__(self, key: Location) -> bool:
+        entry = self.peek(key)
+        return entry is not None and entry.is_fresh()
+
+    def __len__(self) -> int:
+        return self._connections.get().execute("SELECT COUNT(*) FROM weather_cache").fetchone()[0]
+
+
+class SQLiteLocations(MutableMapping):
+    """
+    A dictionary of tracked locations and their weather data, shared through an SQLite file.
+
+    Every worker that opens the same file sees the same set of tracked locations. A shared version
+    number, bumped by triggers whenever a location is added or removed, tells readers whether the set
+    has changed; a second counter, bumped on every write, tells them whether any data has.
+    """
+
+    def __init__(self, path: str):
+        """Initializes the mapping, creating its tables if needed.
+
+        Args:
+            path (str): The path of the SQLite database file.
+        """
+        self._connections = SQLiteConnections(path)
+        conn = self._connections.get()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tracked_locations ("
+            " lat REAL NOT NULL, lon REAL NOT NULL, value TEXT NOT NULL,"
+            " PRIMARY KEY (lat, lon)) WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tracked_locations_version ("
+            " id INTEGER PRIMARY KEY CHECK (id = 0), version INTEGER NOT NULL, modified_at REAL NOT NULL)"
+        )
+        conn.execute("INSERT OR IGNORE INTO tracked_locations_version VALUES (0, 0, ?)", (time.time(),))
+        bump = (
+            "UPDATE tracked_locations_version"
+            " SET version = version + 1, modified_at = (julianday('now') - 2440587.5) * 86400.0"
+        )
+        # Replacing the data of a location that is already tracked leaves the version alone
+        conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS tracked_locations_added BEFORE INSERT ON tracked_locations"
+            " WHEN NOT EXISTS (SELECT 1 FROM tracked_locations WHERE lat = NEW.lat AND lon = NEW.lon)"
+            f" BEGIN {bump}; END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS tracked_locations_removed AFTER DELETE ON tracked_locations BEGIN {bump}; END"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tracked_locations_changes ("
+            " id INTEGER PRIMARY KEY CHECK (id = 0), changes INTEGER NOT NULL)"
+        )
+        conn.execute("INSERT OR IGNORE INTO tracked_locations_changes VALUES (0, 0)")
+        count = "UPDATE tracked_locations_changes SET changes = changes + 1"
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS tracked_locations_written AFTER INSERT ON tracked_locations BEGIN {count}; END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS tracked_locations_deleted AFTER DELETE ON tracked_locations BEGIN {count}; END"
+        )
+
+    def version(self) -> tuple[int, float]:
+        """Returns the number of times a location has been added or removed, and when that last happened."""
+        return self._connections.get().execute(
+            "SELECT version, modified_at FROM tracked_locations_version"
+        ).fetchone()
+
+    def changes(self) -> int:
+        """Returns the number of times a location has been added, removed or had its data replaced."""
+        return self._connections.get().execute(
+            "SELECT changes FROM tracked_locations_changes"
+        ).fetchone()[0]
+
+    def rows(self) -> list[tuple[Location, dict]]:
+        """Returns every tracked location and its data, read in one query."""
+        rows = self._connections.get().execute("SELECT lat, lon, value FROM tracked_locations").fetchall()
+        return [((lat, lon), json.loads(value)) for lat, lon, value in rows]
+
+    def page(self, after: Optional[Location], limit: int) -> list[Location]:
+        """Returns up to limit tracked locations in (lat, lon) order, starting after a given location.
+
+        Args:
+            after (Location, optional): Only return locations after this one.
+            limit (int): The maximum number of locations to return.
+
+        Returns:
+            list[Location]: The (lat, lon) keys, read with a primary key range scan.
+        """
+        if after is None:
+            rows = self._connections.get().execute(
+                "SELECT lat, lon FROM tracked_locations ORDER BY lat, lon LIMIT ?", (limit,)
+            ).fetchall()
+        else:
+            rows = self._connections.get().execute(
+                "SELECT lat, lon FROM tracked_locations WHERE (lat, lon) > (?, ?) ORDER BY lat, lon LIMIT ?",
+                (after[0], after[1], limit),
+            ).fetchall()
+        return [(lat, lon) for lat, lon in rows]
+
+    def __getitem__(self, key: Location) -> dict:
+        row = self._connections.get().execute(
+            "SELECT value FROM tracked_locations WHERE lat = ? AND lon = ?", key
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return json.loads(row[0])
+
+    def __setitem__(self, key: Location, value: dict) -> None:
+        self._connections.get().execute(
+            "INSERT OR REPLACE INTO tracked_locations (lat, lon, value) VALUES (?, ?, ?)",
+            (key[0], key[1], json.dumps(value)),
+        )
+
+    def __delitem__(self, key: Location) -> None:
+        cursor = self._connections.get().execute(
+            "DELETE FROM tracked_locations WHERE lat = ? AND lon = ?", key
+        )
+        if cursor.rowcount == 0:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, tuple) or len(key) != 2:
+            return False
+        return self._connections.get().execute(
+            "SELECT 1 FROM tracked_locations WHERE lat = ? AND lon = ?", key
+        ).fetchone() is not None
+
+    def __iter__(self) -> Iterator[Location]:
+        rows = self._connections.get().execute("SELECT lat, lon FROM tracked_locations").fetchall()
+        return iter([(lat, lon) for lat, lon in rows])
+
+    def __len__(self) -> int:
+        return self._connections.get().execute("SELECT COUNT(*) FROM tracked_locations").fetchone()[0]
+
+
+class SQLiteLease:
+    """
+    A named lease that one process at a time can hold, shared through an SQLite file.
+
+    The holder renews the lease before it runs out; if the holder dies, another process takes the lease
+    over once it has expired.
+    """
+
+    def __init__(self, path: str, name: str):
+        """Initializes the lease, creating its table if needed.
+
+        Args:
+            path (str): The path of the SQLite database file.
+            name (str): The name of the lease, e.g. "refresh-ahead".
+        """
+        self.name = name
+        self._connections = SQLiteConnections(path)
+        self._connections.get().execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            " name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def acquire(self, holder: str, ttl_seconds: float) -> bool:
+        """Takes or renews the lease for a holder.
+
+        Args:
+            holder (str): An identifier unique to the process asking for the lease.
+            ttl_seconds (float): How long the lease lasts unless it is renewed.
+
+        Returns:
+            bool: True if the holder has the lease, False if another holder's lease has not expired.
+        """
+        now = time.time()
+        cursor = self._connections.get().execute(
+            "INSERT INTO leases VALUES (?, ?, ?) ON CONFLICT (name) DO UPDATE"
+            " SET holder = excluded.holder, expires_at = excluded.expires_at"
+            " WHERE leases.holder = excluded.holder OR leases.expires_at <= ?",
+            (self.name, holder, now + ttl_seconds, now),
+        )
+        return cursor.rowcount == 1
+
+    def release(self, holder: str) -> None:
+        """Gives the lease up, if the holder has it, so another process can take it at once.
+
+        Args:
+            holder (str): The identifier the lease was acquired with.
+        """
+        self._connections.get().execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, holder))